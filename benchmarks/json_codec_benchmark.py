@@ -0,0 +1,64 @@
+"""
+Compares the standard library JSON with `orjson` on payloads of the mock API: decoding of table events and
+component configurations responses and encoding of their JSON columns, e.g.:
+
+    python benchmarks/json_codec_benchmark.py --events 1000 --transformations 50
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+from mock_api import MockOrganization
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import json_codec  # noqa: E402
+from table_definitions import JSON_CONFIGURATIONS, JSON_WORKSPACE_TABLE_LOADS  # noqa: E402
+
+
+def measure(name: str, baseline, candidate, number: int):
+
+    baseline_seconds = min(timeit.repeat(baseline, number=number, repeat=5))
+    candidate_seconds = min(timeit.repeat(candidate, number=number, repeat=5))
+
+    print(f"{name:>24}: json {baseline_seconds * 1000 / number:8.3f} ms, orjson "
+          f"{candidate_seconds * 1000 / number:8.3f} ms, {baseline_seconds / candidate_seconds:5.1f}x")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=1000, help="number of events in a response")
+    parser.add_argument('--transformations', type=int, default=50,
+                        help="number of configurations of each transformation component")
+    parser.add_argument('--number', type=int, default=20, help="number of iterations of each measurement")
+    args = parser.parse_args()
+
+    if json_codec.orjson is None:
+        sys.exit("Package orjson is not installed.")
+
+    org = MockOrganization(projects=1, tables=1, transformations=args.transformations, events=args.events)
+    project = next(iter(org.projects.values()))
+    events = next(iter(project['table_events'].values()))
+    components = project['components']
+
+    payloads = {'table events': json.dumps(events).encode(), 'configurations': json.dumps(components).encode()}
+
+    for name, payload in payloads.items():
+        assert json_codec.loads(payload) == json.loads(payload)
+        measure(f'decode {name}', lambda: json.loads(payload), lambda: json_codec.loads(payload), args.number)
+
+    dumps_orjson = json_codec.get_encoder('orjson')
+    columns = {'table events': [e[c] for e in events for c in JSON_WORKSPACE_TABLE_LOADS if c in e],
+               'configurations': [cfg[c] for cmp in components for cfg in cmp['configurations']
+                                  for c in JSON_CONFIGURATIONS if c in cfg]}
+
+    for name, values in columns.items():
+        measure(f'encode {name}', lambda: [json.dumps(v) for v in values],
+                lambda: [dumps_orjson(v) for v in values], args.number)
+
+
+if __name__ == '__main__':
+    main()
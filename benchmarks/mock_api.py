@@ -0,0 +1,520 @@
+"""
+Local stand-in for the Keboola APIs used by the component: Storage, Queue / Syrup, Scheduler, Notification and
+Management. Serves a synthetic organization generated by `MockOrganization`, see `serve`.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TRANSFORMATION_COMPONENTS = ['keboola.snowflake-transformation', 'keboola.python-transformation-v2']
+CONFIGURATION_DEFAULTS = {'description': '', 'created': 'x', 'creatorToken': {'id': 1, 'description': 'd'},
+                          'version': 1, 'changeDescription': '', 'isDisabled': False, 'isDeleted': False,
+                          'currentVersion': {'created': 'x', 'creatorToken': {'id': 1, 'description': 'd'},
+                                             'changeDescription': ''},
+                          'configuration': {}, 'rows': [], 'rowsSortOrder': [], 'state': {}}
+JOBS_NOW = datetime(2023, 3, 1, tzinfo=timezone.utc)  # Creation time of the newest job, relative times refer to it
+API_PREFIXES = {
+    'syrup': 'syrup',
+    'queue': 'queue',
+    'scheduler': 'scheduler',
+    'storage': 'storage',
+    'notification': 'notification',
+    'management': 'manage'
+}
+
+
+class MockOrganization:
+    """
+    Synthetic organization of `projects` projects, each with `tables` tables, `transformations` configurations of
+    each transformation v2 component, `events` load events per table and `jobs` transformation jobs. Storage tokens
+    of a project are `<project_id>-<anything>`.
+
+    Every GET request is delayed by `latency` seconds. With `etag`, responses carry an `ETag` and matching
+    conditional requests get `304 Not Modified`. With `rate_limit`, requests exceeding `rate_limit` requests per
+    second get `429 Too Many Requests` with `Retry-After: 1`. Counters of requests, bytes sent, not modified and
+    throttled responses are updated by the server.
+    """
+
+    def __init__(self, projects: int = 2, tables: int = 5, transformations: int = 3, events: int = 30,
+                 jobs: int = 25, latency: float = 0.0, etag: bool = False, rate_limit: float = 0.0):
+
+        self.latency = latency
+        self.etag = etag
+        self.rate_limit = rate_limit
+
+        self.requests = 0
+        self.bytes_sent = 0
+        self.not_modified = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+        self._tokens = rate_limit
+        self._tokens_updated = time.monotonic()
+
+        self._event_ids = iter(range(1, 2 ** 62))
+        self.projects = {}
+
+        for p in range(1, projects + 1):
+            project = self.build_project(p, tables, transformations, events, jobs)
+            self.projects[project['id']] = project
+
+    def build_project(self, p: int, tables: int, transformations: int, events: int, jobs: int) -> dict:
+
+        project_id = str(100 + p)
+        project_tables = [self.build_table(p, t) for t in range(tables)]
+
+        table_events = {}
+        for table in project_tables:
+            table_events[table['id']] = list(reversed([self.build_table_event(table) for _ in range(events)]))
+
+        project_jobs = [self.build_job(project_id, p, j, jobs) for j in range(1, jobs + 1)]
+        project_jobs.reverse()
+
+        workspace_events = [self.build_workspace_event(job) for job in project_jobs for _ in range(2)]
+
+        return {
+            'id': project_id,
+            'name': f'Project {project_id}',
+            'tables': project_tables,
+            'table_events': table_events,
+            'jobs': project_jobs,
+            'ws_events': workspace_events,
+            'components': self.build_components(transformations),
+            'tokens': [{'id': str(k), 'created': 'x', 'refreshed': 'x', 'description': f'tok {k}',
+                        'isMasterToken': k == 1, 'canManageBuckets': True, 'canManageTokens': True,
+                        'canReadAllFileUploads': False, 'canPurgeTrash': False, 'expires': None,
+                        'isExpired': False, 'isDisabled': False, 'dailyCapacity': 0,
+                        'creatorToken': {'id': 1, 'description': 'm'},
+                        'admin': {'id': 1, 'name': 'A'}} for k in range(1, 4)],
+            'triggers': [{'id': '1', 'runWithTokenId': 1, 'component': 'orchestrator', 'configurationId': 1,
+                          'lastRun': 'x', 'creatorToken': {'id': 1, 'description': 'd'},
+                          'coolDownPeriodMinutes': 5, 'tables': [{'tableId': 'in.c-a.b'}]}],
+            'buckets': [{'id': f'in.c-b{p}', 'name': 'b', 'stage': 'in', 'tables': 'x', 'created': 'x',
+                         'sourceBucket': {'id': 's', 'name': 'n'}, 'project': {'id': 1}}],
+            'schedules': [{'id': '1', 'tokenId': '2', 'configurationId': '3', 'configurationVersionId': '4',
+                           'schedule': {'cronTab': '* * * * *', 'timezone': 'UTC', 'state': 'enabled'},
+                           'target': {'componentId': 'x', 'configurationId': '1', 'configurationRowIds': [],
+                                      'mode': 'run', 'tag': ''}, 'executions': []}],
+            'subscriptions': [{'id': '1', 'event': 'job-failed', 'filters': [
+                {'field': 'job.component.id', 'value': 'x'}, {'field': 'job.configuration.id', 'value': '1'}],
+                'recipient': {'channel': 'email', 'address': 'a@b.c'}}],
+            'orchestrations': [{'id': 900, 'name': 'o', 'crontabRecord': None, 'active': True,
+                                'token': {'id': 1, 'description': 'd'},
+                                'notifications': [{'email': 'a@b.c', 'channel': 'error', 'parameters': {}}]}]
+        }
+
+    @staticmethod
+    def build_table(p: int, t: int) -> dict:
+
+        return {
+            'id': f'in.c-b{p}.t{t}', 'name': f't{t}', 'primaryKey': ['id'] if t % 2 else [],
+            'created': '2023-01-01T00:00:00+0100', 'lastImportDate': f'2023-02-0{t % 9 + 1}T00:00:00+0100',
+            'lastChangeDate': '2023-02-01T00:00:00+0100', 'rowsCount': t * 10, 'dataSizeBytes': t * 1024,
+            'isAlias': False, 'isAliasable': True, 'attributes': [], 'uri': 'x',
+            'bucket': {'id': f'in.c-b{p}', 'name': f'c-b{p}', 'stage': 'in', 'created': 'x',
+                       'lastChangeDate': None, 'isReadOnly': False, 'sharing': None, 'description': 'big'},
+            'metadata': [{'id': str(t * 7 + k), 'key': f'k{k}', 'value': f'v "{k}"\n',
+                          'provider': 'user', 'timestamp': 'ts'} for k in range(2)],
+            'columns': ['id', 'name', 'value'],
+            'columnMetadata': {'id': [{'id': str(t * 3 + 1), 'key': 'KBC.datatype.basetype',
+                                       'value': 'STRING', 'provider': 'x', 'timestamp': 'ts'}],
+                               'name': []}
+        }
+
+    def build_table_event(self, table: dict) -> dict:
+
+        event_id = next(self._event_ids)
+
+        return {'id': event_id, 'event': 'storage.tableImportDone', 'component': 'storage',
+                'message': f'msg {event_id}', 'runId': f'{event_id}.1', 'created': '2023-03-01T00:00:00+0100',
+                'configurationId': None, 'objectId': table['id'], 'objectName': table['name'],
+                'objectType': 'table', 'context': {'a': [1, 2]}, 'params': {'p': 'ü'},
+                'results': {}, 'performance': None, 'token': {'id': '1', 'name': 'n'}, 'uri': 'u'}
+
+    @staticmethod
+    def build_job(project_id: str, p: int, j: int, jobs: int) -> dict:
+
+        # Pairs of jobs share the creation time, as jobs created within the same second do
+        created = JOBS_NOW - timedelta(minutes=(jobs - j) // 2)
+
+        return {'id': str(p * 10000 + j), 'runId': str(p * 10000 + j),
+                'status': 'success' if j < jobs else 'processing',
+                'component': 'transformation', 'createdTime': created.isoformat(), 'startTime': 'x', 'endTime': 'x',
+                'params': {'config': '1', 'configBucketId': '2'},
+                'token': {'id': '1', 'description': 'd'}, 'project': {'id': project_id, 'name': 'n'}}
+
+    def build_workspace_event(self, job: dict) -> dict:
+
+        return {'id': next(self._event_ids), 'event': 'storage.workspaceLoaded', 'component': 'storage',
+                'message': 'loaded', 'runId': job['runId'], 'created': 'x',
+                'context': {}, 'params': {'source': 'in.c-b.t'}, 'results': {},
+                'performance': {}, 'token': {'id': '1', 'name': 'n'}}
+
+    @staticmethod
+    def build_components(transformations: int) -> list:
+
+        components = [
+            {'id': 'keboola.orchestrator', 'type': 'other', 'name': 'Orch', 'configurations': [
+                {'id': f'{i}', 'name': f'orch {i}', 'description': '', 'created': 'x', 'version': 2,
+                 'isDisabled': False, 'isDeleted': False, 'creatorToken': {'id': 1, 'description': 'd'},
+                 'configuration': {'phases': [{'id': 1, 'name': 'p', 'dependsOn': []}],
+                                   'tasks': [{'id': 1, 'name': 't', 'phase': 1, 'enabled': True,
+                                              'continueOnFailure': False,
+                                              'task': {'componentId': 'a', 'configId': '1', 'mode': 'run'}}]},
+                 'rows': []} for i in range(2)]},
+            {'id': 'orchestrator', 'type': 'other', 'name': 'Orch v1', 'configurations': [
+                {'id': '900', 'name': 'o', 'rows': [],
+                 'configuration': {'tasks': [{'component': 'x', 'action': 'run', 'actionParameters': {'config': 1},
+                                              'active': True}]}}]},
+            {'id': 'transformation', 'type': 'transformation', 'name': 'Legacy', 'configurations': [
+                {'id': 'b1', 'name': 'bucket', 'description': '', 'version': 1, 'created': 'x',
+                 'creatorToken': {'id': 1, 'description': 'd'}, 'changeDescription': '',
+                 'configuration': {},
+                 'rows': [{'id': 'r1', 'name': 'tr', 'description': '', 'version': 1, 'created': 'x',
+                           'changeDescription': '',
+                           'configuration': {'backend': 'snowflake', 'type': 'simple', 'phase': 1,
+                                             'packages': ['a'], 'requires': [],
+                                             'input': [{'source': 'in.c-a.b', 'destination': 'b',
+                                                        'columns': ['x'], 'whereValues': [1],
+                                                        'datatypes': {'x': {'column': 'x', 'type': 'VARCHAR',
+                                                                            'length': '10',
+                                                                            'convertEmptyValuesToNull': False},
+                                                                      'y': None}}],
+                                             'output': [{'source': 'o', 'destination': 'out.c-a.o',
+                                                         'primaryKey': ['x']}],
+                                             'queries': ['select 1;', 'select "2";']}}]}]},
+        ]
+
+        for ti, component_id in enumerate(TRANSFORMATION_COMPONENTS):
+            components += [{'id': component_id, 'type': 'transformation', 'name': component_id, 'configurations': [
+                {'id': f'{ti}{k}', 'name': f'tr {k}', 'description': 'd', 'version': 3, 'created': 'x',
+                 'creatorToken': {'id': 1, 'description': 'd'}, 'changeDescription': 'c',
+                 'currentVersion': {'created': 'x', 'creatorToken': {'id': 2, 'description': 'e'}},
+                 'configuration': {
+                     'parameters': {'packages': ['pandas'], 'blocks': [
+                         {'name': 'b', 'codes': [{'name': 'c', 'script': [f'select {s};' for s in range(4)]}]}]},
+                     'storage': {'input': {'tables': [{'source': 'in.c-a.b', 'destination': 'b',
+                                                       'where_values': [], 'columns': ['a'],
+                                                       'column_types': [{'source': 'a', 'type': 'VARCHAR',
+                                                                         'length': '', 'nullable': True}]}]},
+                                 'output': {'tables': [{'source': 'o', 'destination': 'out.c-a.o',
+                                                        'primary_key': ['a'], 'delete_where_values': []}]}}},
+                 'rows': []} for k in range(transformations)]}]
+
+        components += [{'id': 'keboola.ex-db', 'type': 'extractor', 'name': 'DB', 'configurations': [
+            {'id': '5', 'name': 'ex', 'created': 'x', 'version': 1, 'isDeleted': False,
+             'creatorToken': {'id': 1, 'description': 'd'}, 'configuration': {'x': 'ü', 'y': [1, 2.5]},
+             'rows': [{'id': '1', 'configuration': {}}]}]}]
+
+        # The API returns all fields of a configuration, even if they are empty
+        for component in components:
+            for configuration in component['configurations']:
+                for field, default in CONFIGURATION_DEFAULTS.items():
+                    configuration.setdefault(field, default)
+
+        return components
+
+    def count(self, requests: int = 0, bytes_sent: int = 0, not_modified: int = 0):
+
+        with self.lock:
+            self.requests += requests
+            self.bytes_sent += bytes_sent
+            self.not_modified += not_modified
+
+    def is_throttled(self) -> bool:
+        """
+        Takes a token from the bucket of `rate_limit` tokens per second, returns `True`, if the bucket is empty.
+        """
+
+        if not self.rate_limit:
+            return False
+
+        with self.lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._tokens_updated) * self.rate_limit)
+            self._tokens_updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return False
+
+            self.throttled += 1
+            return True
+
+
+def page(items: list, qs: dict) -> list:
+
+    offset = int(qs.get('offset', ['0'])[0])
+    limit = int(qs.get('limit', ['100000'])[0])
+
+    return items[offset:offset + limit]
+
+
+def filter_events(events: list, qs: dict) -> list:
+
+    if 'maxId' in qs:
+        events = [e for e in events if e['id'] <= int(qs['maxId'][0])]
+
+    if 'sinceId' in qs:
+        events = [e for e in events if e['id'] > int(qs['sinceId'][0])]
+
+    return page(events, qs)
+
+
+def make_handler(org: MockOrganization):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, *args):
+            pass
+
+        def get_project(self):
+
+            token = self.headers.get('x-storageapi-token', '')
+            return org.projects.get(token.split('-')[0])
+
+        def send_throttled(self):
+
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def send(self, code: int, body):
+
+            data = json.dumps(body).encode()
+            etag = None
+
+            if org.etag and code == 200 and self.command == 'GET':
+                etag = '"' + hashlib.md5(data).hexdigest() + '"'
+
+                if self.headers.get('If-None-Match') == etag:
+                    org.count(not_modified=1)
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+            org.count(bytes_sent=len(data))
+            self.send_response(code)
+
+            if etag:
+                self.send_header('ETag', etag)
+
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+
+            org.count(requests=1)
+
+            if org.is_throttled():
+                return self.send_throttled()
+
+            match = re.match(r'/manage/projects/(\d+)/tokens', self.path)
+
+            if match:
+                return self.send(201, {'id': '77', 'token': f'{match.group(1)}-generated',
+                                       'expires': '2099-01-01T00:00:00+0000'})
+
+            self.send(404, {'error': 'not found'})
+
+        def do_GET(self):
+
+            org.count(requests=1)
+
+            if org.latency:
+                time.sleep(org.latency)
+
+            if org.is_throttled():
+                return self.send_throttled()
+
+            url = urlparse(self.path)
+            qs = parse_qs(url.query)
+            path = url.path
+
+            if path.startswith('/manage/'):
+                return self.get_management(path[len('/manage/'):])
+
+            project = self.get_project()
+
+            if project is None:
+                return self.send(401, {'error': 'invalid token'})
+
+            if path.startswith('/storage/'):
+                return self.get_storage(project, path[len('/storage/'):], qs)
+
+            if path == '/syrup/queue/jobs':
+                return self.send(200, page(self.filter_jobs(project['jobs'], qs), qs))
+
+            if path == '/queue/jobs':
+                return self.send(200, page(self.filter_queue_jobs(project['jobs'], qs), qs))
+
+            if path == '/syrup/orchestrator/orchestrations':
+                return self.send(200, project['orchestrations'])
+
+            if path == '/scheduler/schedules':
+                return self.send(200, page(project['schedules'], qs))
+
+            if path == '/notification/project-subscriptions':
+                return self.send(200, page(project['subscriptions'], qs))
+
+            return self.send(404, {})
+
+        def get_management(self, path: str):
+
+            if path == 'tokens/verify':
+                return self.send(200, {})
+
+            match = re.match(r'organizations/(\w+)(/users)?$', path)
+            if match:
+                if match.group(2):
+                    return self.send(200, [{'id': 1, 'name': 'u', 'email': 'e'}])
+
+                return self.send(200, {'projects': [{'id': int(p['id']), 'name': p['name']}
+                                                    for p in org.projects.values()]})
+
+            if re.match(r'projects/(\d+)/users', path):
+                return self.send(200, [{'id': 1, 'name': 'u', 'email': 'e', 'invitor': None}])
+
+            return self.send(404, {})
+
+        def get_storage(self, project: dict, path: str, qs: dict):
+
+            if path == 'tokens/verify':
+                return self.send(200, {'id': '1', 'owner': {'id': int(project['id']), 'name': project['name']}})
+
+            if path == 'tokens':
+                return self.send(200, project['tokens'])
+
+            if re.match(r'tokens/(\w+)/events', path):
+                return self.send(200, [{'id': 1, 'event': 'e', 'component': 'c', 'message': 'm'}])
+
+            if path == 'components':
+                components = project['components']
+                component_type = qs.get('componentType', [None])[0]
+
+                if component_type:
+                    components = [c for c in components if c['type'] == component_type]
+
+                if 'include' not in qs:
+                    components = [{**c, 'configurations': [{k: v for k, v in cfg.items()
+                                                            if k not in ('configuration', 'rows')}
+                                                           for cfg in c['configurations']]} for c in components]
+
+                return self.send(200, components)
+
+            match = re.match(r'components/([\w.\-]+)/configs', path)
+            if match:
+                for component in project['components']:
+                    if component['id'] == match.group(1):
+                        return self.send(200, component['configurations'])
+
+                return self.send(200, [])
+
+            if path == 'buckets':
+                return self.send(200, project['buckets'])
+
+            if path == 'triggers':
+                return self.send(200, project['triggers'])
+
+            if path == 'tables':
+                if 'include' in qs:
+                    return self.send(200, project['tables'])
+
+                return self.send(200, [{k: v for k, v in t.items()
+                                        if k not in ('metadata', 'columns', 'columnMetadata')}
+                                       for t in project['tables']])
+
+            match = re.match(r'tables/([\w.\-]+)/events', path)
+            if match:
+                return self.send(200, filter_events(project['table_events'].get(match.group(1), []), qs))
+
+            if path == 'events':
+                query = qs.get('q', [''])[0]
+                run_ids = set(qs.get('runId', [])) | set(re.findall(r'runId:([\w.]+)', query))
+
+                for group in re.findall(r'runId:\(([^)]*)\)', query):
+                    run_ids |= set(group.split(' OR '))
+
+                # Events are listed newest first
+                events = sorted((e for e in project['ws_events'] if e['runId'] in run_ids), key=lambda e: -e['id'])
+                return self.send(200, filter_events(events, qs))
+
+            return self.send(404, {})
+
+        @staticmethod
+        def filter_jobs(jobs: list, qs: dict) -> list:
+
+            query = qs.get('q', [''])[0]
+
+            if 'status:waiting' in query:
+                jobs = [j for j in jobs if j['status'] in ('waiting', 'processing')]
+
+            for operator, value in re.findall(r'id:([<>])(\d+)', query):
+                if operator == '>':
+                    jobs = [j for j in jobs if int(j['id']) > int(value)]
+                else:
+                    jobs = [j for j in jobs if int(j['id']) < int(value)]
+
+            if qs.get('sortOrder', ['desc'])[0] == 'asc':
+                jobs = sorted(jobs, key=lambda j: int(j['id']))
+
+            return jobs
+
+        @staticmethod
+        def filter_queue_jobs(jobs: list, qs: dict) -> list:
+
+            if 'q' in qs:
+                jobs = Handler.filter_jobs(jobs, qs)
+
+            if 'status[]' in qs:
+                jobs = [j for j in jobs if j['status'] in qs['status[]']]
+
+            if 'componentId[]' in qs:
+                jobs = [j for j in jobs if j['component'] in qs['componentId[]']]
+
+            if 'createdTimeFrom' in qs:
+                days = re.fullmatch(r'-(\d+) days', qs['createdTimeFrom'][0]).group(1)
+                jobs = [j for j in jobs
+                        if datetime.fromisoformat(j['createdTime']) >= JOBS_NOW - timedelta(days=int(days))]
+
+            if 'createdTimeTo' in qs:
+                created_to = datetime.fromisoformat(qs['createdTimeTo'][0])
+                jobs = [j for j in jobs if datetime.fromisoformat(j['createdTime']) <= created_to]
+
+            if qs.get('sortOrder', ['desc'])[0] == 'asc':
+                jobs = sorted(jobs, key=lambda j: int(j['id']))
+
+            return jobs
+
+    return Handler
+
+
+def serve(org: MockOrganization, port: int = 0) -> ThreadingHTTPServer:
+    """
+    Starts serving the organization on `127.0.0.1` in a daemon thread, on a random free port by default.
+    """
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(org))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def get_api_urls(server: ThreadingHTTPServer) -> dict:
+    """
+    Returns base URLs of all APIs served by `server` in the format of `client.KEBOOLA_API_URLS`.
+    """
+
+    host, port = server.server_address[:2]
+
+    return {api: f'http://{host}:{port}/{prefix}' for api, prefix in API_PREFIXES.items()}
@@ -0,0 +1,202 @@
+"""
+End-to-end benchmark of the component against the local mock API, see `mock_api`.
+
+The mock API is served by this process, each run of the component is executed in a separate process, so that its
+peak RSS is not affected by the mock API or by previous runs. Reports wall time, requests/s, rows/s and peak RSS
+of every run and the median of all runs, e.g.:
+
+    python benchmarks/run_benchmark.py --projects 20 --tables 50 --latency 0.02 --repeat 3 \
+        --params '{"max_parallel_projects": 4}'
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_api import MockOrganization, get_api_urls, serve
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+STACK_ID = 'connection.mock'
+REGION = 'mock'
+
+STORAGE_DATASETS = ['get_tokens', 'get_tokens_last_events', 'get_orchestrations', 'get_orchestrations_v2',
+                    'get_triggers', 'get_waiting_jobs', 'get_tables', 'get_columns', 'get_all_configurations',
+                    'get_transformations', 'get_transformations_v2', 'get_workspace_load_events',
+                    'get_tables_load_events', 'get_schedules', 'get_notifications', 'get_storage_buckets']
+MANAGEMENT_DATASETS = ['get_project_users', 'get_organization_users']
+
+REPORTED_METRICS = ['wall_seconds', 'requests', 'requests_per_second', 'rows', 'rows_per_second', 'peak_rss_mb',
+                    'throttled']
+
+
+def build_config(org: MockOrganization, mode: str, datasets: list, params: dict) -> dict:
+
+    if not datasets:
+        datasets = STORAGE_DATASETS + (MANAGEMENT_DATASETS if mode == 'management' else [])
+
+    parameters = {'datasets': {dataset: True for dataset in datasets}, 'incremental_load': True, 'tokens': [],
+                  'master_token': []}
+
+    if mode == 'management':
+        parameters['master_token'] = [{'#token': 'master', 'org_id': '1', 'region': REGION}]
+    else:
+        parameters['tokens'] = [{'#key': f'{project_id}-token', 'region': REGION} for project_id in org.projects]
+
+    parameters.update(params)
+
+    return {'parameters': parameters}
+
+
+def run_component(data_dir: str, api_urls: dict, result_path: str):
+    """
+    Runs the component in the current process and writes its wall time, rows written and peak RSS to
+    `result_path`.
+    """
+
+    os.environ['KBC_DATADIR'] = data_dir
+    os.environ['KBC_STACKID'] = STACK_ID
+    sys.path.insert(0, SRC_PATH)
+
+    import client
+    client.KEBOOLA_API_URLS.update(api_urls)
+
+    import component
+    from metrics import METRICS
+
+    start = time.perf_counter()
+    component.Component().run()
+    wall_seconds = time.perf_counter() - start
+
+    rows = sum(sum(projects.values()) for projects in METRICS.to_dict()['tables'].values())
+    peak_rss_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+    with open(result_path, 'w') as result_file:
+        json.dump({'wall_seconds': wall_seconds, 'rows': rows, 'peak_rss_mb': peak_rss_kb / 1024}, result_file)
+
+
+def prepare_data_dir(data_dir: str, config: dict, state: dict = None):
+
+    for directory in ['in', 'out']:
+        shutil.rmtree(os.path.join(data_dir, directory), ignore_errors=True)
+
+    for directory in ['in', 'out/tables', 'out/files']:
+        os.makedirs(os.path.join(data_dir, directory))
+
+    with open(os.path.join(data_dir, 'config.json'), 'w') as config_file:
+        json.dump(config, config_file)
+
+    if state is not None:
+        with open(os.path.join(data_dir, 'in', 'state.json'), 'w') as state_file:
+            json.dump(state, state_file)
+
+
+def run(org: MockOrganization, server, data_dir: str, verbose: bool) -> dict:
+
+    result_path = os.path.join(data_dir, 'benchmark_result.json')
+    org.requests = org.bytes_sent = org.not_modified = org.throttled = 0
+
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--child', data_dir,
+                    json.dumps(get_api_urls(server)), result_path],
+                   check=True, stdout=None if verbose else subprocess.DEVNULL,
+                   stderr=None if verbose else subprocess.DEVNULL)
+
+    with open(result_path) as result_file:
+        result = json.load(result_file)
+
+    result['requests'] = org.requests
+    result['bytes_sent'] = org.bytes_sent
+    result['not_modified'] = org.not_modified
+    result['throttled'] = org.throttled
+    result['requests_per_second'] = org.requests / result['wall_seconds']
+    result['rows_per_second'] = result['rows'] / result['wall_seconds']
+
+    return result
+
+
+def format_result(name: str, result: dict) -> str:
+
+    return (f"{name:>8}: {result['wall_seconds']:8.3f} s wall, {result['requests']:7.0f} requests "
+            f"({result['requests_per_second']:8.1f}/s), {result['rows']:9.0f} rows "
+            f"({result['rows_per_second']:10.1f}/s), {result['peak_rss_mb']:7.1f} MB peak RSS, "
+            f"{result['throttled']:5.0f} throttled")
+
+
+def parse_args() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=2, help="number of projects")
+    parser.add_argument('--tables', type=int, default=5, help="number of tables per project")
+    parser.add_argument('--transformations', type=int, default=3,
+                        help="number of configurations of each transformation v2 component per project")
+    parser.add_argument('--events', type=int, default=30, help="number of load events per table")
+    parser.add_argument('--jobs', type=int, default=25, help="number of transformation jobs per project")
+    parser.add_argument('--latency', type=float, default=0.0, help="latency of each request in seconds")
+    parser.add_argument('--etag', action='store_true', help="send ETags and answer conditional requests")
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help="requests per second, above which requests are throttled with 429")
+    parser.add_argument('--mode', choices=['storage', 'management'], default='storage',
+                        help="extract projects with storage tokens or with a management token")
+    parser.add_argument('--datasets', nargs='*', default=[], help="datasets to extract, all by default")
+    parser.add_argument('--params', type=json.loads, default={},
+                        help="JSON object with additional component parameters")
+    parser.add_argument('--repeat', type=int, default=1, help="number of runs")
+    parser.add_argument('--keep-state', action='store_true',
+                        help="pass the state of each run to the next one, e.g. to measure caches")
+    parser.add_argument('--data-dir', help="data directory of the component, a temporary directory by default")
+    parser.add_argument('--output', help="path of a JSON file, to which results of all runs are written")
+    parser.add_argument('--verbose', action='store_true', help="show the output of the component")
+
+    return parser.parse_args()
+
+
+def main():
+
+    if len(sys.argv) == 5 and sys.argv[1] == '--child':
+        run_component(sys.argv[2], json.loads(sys.argv[3]), sys.argv[4])
+        return
+
+    args = parse_args()
+
+    org = MockOrganization(args.projects, args.tables, args.transformations, args.events, args.jobs, args.latency,
+                           args.etag, args.rate_limit)
+    server = serve(org)
+    config = build_config(org, args.mode, args.datasets, args.params)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='benchmark-')
+    state = None
+    results = []
+
+    try:
+        for idx in range(args.repeat):
+            prepare_data_dir(data_dir, config, state)
+            result = run(org, server, data_dir, args.verbose)
+            results += [result]
+            print(format_result(f'run {idx + 1}', result))
+
+            if args.keep_state:
+                with open(os.path.join(data_dir, 'out', 'state.json')) as state_file:
+                    state = json.load(state_file)
+
+    finally:
+        server.shutdown()
+
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    median = {metric: statistics.median(r[metric] for r in results) for metric in REPORTED_METRICS}
+    print(format_result('median', median))
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'arguments': vars(args), 'runs': results, 'median': median}, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
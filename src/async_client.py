@@ -0,0 +1,866 @@
+import asyncio
+import concurrent.futures
+import functools
+import io
+import logging
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterator
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+import ijson
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from client import DEFAULT_TOKEN_EXPIRATION, KEBOOLA_API_URLS, THROTTLED_MAX_RETRIES, KeboolaHttpClient, \
+    ManAPIParameters, SAPIParameters, get_cache_scope, is_token_verified, response_splitter
+from http_cache import build_cache_key, build_response
+from metrics import METRICS, endpoint_name
+from paging import EVENTS_LIMIT, QUEUE_WAITING_JOBS_PARAMS, WAITING_JOBS_QUERY, EventsPager, JobsPager, OffsetPager, \
+    Pager, QueueJobsPager, get_queue_transformation_jobs_params, get_tables_params, get_table_load_events_params, \
+    get_transformation_jobs_query, get_workspace_load_events_params, split_run_ids
+from parser import project_object
+from rate_limit import MAX_RETRY_AFTER, HostRateLimiter, get_retry_after
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_TIMEOUT = 10 * 60  # 10 minutes
+LIMITER_POLL_INTERVAL = 0.05  # Seconds between attempts to acquire a rate limiter slot released by another request
+
+
+class AsyncConnectionError(requests.exceptions.ConnectionError):
+    """
+    Connection error of an asynchronous client. It is a `requests` connection error, so callers handle connection
+    errors of both client flavours the same way.
+    """
+
+
+class AsyncClientError(Exception):
+    """
+    Error response of an asynchronous client. Coroutines raise it instead of exiting, `SystemExit` raised in the event
+    loop thread would stop the loop and leave the callers waiting. `SyncClient` logs it and exits in the caller's
+    thread, as the synchronous clients do.
+    """
+
+
+def build_async_response(method: str, url: str, status_code: int, headers: dict, content: bytes) -> requests.Response:
+    """
+    Builds a `requests.Response` from a response read by `aiohttp`, so responses of both client flavours are parsed,
+    cached and throttled the same way.
+    """
+
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = url
+
+    response.request = requests.PreparedRequest()
+    response.request.method = method
+    response.request.url = url
+
+    return response
+
+
+@asynccontextmanager
+async def limiter_slot(limiter: HostRateLimiter):
+    """
+    Asynchronous counterpart of `HostRateLimiter.slot`, which does not block the event loop while waiting.
+    """
+
+    while True:
+        acquired, wait = limiter.try_acquire()
+
+        if acquired:
+            break
+
+        await asyncio.sleep(LIMITER_POLL_INTERVAL if wait is None else wait)
+
+    try:
+        yield
+
+    finally:
+        limiter.release()
+
+
+class AsyncClientPool:
+    """
+    Event loop running in a background thread together with a single aiohttp connection pool, shared by all
+    asynchronous clients. Coroutines can be submitted from synchronous code using `run` or `submit`, asynchronous
+    iterators can be consumed from synchronous code using `iterate`.
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS, timeout: int = DEFAULT_TIMEOUT):
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='async-client-pool', daemon=True)
+        self._thread.start()
+
+        self.session = self.run(self._create_session(max_connections, timeout))
+
+    @staticmethod
+    async def _create_session(max_connections: int, timeout: int) -> aiohttp.ClientSession:
+
+        connector = aiohttp.TCPConnector(limit=max_connections)
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout))
+
+    def submit(self, coroutine) -> concurrent.futures.Future:
+        """
+        Schedules the coroutine in the event loop. Any exception of the coroutine, including `SystemExit` and
+        `KeyboardInterrupt`, is set on the returned future, so it never stops the event loop thread.
+        """
+
+        future = concurrent.futures.Future()
+
+        async def _run():
+            if not future.set_running_or_notify_cancel():
+                coroutine.close()
+                return
+
+            try:
+                future.set_result(await coroutine)
+
+            except BaseException as e:
+                future.set_exception(e)
+
+        asyncio.run_coroutine_threadsafe(_run(), self.loop)
+
+        return future
+
+    def run(self, coroutine):
+        return self.submit(coroutine).result()
+
+    def iterate(self, async_iterator: AsyncIterator) -> Iterator:
+        """
+        Yields items of an asynchronous iterator one by one, e.g. of `AsyncStorageClient.iter_all_tables`.
+        """
+
+        async def _next():
+            return await async_iterator.__anext__()
+
+        try:
+            while True:
+                try:
+                    yield self.run(_next())
+
+                except StopAsyncIteration:
+                    return
+
+        finally:
+            if hasattr(async_iterator, 'aclose'):
+                self.run(async_iterator.aclose())
+
+    def close(self):
+
+        if self.loop.is_closed():
+            return
+
+        self.run(self.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+class SyncClient:
+    """
+    Synchronous view of an asynchronous client, handed out by `client.Client`, so the component calls both client
+    flavours the same way. Coroutines returned by the client's methods are run in its `AsyncClientPool`, asynchronous
+    iterators are consumed with `AsyncClientPool.iterate`. `AsyncClientError` is logged and exits the run, the same
+    way error responses are handled by the synchronous clients.
+    """
+
+    def __init__(self, client: 'AsyncHttpClient'):
+        self.client = client
+
+    def __getattr__(self, name):
+
+        attribute = getattr(self.client, name)
+
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+
+            if asyncio.iscoroutine(result):
+                return self._run(result)
+
+            elif hasattr(result, '__anext__'):
+                return self._iterate(result)
+
+            return result
+
+        return call
+
+    def _run(self, coroutine):
+
+        try:
+            return self.client.pool.run(coroutine)
+
+        except AsyncClientError as e:
+            logging.error(e)
+            sys.exit(1)
+
+    def _iterate(self, async_iterator: AsyncIterator) -> Iterator:
+
+        try:
+            yield from self.client.pool.iterate(async_iterator)
+
+        except AsyncClientError as e:
+            logging.error(e)
+            sys.exit(1)
+
+
+class AsyncHttpClient:
+    """
+    Asynchronous counterpart of `client.KeboolaHttpClient`. Requests are sent through the connection pool of the
+    shared `AsyncClientPool` and retried with exponential back-off on connection errors and on status codes from
+    `status_forcelist`. Rate limiters, throttling retries, caches and metrics are the same as of the synchronous
+    clients, see `KeboolaHttpClient`.
+    """
+
+    def __init__(self, base_url: str, pool: AsyncClientPool, max_retries: int = 10, backoff_factor: float = 0.3,
+                 status_forcelist: tuple = (500, 502, 504), default_http_header: dict = None):
+
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.pool = pool
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = status_forcelist
+        self._default_header = default_http_header if default_http_header else {}
+
+        # Requests are recorded in metrics under the name of the synchronous client, see `KeboolaHttpClient`
+        self._metrics_name = type(self).__name__.replace('Async', '', 1)
+        self.metrics_project = METRICS.current_project
+
+    async def _request_raw(self, method: str, endpoint_path: str, **kwargs) -> requests.Response:
+        """
+        Sends the request through the rate limiter of its host, throttled requests are retried the same way as in
+        `KeboolaHttpClient._request_raw`.
+        """
+
+        url = urljoin(self.base_url, endpoint_path)
+        limiter = KeboolaHttpClient.rate_limiters.get(urlsplit(url).netloc)
+
+        for attempt in range(THROTTLED_MAX_RETRIES + 1):
+            async with limiter_slot(limiter):
+                rsp = await self._send_request(method, endpoint_path, url, **kwargs)
+                retry_after = get_retry_after(rsp, min(self.backoff_factor * 2 ** attempt, MAX_RETRY_AFTER))
+                limiter.on_response(retry_after)
+
+            if retry_after is None or attempt == THROTTLED_MAX_RETRIES:
+                break
+
+            logging.warning(f"Request to {url} was throttled with status {rsp.status_code}, retrying in "
+                            f"{retry_after:.1f} seconds.")
+            METRICS.record_retry(endpoint_name(self._metrics_name, endpoint_path), self.metrics_project)
+
+        return rsp
+
+    async def _send_request(self, method: str, endpoint_path: str, url: str, params: dict = None,
+                            headers: dict = None, **kwargs) -> requests.Response:
+
+        _headers = {**(headers or {}), **self._default_header}
+        # List values are sent as repeated parameters, the same way `requests` sends them
+        _params = [(k, str(v)) for k, value in (params or {}).items()
+                   for v in (value if isinstance(value, (list, tuple)) else [value])]
+
+        start = time.perf_counter()
+        attempt = 0
+
+        while True:
+            try:
+                async with self.pool.session.request(method, url, params=_params, headers=_headers,
+                                                     **kwargs) as rsp:
+                    content = await rsp.read()
+
+                    if rsp.status not in self.status_forcelist or attempt >= self.max_retries:
+                        response = build_async_response(method, str(rsp.url), rsp.status, rsp.headers, content)
+                        break
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise AsyncConnectionError(f"Could not connect to {url}: {e!r}") from e
+
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+            attempt += 1
+
+        METRICS.record_request(endpoint_name(self._metrics_name, endpoint_path), time.perf_counter() - start,
+                               response.status_code, len(response.content), attempt, self.metrics_project)
+
+        return response
+
+    async def get_raw(self, endpoint_path: str, params: dict = None, headers: dict = None,
+                      **kwargs) -> requests.Response:
+        """
+        Same as `KeboolaHttpClient.get_raw`, GET requests go through the response cache and the conditional requests
+        cache, if they are set.
+        """
+
+        response_cache = KeboolaHttpClient.response_cache
+        conditional_cache = KeboolaHttpClient.conditional_cache
+
+        if response_cache is None and conditional_cache is None:
+            return await self._request_raw('GET', endpoint_path, params=params, headers=headers, **kwargs)
+
+        _url = urljoin(self.base_url, endpoint_path)
+        _key = build_cache_key(urlsplit(_url).netloc, get_cache_scope(self.parameters), urlsplit(_url).path,
+                               params or {})
+
+        if response_cache is not None:
+            cached_rsp = response_cache.get(_key, endpoint_path)
+
+            if cached_rsp is not None and await self._has_cache_access(response_cache):
+                _request = requests.Request('GET', _url, params=params).prepare()
+                return build_response(*cached_rsp, _url, _request)
+
+        if conditional_cache is not None and conditional_cache.is_cached(endpoint_path):
+            validators = conditional_cache.get_validators(_key)
+            rsp = await self._request_raw('GET', endpoint_path, params=params, headers={**(headers or {}),
+                                                                                        **validators}, **kwargs)
+
+            if rsp.status_code == 304:
+                cached_rsp = conditional_cache.build_response(_key, rsp)
+
+                if cached_rsp is not None:
+                    return cached_rsp
+
+                rsp = await self._request_raw('GET', endpoint_path, params=params, headers=headers, **kwargs)
+
+            if rsp.status_code == 200:
+                conditional_cache.store(_key, rsp)
+
+        else:
+            rsp = await self._request_raw('GET', endpoint_path, params=params, headers=headers, **kwargs)
+
+        if response_cache is not None and rsp.status_code == 200:
+            response_cache.store(_key, endpoint_path, rsp)
+
+        return rsp
+
+    def _get_token_verifier(self) -> 'AsyncHttpClient':
+
+        verifier = AsyncStorageClient(self.parameters.region, self.parameters.token, self.parameters.project,
+                                      self.pool)
+        verifier.metrics_project = self.metrics_project
+
+        return verifier
+
+    async def _has_cache_access(self, response_cache) -> bool:
+        """
+        Verifies the token before a cached response is served to it, see `KeboolaHttpClient._has_cache_access`.
+        """
+
+        credentials = build_cache_key(self.parameters.region, get_cache_scope(self.parameters), 'tokens/verify',
+                                      self._default_header)
+        verified = response_cache.is_verified(credentials)
+
+        if verified is None:
+            rsp_verify = await self._get_token_verifier()._request_raw('GET', 'tokens/verify')
+            verified = is_token_verified(rsp_verify, self.parameters)
+            response_cache.set_verified(credentials, verified)
+
+            if not verified:
+                logging.warning(f"Token could not be verified for {get_cache_scope(self.parameters)}, cached "
+                                f"responses are not used.")
+
+        return verified
+
+    async def post_raw(self, endpoint_path: str, params: dict = None, headers: dict = None,
+                       **kwargs) -> requests.Response:
+        return await self._request_raw('POST', endpoint_path, params=params, headers=headers, **kwargs)
+
+    async def _iter_pages(self, endpoint_path: str, pager: Pager, description: str) -> AsyncIterator[dict]:
+        """
+        Yields items of a paged listing page by page, see `KeboolaHttpClient._iter_pages`.
+        """
+
+        for params in pager:
+            rsp_page = await self.get_raw(endpoint_path, params=params)
+            sc_page, js_page = response_splitter(rsp_page)
+
+            if sc_page != 200:
+                raise AsyncClientError(f"Could not download {description} for project {self.parameters.project} in "
+                                       f"stack {self.parameters.region}.\nReceived: {sc_page} - {js_page}.")
+
+            for item in pager.add_page(js_page):
+                yield item
+
+
+class AsyncStorageClient(AsyncHttpClient):
+    LIMIT = 100
+    EVENTS_LIMIT = EVENTS_LIMIT
+
+    def __init__(self, region: str, token: str, project: str, pool: AsyncClientPool):
+
+        _default_header = {'x-storageapi-token': token}
+        _url = KEBOOLA_API_URLS['storage'].format(REGION=region)
+
+        logging.debug(f"Storage URL set to: {_url}")
+
+        super().__init__(base_url=_url, pool=pool, default_http_header=_default_header)
+        self.parameters = SAPIParameters(token, region, project)
+
+    def _get_token_verifier(self) -> AsyncHttpClient:
+        return self
+
+    async def verify_storage_token(self) -> bool:
+
+        rsp_verify = await self.get_raw('tokens/verify')
+        sc_verify, js_verify = response_splitter(rsp_verify)
+
+        if sc_verify == 200:
+            return True
+
+        elif sc_verify in (400, 401):
+            return False
+
+        else:
+            raise AsyncClientError(f"Could not verify storage token validity.\nReceived: {sc_verify} - {js_verify}.")
+
+    async def get_tokens(self) -> list:
+
+        rsp_tokens = await self.get_raw('tokens')
+        sc_tokens, js_tokens = response_splitter(rsp_tokens)
+
+        if sc_tokens == 200:
+            return js_tokens
+
+        else:
+            raise AsyncClientError(f"Could not download tokens for project {self.parameters.project} for stack "
+                                   f"{self.parameters.region}.\nReceived: {sc_tokens} - {js_tokens}.")
+
+    async def get_component_configurations(self, component_id: str) -> list:
+
+        rsp_configs = await self.get_raw(f'components/{component_id}/configs')
+        sc_configs, js_configs = response_splitter(rsp_configs)
+
+        if sc_configs == 200:
+            return js_configs
+        else:
+            raise AsyncClientError(f"Could not download configurations of component {component_id} for project "
+                                   f"{self.parameters.project} in"
+                                   f"stack {self.parameters.region}.\nReceived: {sc_configs} - {js_configs}.")
+
+    async def get_all_configurations(self) -> list:
+
+        par_configs = {'include': 'configuration,rows'}
+
+        rsp_configs = await self.get_raw('components', params=par_configs)
+        sc_configs, js_configs = response_splitter(rsp_configs)
+
+        if sc_configs == 200:
+            return js_configs
+
+        else:
+            raise AsyncClientError(f"Could not download configurations for project {self.parameters.project} in"
+                                   f"stack {self.parameters.region}.\nReceived: {sc_configs} - {js_configs}.")
+
+    async def get_components(self, component_type: str = None) -> list:
+
+        par_components = {}
+        if component_type is not None:
+            par_components['componentType'] = component_type
+
+        rsp_components = await self.get_raw('components', params=par_components)
+        sc_components, js_components = response_splitter(rsp_components)
+
+        if sc_components == 200:
+            return js_components
+
+        else:
+            raise AsyncClientError(f"Could not download components for project {self.parameters.project} in "
+                                   f"stack {self.parameters.region}.\nReceived: {sc_components} - {js_components}.")
+
+    async def get_orchestrations(self) -> list:
+
+        return await self.get_component_configurations('orchestrator')
+
+    async def get_transformations_v1(self) -> list:
+
+        return await self.get_component_configurations('transformation')
+
+    async def get_storage_buckets(self) -> list:
+
+        rsp_buckets = await self.get_raw('buckets')
+        sc_buckets, js_buckets = response_splitter(rsp_buckets)
+
+        if sc_buckets == 200:
+            return js_buckets
+
+        else:
+            raise AsyncClientError(f"Could not download storage buckets for project {self.parameters.project} in stack "
+                                   f"{self.parameters.region}.\nReceived: {sc_buckets} - {js_buckets}.")
+
+    async def get_all_tables(self, include: bool = True) -> list:
+
+        rsp_tables = await self.get_raw('tables', params=get_tables_params(include))
+        sc_tables, js_tables = response_splitter(rsp_tables)
+
+        if sc_tables == 200:
+            return js_tables
+
+        else:
+            raise AsyncClientError(f"Could not download storage buckets for project {self.parameters.project} in stack "
+                                   f"{self.parameters.region}.\nReceived: {sc_tables} - {js_tables}.")
+
+    async def iter_all_tables(self, include: bool = True, projection: dict = None) -> AsyncIterator[dict]:
+        """
+        Yields tables one by one, without decoding the whole response at once, see
+        `StorageClient.iter_all_tables`. The response body itself is read before the first table is yielded.
+        """
+
+        rsp_tables = await self.get_raw('tables', params=get_tables_params(include))
+
+        if rsp_tables.status_code != 200:
+            sc_tables, js_tables = response_splitter(rsp_tables)
+            raise AsyncClientError(f"Could not download storage tables for project {self.parameters.project} in stack "
+                                   f"{self.parameters.region}.\nReceived: {sc_tables} - {js_tables}.")
+
+        for table in ijson.items(io.BytesIO(rsp_tables.content), 'item', use_float=True):
+            if projection is not None:
+                table = project_object(table, projection)
+
+            yield table
+
+    async def get_triggers(self) -> list:
+
+        rsp_triggers = await self.get_raw('triggers')
+        sc_triggers, js_triggers = response_splitter(rsp_triggers)
+
+        if sc_triggers == 200:
+            return js_triggers
+
+        else:
+            raise AsyncClientError(f"Could not download triggers for project {self.parameters.project} "
+                                   f"in stack {self.parameters.region}.\nReceived: {sc_triggers} - {js_triggers}.")
+
+    async def get_tokens_last_events(self, token_id: str) -> list:
+
+        par_events = {'limit': 1}
+
+        rsp_events = await self.get_raw(f'tokens/{token_id}/events', params=par_events)
+        sc_events, js_events = response_splitter(rsp_events)
+
+        if sc_events == 200:
+            return js_events
+
+        else:
+            logging.error(f"Could not download last token event for token {token_id} in project "
+                          f"{self.parameters.project} in stack {self.parameters.region}.\n"
+                          f"Received: {sc_events} - {js_events}.")
+            return []
+
+    async def get_workspace_load_events(self, **kwargs) -> list:
+
+        return [event async for event in self.iter_workspace_load_events(**kwargs)]
+
+    def iter_workspace_load_events(self, **kwargs) -> AsyncIterator[dict]:
+
+        return self._iter_paged_events('events', **get_workspace_load_events_params(**kwargs))
+
+    async def get_workspace_load_events_for_runs(self, run_ids: list, **kwargs) -> list:
+
+        return await self._get_paged_events('events', **get_workspace_load_events_params(run_ids, **kwargs))
+
+    split_run_ids = staticmethod(split_run_ids)
+
+    async def get_table_load_events(self, table_id: str, date: str, since_id: int = None, **kwargs) -> list:
+
+        return [event async for event in self.iter_table_load_events(table_id, date, since_id, **kwargs)]
+
+    def iter_table_load_events(self, table_id: str, date: str, since_id: int = None,
+                               **kwargs) -> AsyncIterator[dict]:
+
+        params = get_table_load_events_params(date, since_id, **kwargs)
+
+        return self._iter_paged_events(f'tables/{table_id}/events', **params)
+
+    async def _get_paged_events(self, url: str, **kwargs) -> list:
+
+        return [event async for event in self._iter_paged_events(url, **kwargs)]
+
+    def _iter_paged_events(self, url: str, **kwargs) -> AsyncIterator[dict]:
+
+        return self._iter_pages(url, EventsPager(kwargs, self.EVENTS_LIMIT), f'events for url {url}')
+
+
+class AsyncSyrupClient(AsyncHttpClient):
+    LIMIT = 1000
+
+    def __init__(self, region: str, token: str, project: str, pool: AsyncClientPool,
+                 keyset_pagination: bool = False):
+
+        _default_header = {'x-storageapi-token': token}
+        _url = KEBOOLA_API_URLS['syrup'].format(REGION=region)
+
+        logging.debug(f"Syrup URL set to: {_url}")
+
+        super().__init__(base_url=_url, pool=pool, default_http_header=_default_header,
+                         status_forcelist=(500, 502, 504), max_retries=2)
+        self.parameters = SAPIParameters(token, region, project)
+        self.keyset_pagination = keyset_pagination
+
+    async def get_waiting_and_processing_jobs(self) -> list:
+
+        return [job async for job in self.iter_waiting_and_processing_jobs()]
+
+    def iter_waiting_and_processing_jobs(self) -> AsyncIterator[dict]:
+
+        return self._iter_paged_jobs(q=WAITING_JOBS_QUERY)
+
+    async def get_transformation_jobs(self, last_job_id: str = None, oldest_first: bool = False, **kwargs) -> list:
+
+        kwargs['q'] = get_transformation_jobs_query(last_job_id)
+
+        jobs = await self._get_paged_jobs(**kwargs)
+
+        if oldest_first:
+            jobs.reverse()
+
+        return jobs
+
+    async def _get_paged_jobs(self, **kwargs) -> list:
+
+        return [job async for job in self._iter_paged_jobs(**kwargs)]
+
+    def _iter_paged_jobs(self, **kwargs) -> AsyncIterator[dict]:
+
+        return self._iter_pages('queue/jobs', JobsPager(kwargs, self.LIMIT, self.keyset_pagination), 'jobs')
+
+    async def get_orchestrations(self) -> list:
+
+        rsp_orch = await self.get_raw('orchestrator/orchestrations')
+        sc_orch, js_orch = response_splitter(rsp_orch)
+
+        if sc_orch == 200:
+            return js_orch
+
+        else:
+            raise AsyncClientError(f"Could not list orchestrations for project {self.parameters.project} in stack "
+                                   f"{self.parameters.region}.\nReceived: {sc_orch} - {js_orch}.")
+
+    async def get_orchestration_tasks(self, orchestration_id: str) -> list:
+
+        rsp_tasks = await self.get_raw(f'orchestrator/orchestrations/{orchestration_id}/tasks')
+        sc_tasks, js_tasks = response_splitter(rsp_tasks)
+
+        if sc_tasks == 200:
+            return js_tasks
+
+        else:
+            raise AsyncClientError(f"Could not list orchestration tasks for orchestration {orchestration_id} in "
+                                   f"project {self.parameters.project} in stack {self.parameters.region}.\n"
+                                   f"Received: {sc_tasks} - {js_tasks}.")
+
+
+class AsyncNotificationClient(AsyncHttpClient):
+    LIMIT = 1000
+
+    def __init__(self, region: str, token: str, project: str, pool: AsyncClientPool):
+
+        _default_header = {'x-storageapi-token': token}
+        _url = KEBOOLA_API_URLS['notification'].format(REGION=region)
+
+        logging.debug(f"Notification URL set to: {_url}")
+
+        super().__init__(base_url=_url, pool=pool, default_http_header=_default_header)
+        self.parameters = SAPIParameters(token, region, project)
+
+    async def get_notifications(self, **kwargs) -> list:
+        return await self._get_paged_notification(**kwargs)
+
+    def iter_notifications(self, **kwargs) -> AsyncIterator[dict]:
+        return self._iter_paged_notification(**kwargs)
+
+    async def _get_paged_notification(self, **kwargs) -> list:
+
+        return [notification async for notification in self._iter_paged_notification(**kwargs)]
+
+    def _iter_paged_notification(self, **kwargs) -> AsyncIterator[dict]:
+
+        return self._iter_pages('project-subscriptions', OffsetPager(kwargs, self.LIMIT), 'subscriptions')
+
+
+class AsyncQueueClient(AsyncHttpClient):
+    LIMIT = 1000
+
+    def __init__(self, region: str, token: str, project: str, pool: AsyncClientPool,
+                 keyset_pagination: bool = False):
+
+        _default_header = {'x-storageapi-token': token}
+        _url = KEBOOLA_API_URLS['queue'].format(REGION=region)
+
+        logging.debug(f"Queue URL set to: {_url}")
+
+        super().__init__(base_url=_url, pool=pool, default_http_header=_default_header)
+        self.parameters = SAPIParameters(token, region, project)
+        self.keyset_pagination = keyset_pagination
+
+    async def get_waiting_and_processing_jobs(self) -> list:
+
+        return [job async for job in self.iter_waiting_and_processing_jobs()]
+
+    def iter_waiting_and_processing_jobs(self) -> AsyncIterator[dict]:
+
+        if self.keyset_pagination:
+            return self._iter_paged_jobs(**QUEUE_WAITING_JOBS_PARAMS)
+
+        return self._iter_paged_jobs(q=WAITING_JOBS_QUERY)
+
+    async def get_transformation_jobs(self, last_job_id: str = None, oldest_first: bool = False, **kwargs) -> list:
+
+        if self.keyset_pagination:
+            kwargs.update(get_queue_transformation_jobs_params(last_job_id))
+            jobs = await self._get_paged_jobs(since_id=last_job_id, **kwargs)
+
+        else:
+            kwargs['q'] = get_transformation_jobs_query(last_job_id)
+            jobs = await self._get_paged_jobs(**kwargs)
+
+        if oldest_first:
+            jobs.reverse()
+
+        return jobs
+
+    async def _get_paged_jobs(self, **kwargs) -> list:
+
+        return [job async for job in self._iter_paged_jobs(**kwargs)]
+
+    def _iter_paged_jobs(self, since_id: str = None, **kwargs) -> AsyncIterator[dict]:
+
+        if self.keyset_pagination:
+            pager = QueueJobsPager(kwargs, self.LIMIT, since_id)
+        else:
+            pager = JobsPager(kwargs, self.LIMIT)
+
+        return self._iter_pages('jobs', pager, 'jobs')
+
+
+class AsyncManagementClient(AsyncHttpClient):
+
+    def __init__(self, region: str, token: str, organization: str, pool: AsyncClientPool):
+
+        _default_header = {'X-KBC-ManageApiToken': token}
+        _url = KEBOOLA_API_URLS['management'].format(REGION=region)
+
+        super().__init__(base_url=_url, pool=pool, default_http_header=_default_header)
+        self.parameters = ManAPIParameters(token, region, organization)
+
+    def _get_token_verifier(self) -> AsyncHttpClient:
+        return self
+
+    async def verify_token(self) -> None:
+
+        rsp_verify = await self.get_raw('tokens/verify')
+        sc_verify, js_verify = response_splitter(rsp_verify)
+
+        if sc_verify == 200:
+            return
+
+        else:
+            raise AsyncClientError(f"Provided management token could not be verified.\nReceived: {sc_verify} - "
+                                   f"{js_verify}.")
+
+    async def get_organization(self) -> dict:
+
+        rsp_org = await self.get_raw(f'organizations/{self.parameters.organization}')
+        sc_org, js_org = response_splitter(rsp_org)
+
+        if sc_org == 200:
+            return js_org
+
+        elif sc_org == 403:
+            raise AsyncClientError(f"User does not have access to organization {self.parameters.organization} "
+                                   f"in stack {self.parameters.region}.")
+
+        else:
+            raise AsyncClientError(f"Could not access organization {self.parameters.organization} in stack "
+                                   f"{self.parameters.region}.\nReceived: {sc_org} - {js_org}.")
+
+    async def get_project_users(self, project_id: str) -> list:
+
+        rsp_users = await self.get_raw(f'projects/{project_id}/users')
+        sc_users, js_users = response_splitter(rsp_users)
+
+        if sc_users == 200:
+            return js_users
+
+        else:
+            raise AsyncClientError(f"Could not download users for project {project_id} in stack "
+                                   f"{self.parameters.region}.\nReceived: {sc_users} - {js_users}.")
+
+    async def create_storage_token(self, project_id: str, description: str,
+                                   expiration: int = DEFAULT_TOKEN_EXPIRATION) -> dict:
+
+        hdr_token = {
+            'content-type': 'application/json',
+            'accept': 'application/json'
+        }
+
+        data_token = {
+            'description': description,
+            'expiresIn': expiration,
+            'canManageBuckets': True,
+            'canReadAllFileUploads': False,
+            'canPurgeTrash': False,
+            'canManageTokens': True,
+            'componentAccess': ['componentAccess'],
+            'bucketPermissions': {"*": "read"}
+        }
+
+        rsp_token = await self.post_raw(f'projects/{project_id}/tokens', headers=hdr_token, json=data_token)
+        sc_token, js_token = response_splitter(rsp_token)
+
+        if sc_token == 201:
+            return js_token
+
+        else:
+            raise AsyncClientError(f"Unable to create storage token in project {project_id} in stack "
+                                   f"{self.parameters.region}.\nReceived: {sc_token} - {js_token}.")
+
+    async def get_organization_users(self) -> list:
+
+        rsp_org_users = await self.get_raw(f'organizations/{self.parameters.organization}/users')
+        sc_org_users, js_org_users = response_splitter(rsp_org_users)
+
+        if sc_org_users == 200:
+            return js_org_users
+
+        else:
+            raise AsyncClientError(f"Could not download organization users for organization "
+                                   f"{self.parameters.organization} in stack {self.parameters.region}.\n"
+                                   f"Received: {sc_org_users} - {js_org_users}.")
+
+
+class AsyncSchedulerClient(AsyncHttpClient):
+    LIMIT = 1000
+
+    def __init__(self, region: str, token: str, project: str, pool: AsyncClientPool):
+
+        _default_header = {'x-storageapi-token': token}
+        _url = KEBOOLA_API_URLS['scheduler'].format(REGION=region)
+
+        logging.debug(f"Scheduler URL set to: {_url}")
+
+        super().__init__(base_url=_url, pool=pool, default_http_header=_default_header)
+        self.parameters = SAPIParameters(token, region, project)
+
+    async def get_schedules(self, **kwargs) -> list:
+        return await self._get_paged_schedules(**kwargs)
+
+    def iter_schedules(self, **kwargs) -> AsyncIterator[dict]:
+        return self._iter_paged_schedules(**kwargs)
+
+    async def _get_paged_schedules(self, **kwargs) -> list:
+
+        return [schedule async for schedule in self._iter_paged_schedules(**kwargs)]
+
+    def _iter_paged_schedules(self, **kwargs) -> AsyncIterator[dict]:
+
+        return self._iter_pages('schedules', OffsetPager(kwargs, self.LIMIT), 'schedules')
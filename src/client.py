@@ -1,12 +1,32 @@
+import io
 import logging
 import sys
+import threading
+import time
 from dataclasses import dataclass
+from functools import partial
 from json import JSONDecodeError
+from typing import Callable, Iterator
+from urllib.parse import urlsplit
 
+import ijson
 import requests
 from keboola.http_client import HttpClient
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from executor import SingleFlightMemo
+from http_cache import build_cache_key, build_response
+from json_codec import loads_response
+from metrics import METRICS, endpoint_name
+from paging import EVENTS_LIMIT, QUEUE_WAITING_JOBS_PARAMS, WAITING_JOBS_QUERY, EventsPager, JobsPager, OffsetPager, \
+    Pager, QueueJobsPager, get_queue_transformation_jobs_params, get_tables_params, get_table_load_events_params, \
+    get_transformation_jobs_query, get_workspace_load_events_params, split_run_ids
+from parser import project_object
+from rate_limit import MAX_RETRY_AFTER, RateLimiters, get_retry_after
 
 DEFAULT_TOKEN_EXPIRATION = 26 * 60 * 60  # Default token expiration set to 26 hours
+THROTTLED_MAX_RETRIES = 8  # Maximum number of retries of a request throttled by the API
 
 KEBOOLA_API_URLS = {
     'syrup': 'https://syrup.{REGION}',
@@ -38,14 +58,229 @@ def response_splitter(response: requests.models.Response):
 
     else:
         try:
-            return response.status_code, response.json()
+            return response.status_code, loads_response(response)
         except JSONDecodeError as e:
             logging.error(f"Cannot parse response : {response.text} from: {response.request.path_url}")
             raise e
 
 
-class StorageClient(HttpClient):
+def get_cache_scope(parameters) -> str:
+    """
+    Returns the project or organization, to which cached responses of a client belong.
+    """
+
+    if isinstance(parameters, ManAPIParameters):
+        return f'organization:{parameters.organization}'
+
+    return f'project:{parameters.project}'
+
+
+def is_token_verified(response: requests.Response, parameters) -> bool:
+    """
+    Returns `True`, if the `tokens/verify` response proves, that the token has access to the project of
+    `parameters`. Management tokens are not bound to an organization, they only need to be valid.
+    """
+
+    if response.status_code != 200:
+        return False
+
+    if isinstance(parameters, ManAPIParameters):
+        return True
+
+    _, js_verify = response_splitter(response)
+
+    return str((js_verify.get('owner') or {}).get('id')) == str(parameters.project)
+
+
+class KeboolaHttpClient(HttpClient):
+    """
+    Base of all API clients. GET requests go through the response cache and the conditional requests cache, if they
+    are set. Requests are limited per host by `rate_limiters` and every request sent is recorded in run metrics.
+    """
+
+    response_cache = None
+    conditional_cache = None
+    rate_limiters = RateLimiters()
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+
+        # Requests are sent from worker threads as well, so the project is taken when the client is created
+        self.metrics_project = METRICS.current_project
+
+    def _request_raw(self, method: str, endpoint_path: str = None, **kwargs) -> requests.Response:
+        """
+        Sends the request through the rate limiter of its host. Throttled requests are retried after the time
+        requested by the server, or with an exponential backoff, up to `THROTTLED_MAX_RETRIES` times.
+        """
+
+        _url = self._build_url(endpoint_path, kwargs.get('is_absolute_path', False))
+        limiter = self.rate_limiters.get(urlsplit(_url).netloc)
+
+        for attempt in range(THROTTLED_MAX_RETRIES + 1):
+            with limiter.slot():
+                rsp = self._send_request(method, endpoint_path, **kwargs)
+                retry_after = get_retry_after(rsp, min(self.backoff_factor * 2 ** attempt, MAX_RETRY_AFTER))
+                limiter.on_response(retry_after)
+
+            if retry_after is None or attempt == THROTTLED_MAX_RETRIES:
+                break
+
+            logging.warning(f"Request to {_url} was throttled with status {rsp.status_code}, retrying in "
+                            f"{retry_after:.1f} seconds.")
+            METRICS.record_retry(endpoint_name(type(self).__name__, endpoint_path), self.metrics_project)
+            rsp.close()
+
+        return rsp
+
+    def _requests_retry_session(self, session: requests.Session = None) -> requests.Session:
+        """
+        Same as in `HttpClient`, except throttled responses are returned instead of being retried by `urllib3`,
+        so that they are retried by `_request_raw` through the rate limiter.
+        """
+
+        session = session or requests.Session()
+        retry = Retry(total=self.max_retries, read=self.max_retries, connect=self.max_retries,
+                      backoff_factor=self.backoff_factor, status_forcelist=self.status_forcelist,
+                      allowed_methods=self.allowed_methods, respect_retry_after_header=False)
+        adapter = HTTPAdapter(max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        return session
+
+    def _send_request(self, method: str, endpoint_path: str = None, **kwargs) -> requests.Response:
+
+        start = time.perf_counter()
+        rsp = super()._request_raw(method, endpoint_path, **kwargs)
+        seconds = time.perf_counter() - start
+
+        # Streamed bodies are not read here, their size is taken from the headers
+        if kwargs.get('stream', False) is True:
+            payload_bytes = int(rsp.headers.get('Content-Length') or 0)
+        else:
+            payload_bytes = len(rsp.content)
+
+        _retry = getattr(rsp.raw, 'retries', None)
+        retries = len(getattr(_retry, 'history', None) or ())
+
+        METRICS.record_request(endpoint_name(type(self).__name__, endpoint_path), seconds, rsp.status_code,
+                               payload_bytes, retries, self.metrics_project)
+
+        return rsp
+
+    def get_raw(self, endpoint_path: str = None, params: dict = None, headers: dict = None,
+                is_absolute_path: bool = False, cookies=None, ignore_auth: bool = False, **kwargs) -> requests.Response:
+
+        _get_raw = partial(super().get_raw, endpoint_path, params=params, is_absolute_path=is_absolute_path,
+                           cookies=cookies, ignore_auth=ignore_auth, **kwargs)
+
+        if self.response_cache is None and self.conditional_cache is None:
+            return _get_raw(headers=headers)
+
+        _url = self._build_url(endpoint_path, is_absolute_path)
+        _params = {**(params or {}), **(self._default_params or {})}
+        _key = self._build_cache_key(_url, _params)
+        _stream = kwargs.get('stream', False) is True
+        _conditional = self.conditional_cache is not None and self.conditional_cache.is_cached(endpoint_path or '')
+
+        if self.response_cache is not None:
+            cached_rsp = self.response_cache.get(_key, endpoint_path or '')
+
+            if cached_rsp is not None and self._has_cache_access():
+                _request = requests.Request('GET', _url, params=_params).prepare()
+                return build_response(*cached_rsp, _url, _request, stream=_stream)
+
+        if _conditional and _stream is False:
+            rsp = self._get_raw_conditional(_get_raw, _key, headers)
+        else:
+            rsp = _get_raw(headers=headers)
+
+        if self.response_cache is not None and rsp.status_code == 200:
+            body_read = self.response_cache.store(_key, endpoint_path or '', rsp)
+
+            if _stream and body_read:
+                rsp.raw = io.BytesIO(rsp.content)
+
+        return rsp
+
+    def _build_cache_key(self, url: str, params: dict) -> str:
+
+        _url = urlsplit(url)
+        return build_cache_key(_url.netloc, get_cache_scope(self.parameters), _url.path, params)
+
+    def _get_token_verifier(self) -> 'KeboolaHttpClient':
+        """
+        Returns the client, which verifies the token of this client, all clients except for the management client
+        use Storage API tokens.
+        """
+
+        verifier = StorageClient(self.parameters.region, self.parameters.token, self.parameters.project)
+        verifier.metrics_project = self.metrics_project
+
+        return verifier
+
+    def _has_cache_access(self) -> bool:
+        """
+        Cached responses are shared by all tokens of a project, so the token is verified to have access to the
+        project, before a cached response is served to it for the first time in the run.
+        """
+
+        credentials = build_cache_key(self.parameters.region, get_cache_scope(self.parameters), 'tokens/verify',
+                                      self._default_header)
+        verified = self.response_cache.is_verified(credentials)
+
+        if verified is None:
+            # Sent without the caches, verification must not be served from the cache itself
+            rsp_verify = self._get_token_verifier()._request_raw('GET', 'tokens/verify')
+            verified = is_token_verified(rsp_verify, self.parameters)
+            self.response_cache.set_verified(credentials, verified)
+
+            if not verified:
+                logging.warning(f"Token could not be verified for {get_cache_scope(self.parameters)}, cached "
+                                f"responses are not used.")
+
+        return verified
+
+    def _get_raw_conditional(self, get_raw: Callable, key: str, headers: dict = None) -> requests.Response:
+
+        cache = self.conditional_cache
+        rsp = get_raw(headers={**(headers or {}), **cache.get_validators(key)})
+
+        if rsp.status_code == 304:
+            cached_rsp = cache.build_response(key, rsp)
+
+            if cached_rsp is not None:
+                return cached_rsp
+
+            rsp = get_raw(headers=headers)
+
+        if rsp.status_code == 200:
+            cache.store(key, rsp)
+
+        return rsp
+
+    def _iter_pages(self, endpoint_path: str, pager: Pager, description: str) -> Iterator[dict]:
+        """
+        Yields items of a paged listing page by page, so only a single page is held in memory at a time.
+        """
+
+        for params in pager:
+            rsp_page = self.get_raw(endpoint_path, params=params)
+            sc_page, js_page = response_splitter(rsp_page)
+
+            if sc_page != 200:
+                logging.error(f"Could not download {description} for project {self.parameters.project} in stack "
+                              f"{self.parameters.region}.\nReceived: {sc_page} - {js_page}.")
+                sys.exit(1)
+
+            yield from pager.add_page(js_page)
+
+
+class StorageClient(KeboolaHttpClient):
     LIMIT = 100
+    EVENTS_LIMIT = EVENTS_LIMIT
 
     def __init__(self, region: str, token: str, project: str):
 
@@ -57,6 +292,9 @@ class StorageClient(HttpClient):
         super().__init__(base_url=_url, default_http_header=_default_header)
         self.parameters = SAPIParameters(token, region, project)
 
+    def _get_token_verifier(self) -> KeboolaHttpClient:
+        return self
+
     def verify_storage_token(self) -> bool:
 
         rsp_verify = self.get_raw('tokens/verify')
@@ -113,6 +351,23 @@ class StorageClient(HttpClient):
                           f"stack {self.parameters.region}.\nReceived: {sc_configs} - {js_configs}.")
             sys.exit(1)
 
+    def get_components(self, component_type: str = None) -> list:
+
+        par_components = {}
+        if component_type is not None:
+            par_components['componentType'] = component_type
+
+        rsp_components = self.get_raw('components', params=par_components)
+        sc_components, js_components = response_splitter(rsp_components)
+
+        if sc_components == 200:
+            return js_components
+
+        else:
+            logging.error(f"Could not download components for project {self.parameters.project} in "
+                          f"stack {self.parameters.region}.\nReceived: {sc_components} - {js_components}.")
+            sys.exit(1)
+
     def get_orchestrations(self) -> list:
 
         return self.get_component_configurations('orchestrator')
@@ -136,12 +391,7 @@ class StorageClient(HttpClient):
 
     def get_all_tables(self, include: bool = True) -> list:
 
-        if include:
-            par_tables = {'include': 'metadata,buckets,columns,columnMetadata'}
-        else:
-            par_tables = {}
-
-        rsp_tables = self.get_raw('tables', params=par_tables)
+        rsp_tables = self.get_raw('tables', params=get_tables_params(include))
         sc_tables, js_tables = response_splitter(rsp_tables)
 
         if sc_tables == 200:
@@ -152,6 +402,29 @@ class StorageClient(HttpClient):
                           f"{self.parameters.region}.\nReceived: {sc_tables} - {js_tables}.")
             sys.exit(1)
 
+    def iter_all_tables(self, include: bool = True, projection: dict = None) -> Iterator[dict]:
+        """
+        Streams the tables listing and yields tables one by one, without decoding the whole response at once.
+        If `projection` is specified, only the projected fields of each table are kept (see `build_projection`).
+        """
+
+        rsp_tables = self.get_raw('tables', params=get_tables_params(include), stream=True)
+
+        if rsp_tables.status_code != 200:
+            sc_tables, js_tables = response_splitter(rsp_tables)
+            logging.error(f"Could not download storage tables for project {self.parameters.project} in stack "
+                          f"{self.parameters.region}.\nReceived: {sc_tables} - {js_tables}.")
+            sys.exit(1)
+
+        rsp_tables.raw.decode_content = True
+
+        with rsp_tables:
+            for table in ijson.items(rsp_tables.raw, 'item', use_float=True):
+                if projection is not None:
+                    table = project_object(table, projection)
+
+                yield table
+
     def get_triggers(self) -> list:
 
         rsp_triggers = self.get_raw('triggers')
@@ -181,62 +454,46 @@ class StorageClient(HttpClient):
                           f"Received: {sc_events} - {js_events}.")
             return []
 
-    def get_workspace_load_events(self, **kwargs):
+    def get_workspace_load_events(self, **kwargs) -> list:
 
-        kwargs['component'] = 'storage'
-        kwargs['q'] = 'event:storage.workspaceLoaded'
+        return list(self.iter_workspace_load_events(**kwargs))
 
-        return self._get_paged_events('events', **kwargs)
+    def iter_workspace_load_events(self, **kwargs) -> Iterator[dict]:
 
-    def get_table_load_events(self, table_id: str, date: str, **kwargs):
+        return self._iter_paged_events('events', **get_workspace_load_events_params(**kwargs))
 
-        TABLE_LOAD_EVENTS = ['storage.tableExported', 'storage.tableImportError', 'storage.tableImportStarted',
-                             'storage.tableImportDone', 'storage.workspaceLoaded', 'storage.workspaceTableCloned']
+    def get_workspace_load_events_for_runs(self, run_ids: list, **kwargs) -> list:
 
-        kwargs['component'] = 'storage'
-        kwargs['q'] = f"({' OR '.join([f'event:{e}' for e in TABLE_LOAD_EVENTS])}) AND created:>={date}"
+        return self._get_paged_events('events', **get_workspace_load_events_params(run_ids, **kwargs))
 
-        return self._get_paged_events(f'tables/{table_id}/events', **kwargs)
+    split_run_ids = staticmethod(split_run_ids)
 
-    def _get_paged_events(self, url: str, **kwargs):
+    def get_table_load_events(self, table_id: str, date: str, since_id: int = None, **kwargs) -> list:
 
-        par_events = kwargs
-        par_events['limit'] = 1000
+        return list(self.iter_table_load_events(table_id, date, since_id, **kwargs))
 
-        offset = 0
-        is_complete = False
-        all_events = []
-        max_id = 0
+    def iter_table_load_events(self, table_id: str, date: str, since_id: int = None, **kwargs) -> Iterator[dict]:
+        """
+        Yields load events of the table created since `date`, only events newer than `since_id`, if it is set.
+        """
 
-        while not is_complete:
-            par_events['offset'] = 0
-            if max_id:
-                par_events.pop('offset', None)
-                par_events['maxId'] = offset
+        params = get_table_load_events_params(date, since_id, **kwargs)
 
-            rsp_events = self.get_raw(url, params=par_events)
-            sc_events, js_events = response_splitter(rsp_events)
+        return self._iter_paged_events(f'tables/{table_id}/events', **params)
 
-            if sc_events == 200:
+    def _get_paged_events(self, url: str, **kwargs) -> list:
 
-                all_events += js_events
-                if js_events and max_id != js_events[-1:][0]['id']:
-                    max_id = js_events[-1:][0]['id']
+        return list(self._iter_paged_events(url, **kwargs))
 
-                if not js_events or max_id == js_events[-1:][0]['id']:
-                    is_complete = True
-                    return all_events
+    def _iter_paged_events(self, url: str, **kwargs) -> Iterator[dict]:
 
-            else:
-                logging.error(f"Could not download events for url {url} in project {self.parameters.project} ",
-                              f"in stack {self.parameters.region}.\nReceived: {sc_events} - {js_events}.")
-                sys.exit(1)
+        return self._iter_pages(url, EventsPager(kwargs, self.EVENTS_LIMIT), f'events for url {url}')
 
 
-class SyrupClient(HttpClient):
+class SyrupClient(KeboolaHttpClient):
     LIMIT = 1000
 
-    def __init__(self, region: str, token: str, project: str):
+    def __init__(self, region: str, token: str, project: str, keyset_pagination: bool = False):
 
         _default_header = {'x-storageapi-token': token}
         _url = KEBOOLA_API_URLS['syrup'].format(REGION=region)
@@ -246,57 +503,38 @@ class SyrupClient(HttpClient):
         super().__init__(base_url=_url, default_http_header=_default_header, status_forcelist=(500, 502, 504),
                          max_retries=2)
         self.parameters = SAPIParameters(token, region, project)
+        self.keyset_pagination = keyset_pagination
 
     def get_waiting_and_processing_jobs(self) -> list:
 
-        par_jobs = {'q': 'status:waiting OR status:processing'}
-        return self._get_paged_jobs(**par_jobs)
-
-    def get_transformation_jobs(self, last_job_id: str = None, **kwargs) -> list:
-
-        q = '(component:transformation OR params.component:transformation)'
-        # ' AND -(status:processing OR status:waiting OR status:terminating)'
-
-        if last_job_id is not None:
-            q += f' AND id:>{last_job_id}'
-            logging.debug(f"Downloading transformations jobs since last job id {last_job_id}.")
-        else:
-            q += ' AND createdTime:>now-7d'
-            logging.debug("Downloading transformations jobs created in the last 7 days.")
+        return list(self.iter_waiting_and_processing_jobs())
 
-        kwargs['q'] = q
+    def iter_waiting_and_processing_jobs(self) -> Iterator[dict]:
 
-        return self._get_paged_jobs(**kwargs)
+        return self._iter_paged_jobs(q=WAITING_JOBS_QUERY)
 
-    def _get_paged_jobs(self, **kwargs) -> list:
+    def get_transformation_jobs(self, last_job_id: str = None, oldest_first: bool = False, **kwargs) -> list:
+        """
+        Jobs are listed newest first. Since the whole listing is needed to reverse it, callers which need the jobs
+        in chronological order should use `oldest_first` instead of the iterator variant.
+        """
 
-        par_jobs = kwargs
-        par_jobs['limit'] = self.LIMIT
+        kwargs['q'] = get_transformation_jobs_query(last_job_id)
 
-        offset = 0
-        is_complete = False
-        all_jobs = []
+        jobs = self._get_paged_jobs(**kwargs)
 
-        while is_complete is False:
-            par_jobs['offset'] = offset
+        if oldest_first:
+            jobs.reverse()
 
-            rsp_jobs = self.get_raw('queue/jobs', params=par_jobs)
-            sc_jobs, js_jobs = response_splitter(rsp_jobs)
+        return jobs
 
-            if sc_jobs == 200:
-                all_jobs += js_jobs
+    def _get_paged_jobs(self, **kwargs) -> list:
 
-                if len(js_jobs) < self.LIMIT:
-                    is_complete = True
-                    return all_jobs
+        return list(self._iter_paged_jobs(**kwargs))
 
-                else:
-                    offset += self.LIMIT
+    def _iter_paged_jobs(self, **kwargs) -> Iterator[dict]:
 
-            else:
-                logging.error(f"Could not download jobs for project {self.parameters.project} in stack "
-                              f"{self.parameters.region}.\nReceived: {sc_jobs} - {js_jobs}.")
-                sys.exit(1)
+        return self._iter_pages('queue/jobs', JobsPager(kwargs, self.LIMIT, self.keyset_pagination), 'jobs')
 
     def get_orchestrations(self) -> list:
 
@@ -326,7 +564,7 @@ class SyrupClient(HttpClient):
             sys.exit(1)
 
 
-class NotificationClient(HttpClient):
+class NotificationClient(KeboolaHttpClient):
     LIMIT = 1000
 
     def __init__(self, region: str, token: str, project: str):
@@ -342,41 +580,22 @@ class NotificationClient(HttpClient):
     def get_notifications(self, **kwargs) -> list:
         return self._get_paged_notification(**kwargs)
 
-    def _get_paged_notification(self, **kwargs) -> list:
-
-        par_notifications = kwargs
-        par_notifications['limit'] = self.LIMIT
-
-        offset = 0
-        is_complete = False
-        all_notifications = []
-
-        while is_complete is False:
-            par_notifications['offset'] = offset
+    def iter_notifications(self, **kwargs) -> Iterator[dict]:
+        return self._iter_paged_notification(**kwargs)
 
-            rsp_notifications = self.get_raw('project-subscriptions', params=par_notifications)
-            sc_notifications, js_notifications = response_splitter(rsp_notifications)
-
-            if sc_notifications == 200:
-                all_notifications += js_notifications
+    def _get_paged_notification(self, **kwargs) -> list:
 
-                if len(js_notifications) < self.LIMIT:
-                    is_complete = True
-                    return all_notifications
+        return list(self._iter_paged_notification(**kwargs))
 
-                else:
-                    offset += self.LIMIT
+    def _iter_paged_notification(self, **kwargs) -> Iterator[dict]:
 
-            else:
-                logging.error(f"Could not download subscriptions for project {self.parameters.project} in stack "
-                              f"{self.parameters.region}.\nReceived: {all_notifications} - {js_notifications}.")
-                sys.exit(1)
+        return self._iter_pages('project-subscriptions', OffsetPager(kwargs, self.LIMIT), 'subscriptions')
 
 
-class QueueClient(HttpClient):
+class QueueClient(KeboolaHttpClient):
     LIMIT = 1000
 
-    def __init__(self, region: str, token: str, project: str):
+    def __init__(self, region: str, token: str, project: str, keyset_pagination: bool = False):
 
         _default_header = {'x-storageapi-token': token}
         _url = KEBOOLA_API_URLS['queue'].format(REGION=region)
@@ -385,60 +604,53 @@ class QueueClient(HttpClient):
 
         super().__init__(base_url=_url, default_http_header=_default_header)
         self.parameters = SAPIParameters(token, region, project)
+        self.keyset_pagination = keyset_pagination
 
     def get_waiting_and_processing_jobs(self) -> list:
 
-        par_jobs = {'q': 'status:waiting OR status:processing'}
-        return self._get_paged_jobs(**par_jobs)
+        return list(self.iter_waiting_and_processing_jobs())
 
-    def get_transformation_jobs(self, last_job_id: str = None, **kwargs) -> list:
+    def iter_waiting_and_processing_jobs(self) -> Iterator[dict]:
 
-        q = '(component:transformation OR params.component:transformation)'
-        # ' AND -(status:processing OR status:waiting OR status:terminating)'
+        if self.keyset_pagination:
+            return self._iter_paged_jobs(**QUEUE_WAITING_JOBS_PARAMS)
 
-        if last_job_id is not None:
-            q += f' AND id:>{last_job_id}'
-            logging.debug(f"Downloading transformations jobs since last job id {last_job_id}.")
-        else:
-            q += ' AND createdTime:>now-7d'
-            logging.debug("Downloading transformations jobs created in the last 7 days.")
-
-        kwargs['q'] = q
+        return self._iter_paged_jobs(q=WAITING_JOBS_QUERY)
 
-        return self._get_paged_jobs(**kwargs)
+    def get_transformation_jobs(self, last_job_id: str = None, oldest_first: bool = False, **kwargs) -> list:
+        """
+        Jobs are listed newest first. Since the whole listing is needed to reverse it, callers which need the jobs
+        in chronological order should use `oldest_first` instead of the iterator variant.
+        """
 
-    def _get_paged_jobs(self, **kwargs) -> list:
+        if self.keyset_pagination:
+            kwargs.update(get_queue_transformation_jobs_params(last_job_id))
+            jobs = self._get_paged_jobs(since_id=last_job_id, **kwargs)
 
-        par_jobs = kwargs
-        par_jobs['limit'] = self.LIMIT
+        else:
+            kwargs['q'] = get_transformation_jobs_query(last_job_id)
+            jobs = self._get_paged_jobs(**kwargs)
 
-        offset = 0
-        is_complete = False
-        all_jobs = []
+        if oldest_first:
+            jobs.reverse()
 
-        while is_complete is False:
-            par_jobs['offset'] = offset
+        return jobs
 
-            rsp_jobs = self.get_raw('jobs', params=par_jobs)
-            sc_jobs, js_jobs = response_splitter(rsp_jobs)
+    def _get_paged_jobs(self, **kwargs) -> list:
 
-            if sc_jobs == 200:
-                all_jobs += js_jobs
+        return list(self._iter_paged_jobs(**kwargs))
 
-                if len(js_jobs) < self.LIMIT:
-                    is_complete = True
-                    return all_jobs
+    def _iter_paged_jobs(self, since_id: str = None, **kwargs) -> Iterator[dict]:
 
-                else:
-                    offset += self.LIMIT
+        if self.keyset_pagination:
+            pager = QueueJobsPager(kwargs, self.LIMIT, since_id)
+        else:
+            pager = JobsPager(kwargs, self.LIMIT)
 
-            else:
-                logging.error(f"Could not download jobs for project {self.parameters.project} in stack "
-                              f"{self.parameters.region}.\nReceived: {sc_jobs} - {js_jobs}.")
-                sys.exit(1)
+        return self._iter_pages('jobs', pager, 'jobs')
 
 
-class ManagementClient(HttpClient):
+class ManagementClient(KeboolaHttpClient):
 
     def __init__(self, region: str, token: str, organization: str):
 
@@ -449,6 +661,9 @@ class ManagementClient(HttpClient):
         self.parameters = ManAPIParameters(token, region, organization)
         self.verify_token()
 
+    def _get_token_verifier(self) -> KeboolaHttpClient:
+        return self
+
     def verify_token(self) -> None:
 
         rsp_verify = self.get_raw('tokens/verify')
@@ -536,7 +751,7 @@ class ManagementClient(HttpClient):
             sys.exit(1)
 
 
-class SchedulerClient(HttpClient):
+class SchedulerClient(KeboolaHttpClient):
     LIMIT = 1000
 
     def __init__(self, region: str, token: str, project: str):
@@ -552,53 +767,90 @@ class SchedulerClient(HttpClient):
     def get_schedules(self, **kwargs) -> list:
         return self._get_paged_schedules(**kwargs)
 
+    def iter_schedules(self, **kwargs) -> Iterator[dict]:
+        return self._iter_paged_schedules(**kwargs)
+
     def _get_paged_schedules(self, **kwargs) -> list:
 
-        par_schedules = kwargs
-        par_schedules['limit'] = self.LIMIT
+        return list(self._iter_paged_schedules(**kwargs))
 
-        offset = 0
-        is_complete = False
-        all_jobs = []
+    def _iter_paged_schedules(self, **kwargs) -> Iterator[dict]:
 
-        while is_complete is False:
-            par_schedules['offset'] = offset
+        return self._iter_pages('schedules', OffsetPager(kwargs, self.LIMIT), 'schedules')
 
-            rsp_schedules = self.get_raw('schedules', params=par_schedules)
-            sc_schedules, js_schedules = response_splitter(rsp_schedules)
 
-            if sc_schedules == 200:
-                all_jobs += js_schedules
+class Client:
+    PROJECT_CLIENTS = ('syrup', 'storage', 'notification', 'queue', 'schedule', 'memo')
 
-                if len(js_schedules) < self.LIMIT:
-                    is_complete = True
-                    return all_jobs
+    def __init__(self, asynchronous: bool = False, keyset_job_pagination: bool = False):
+        self.asynchronous = asynchronous
+        self.keyset_job_pagination = keyset_job_pagination
+        self.async_pool = None
+        self.management = None
+        self._project_clients = threading.local()
 
-                else:
-                    offset += self.LIMIT
+    def __getattr__(self, name):
+        # Project clients are kept per thread, so several projects can be extracted concurrently.
+        if name in self.PROJECT_CLIENTS:
+            return getattr(self._project_clients, name, None)
 
-            else:
-                logging.error(f"Could not download jobs for project {self.parameters.project} in stack "
-                              f"{self.parameters.region}.\nReceived: {sc_schedules} - {js_schedules}.")
-                sys.exit(1)
+        raise AttributeError(name)
 
+    def get_async_pool(self):
 
-class Client:
+        if self.async_pool is None:
+            # aiohttp is only required, when the asynchronous clients are used
+            from async_client import AsyncClientPool
+            self.async_pool = AsyncClientPool()
 
-    def __init__(self):
-        self.management = None
-        self.syrup = None
-        self.storage = None
-        self.notification = None
-        self.queue = None
-        self.schedule = None
+        return self.async_pool
 
     def init_storage_and_syrup_clients(self, region, token, project):
-        self.storage = StorageClient(region, token, project)
-        self.syrup = SyrupClient(region, token, project)
-        self.notification = NotificationClient(region, token, project)
-        self.queue = QueueClient(region, token, project)
-        self.schedule = SchedulerClient(region, token, project)
+
+        # Payloads shared by several datasets of the project are downloaded once, see `close_project`
+        self._project_clients.memo = SingleFlightMemo()
+
+        if self.asynchronous:
+            from async_client import AsyncNotificationClient, AsyncQueueClient, AsyncSchedulerClient, \
+                AsyncStorageClient, AsyncSyrupClient, SyncClient
+
+            # Asynchronous clients are handed out behind synchronous views, their requests share one event loop and
+            # connection pool
+            pool = self.get_async_pool()
+            self._project_clients.storage = SyncClient(AsyncStorageClient(region, token, project, pool))
+            self._project_clients.syrup = SyncClient(AsyncSyrupClient(region, token, project, pool,
+                                                                      self.keyset_job_pagination))
+            self._project_clients.notification = SyncClient(AsyncNotificationClient(region, token, project, pool))
+            self._project_clients.queue = SyncClient(AsyncQueueClient(region, token, project, pool,
+                                                                      self.keyset_job_pagination))
+            self._project_clients.schedule = SyncClient(AsyncSchedulerClient(region, token, project, pool))
+
+        else:
+            self._project_clients.storage = StorageClient(region, token, project)
+            self._project_clients.syrup = SyrupClient(region, token, project, self.keyset_job_pagination)
+            self._project_clients.notification = NotificationClient(region, token, project)
+            self._project_clients.queue = QueueClient(region, token, project, self.keyset_job_pagination)
+            self._project_clients.schedule = SchedulerClient(region, token, project)
 
     def init_management_client(self, region, token, organization):
-        self.management = ManagementClient(region, token, organization)
+
+        if self.asynchronous:
+            from async_client import AsyncManagementClient, SyncClient
+
+            self.management = SyncClient(AsyncManagementClient(region, token, organization, self.get_async_pool()))
+            self.management.verify_token()
+
+        else:
+            self.management = ManagementClient(region, token, organization)
+
+    def close_project(self):
+
+        if getattr(self._project_clients, 'memo', None) is not None:
+            self._project_clients.memo.clear()
+            self._project_clients.memo = None
+
+    def close(self):
+
+        if self.async_pool is not None:
+            self.async_pool.close()
+            self.async_pool = None
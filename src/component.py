@@ -1,23 +1,42 @@
+import copy
 import csv
+import io
+import json
 import logging
+import multiprocessing
+import os
 import sys
+import threading
 import time
-from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass
 from hashlib import md5
 from pathlib import Path
+from typing import Iterable, Iterator
 
 import dateparser
 import dateutil.parser
 import requests
 from keboola.component import CommonInterface
 
-from client import Client, StorageClient
-from parser import FlattenJsonParser
-from result import Writer
+from client import Client, KeboolaHttpClient, StorageClient
+from executor import OrderedStage, SingleFlightMemo, bounded_ordered_map, bounded_unordered_map
+from fingerprint import DatasetFingerprint
+from http_cache import ConditionalCache, ResponseCache
+from json_codec import get_encoder
+from metrics import METRICS
+from parser import FlattenJsonParser, KeyedIndex, build_projection
+from pk_index import PrimaryKeyIndex
+from profiler import DatasetProfiler
+from rate_limit import RateLimiters
+from result import ParquetSink, Writer
 from table_definitions import *  # noqa
+from transformation_rows import encode_code_blocks, encode_queries
+from watermarks import decode_watermarks, encode_watermarks
 
 # Key for current stack selection
+STORAGE_BUCKETS_TABLE = 'storage_buckets'
 STORAGE_BUCKET_COLUMNS = ["project_id", "region", "uri",
                           "id",
                           "name",
@@ -52,6 +71,12 @@ STORAGE_BUCKET_COLUMNS = ["project_id", "region", "uri",
                           "sharedBy__date",
                           "attributes"]
 KEY_CURRENT = 'current'
+PARQUET_FILE_TAGS = ['kbc-project-metadata', 'parquet']
+METRICS_FILE_NAME = 'run_metrics.json'
+METRICS_FILE_TAGS = ['kbc-project-metadata', 'run-metrics']
+METRICS_TABLE = 'run-metrics'
+PROFILE_FILE_TAGS = ['kbc-project-metadata', 'profile']
+PROFILE_STACKS_FILE_NAME = 'profile_stacks.collapsed'
 
 APP_VERSION = '2.0.3'
 TOKEN_SUFFIX = '_Telemetry_token'
@@ -61,6 +86,29 @@ KEY_TOKENS = 'tokens'
 KEY_MASTERTOKEN = 'master_token'
 KEY_DATASETS = 'datasets'
 KEY_INCREMENTAL = 'incremental_load'
+KEY_MAX_PARALLEL_PROJECTS = 'max_parallel_projects'
+KEY_TABLE_EVENTS_CONCURRENCY = 'table_events_concurrency'
+KEY_BATCH_WORKSPACE_LOAD_EVENTS = 'batch_workspace_load_events'
+KEY_CONDITIONAL_REQUESTS_CACHE_MB = 'conditional_requests_cache_mb'
+KEY_RESPONSE_CACHE_PATH = 'response_cache_path'
+KEY_RESPONSE_CACHE_TTL = 'response_cache_ttl'
+KEY_RESPONSE_CACHE_MAX_MB = 'response_cache_max_mb'
+KEY_TOKEN_PREFLIGHT_CONCURRENCY = 'token_preflight_concurrency'
+KEY_DISCOVER_TRANSFORMATIONS_V2 = 'discover_transformations_v2'
+KEY_FLATTEN_PROCESSES = 'flatten_processes'
+KEY_PARQUET_DATASETS = 'parquet_datasets'
+KEY_SLICED_OUTPUT = 'sliced_output'
+KEY_METRICS_FILE = 'metrics_file'
+KEY_METRICS_TABLE = 'metrics_table'
+KEY_PROFILE_DATASETS = 'profile_datasets'
+KEY_MAX_REQUESTS_PER_SECOND = 'max_requests_per_second'
+KEY_MAX_CONCURRENT_REQUESTS = 'max_concurrent_requests'
+KEY_JSON_ENCODER = 'json_encoder'
+KEY_KEYSET_JOB_PAGINATION = 'keyset_job_pagination'
+KEY_SKIP_UNCHANGED_TABLES = 'skip_unchanged_tables'
+KEY_SKIP_UNCHANGED_DATASETS = 'skip_unchanged_datasets'
+KEY_DEDUPLICATE_TABLES = 'deduplicate_tables'
+KEY_ASYNCHRONOUS_CLIENTS = 'asynchronous_clients'
 
 MANDATORY_PARAMS = [[KEY_TOKENS, KEY_MASTERTOKEN], KEY_DATASETS]
 
@@ -94,12 +142,34 @@ TR_V2_CMP_ID = ['keboola.snowflake-transformation', 'keboola.python-transformati
                 'keboola.oracle-transformation', 'keboola.csas-python-transformation-v2',
                 'keboola.databricks-transformation', 'keboola.exasol-transformation',
                 'keboola.python-mlflow-transformation']
+TR_V1_CMP_ID = 'transformation'
+TR_V2_FETCH_WORKERS = 4  # Number of discovered transformation components, whose configurations are fetched at once
+FLATTEN_PENDING_PER_PROCESS = 4  # Number of transformations waiting for a flattening process, bounds memory use
 
 STORAGE_ENDPOINTS = [KEY_GET_ALL_CONFIGURATIONS, KEY_GET_TOKENS, KEY_GET_ORCHESTRATIONS, KEY_GET_WAITING_JOBS,
                      KEY_GET_TABLES, KEY_GET_TRANSFORMATIONS, KEY_GET_TRIGGERS, KEY_GET_WORKSPACE_LOAD_EVENTS,
                      KEY_GET_TRANSFORMATIONS_V2, KEY_GET_TABLES_LOAD_EVENTS, KEY_GET_ORCHESTRATIONS_V2]
 MANAGEMENT_ENDPOINTS = [KEY_GET_PROJECT_USERS, KEY_GET_ORGANIZATION_USERS]
 
+# Fields of configurations used by orchestrations and transformations, configurations taken from the listing of all
+# configurations must have all of them, otherwise configurations of the component are requested separately
+CONFIGURATION_FIELDS = ['id', 'name', 'description', 'created', 'creatorToken', 'version', 'changeDescription',
+                        'isDisabled', 'isDeleted', 'currentVersion', 'configuration', 'rows']
+
+# Default TTLs (in seconds) of the response cache; only listings, which rarely change, are cached. Tokens, buckets
+# and triggers outlive an hourly schedule, so consecutive hourly runs reuse them; configurations and tables change
+# more often, they are only shared by runs within 15 minutes, e.g. by several configurations scheduled together.
+DEFAULT_RESPONSE_CACHE_TTL = {'tokens': 3900, 'buckets': 3900, 'triggers': 3900, 'components': 900,
+                              'components/*/configs': 900, 'tables': 900, 'default': 0}
+
+# Listings revalidated with conditional requests, if the conditional requests cache is enabled. Responses are kept in
+# the state, so events and jobs, which change with every run, are not cached.
+CONDITIONAL_CACHE_ENDPOINTS = ['tokens', 'components', 'components/*/configs', 'triggers', 'buckets', 'schedules']
+CONDITIONAL_CACHE_MAX_MB = 5
+
+# Fields of the tables listing needed by tables, tables-metadata, tables-columns and tables-columns-metadata
+TABLES_LISTING_PROJECTION = build_projection(FIELDS_TABLES + ['metadata', 'columns', 'columnMetadata'])  # noqa: F405
+
 
 class ComponentWriters:
     pass
@@ -112,6 +182,29 @@ class Parameters:
     datasets: list
     incremental: bool
     current_stack: str
+    max_parallel_projects: int = 1
+    table_events_concurrency: object = 1
+    batch_workspace_load_events: bool = False
+    conditional_requests_cache_mb: float = 0
+    response_cache_path: str = ''
+    response_cache_ttl: dict = None
+    response_cache_max_mb: float = 100
+    token_preflight_concurrency: int = 1
+    discover_transformations_v2: bool = False
+    flatten_processes: int = 0
+    parquet_datasets: list = None
+    sliced_output: bool = False
+    metrics_file: bool = False
+    metrics_table: bool = False
+    profile_datasets: bool = False
+    max_requests_per_second: float = 0
+    max_concurrent_requests: int = 0
+    json_encoder: str = 'json'
+    keyset_job_pagination: bool = False
+    skip_unchanged_tables: bool = False
+    skip_unchanged_datasets: bool = False
+    deduplicate_tables: list = None
+    asynchronous_clients: bool = False
 
 
 @dataclass
@@ -138,9 +231,75 @@ class Component(CommonInterface):
 
         self.parameters = Parameters(_par.get(KEY_TOKENS, []), _par.get(KEY_MASTERTOKEN, []),
                                      _par[KEY_DATASETS], bool(_par.get(KEY_INCREMENTAL, False)),
-                                     self.environment_variables.stack_id)
+                                     self.environment_variables.stack_id,
+                                     int(_par.get(KEY_MAX_PARALLEL_PROJECTS, 1)),
+                                     _par.get(KEY_TABLE_EVENTS_CONCURRENCY, 1),
+                                     bool(_par.get(KEY_BATCH_WORKSPACE_LOAD_EVENTS, False)),
+                                     float(_par.get(KEY_CONDITIONAL_REQUESTS_CACHE_MB, 0)),
+                                     _par.get(KEY_RESPONSE_CACHE_PATH, ''),
+                                     _par.get(KEY_RESPONSE_CACHE_TTL, DEFAULT_RESPONSE_CACHE_TTL),
+                                     float(_par.get(KEY_RESPONSE_CACHE_MAX_MB, 100)),
+                                     int(_par.get(KEY_TOKEN_PREFLIGHT_CONCURRENCY, 1)),
+                                     bool(_par.get(KEY_DISCOVER_TRANSFORMATIONS_V2, False)),
+                                     int(_par.get(KEY_FLATTEN_PROCESSES, 0)),
+                                     _par.get(KEY_PARQUET_DATASETS, []),
+                                     bool(_par.get(KEY_SLICED_OUTPUT, False)),
+                                     bool(_par.get(KEY_METRICS_FILE, False)),
+                                     bool(_par.get(KEY_METRICS_TABLE, False)),
+                                     bool(_par.get(KEY_PROFILE_DATASETS, False)),
+                                     float(_par.get(KEY_MAX_REQUESTS_PER_SECOND, 0)),
+                                     int(_par.get(KEY_MAX_CONCURRENT_REQUESTS, 0)),
+                                     _par.get(KEY_JSON_ENCODER, 'json'),
+                                     bool(_par.get(KEY_KEYSET_JOB_PAGINATION, False)),
+                                     bool(_par.get(KEY_SKIP_UNCHANGED_TABLES, False)),
+                                     bool(_par.get(KEY_SKIP_UNCHANGED_DATASETS, False)),
+                                     _par.get(KEY_DEDUPLICATE_TABLES, []),
+                                     bool(_par.get(KEY_ASYNCHRONOUS_CLIENTS, False)))
+
+        if self.parameters.max_parallel_projects < 1:
+            logging.error(f"Parameter {KEY_MAX_PARALLEL_PROJECTS} must be a positive integer.")
+            sys.exit(1)
+
+        self.parameters.table_events_concurrency = self.validate_stack_concurrency(
+            self.parameters.table_events_concurrency, KEY_TABLE_EVENTS_CONCURRENCY)
+
+        self.parquet_sinks = {}
+        self.validate_parquet_datasets()
+
+        self.pk_indexes = {}
+        self.validate_deduplicate_tables()
 
-        self.client = Client()
+        if self.parameters.token_preflight_concurrency < 1:
+            logging.error(f"Parameter {KEY_TOKEN_PREFLIGHT_CONCURRENCY} must be a positive integer.")
+            sys.exit(1)
+
+        if self.parameters.max_requests_per_second < 0 or self.parameters.max_concurrent_requests < 0:
+            logging.error(f"Parameters {KEY_MAX_REQUESTS_PER_SECOND} and {KEY_MAX_CONCURRENT_REQUESTS} must not be "
+                          f"negative.")
+            sys.exit(1)
+
+        try:
+            self.json_encoder = get_encoder(self.parameters.json_encoder)
+
+        except (ImportError, ValueError) as e:
+            logging.error(f"Invalid parameter {KEY_JSON_ENCODER}: {e}")
+            sys.exit(1)
+
+        KeboolaHttpClient.rate_limiters = RateLimiters(self.parameters.max_requests_per_second,
+                                                       self.parameters.max_concurrent_requests)
+
+        self.response_cache = None
+        if self.parameters.response_cache_path:
+            self.response_cache = self.init_response_cache()
+
+        self.flatten_pool = None
+
+        self.profiler = None
+        if self.parameters.profile_datasets:
+            self.profiler = DatasetProfiler()
+
+        self.client = Client(asynchronous=self.parameters.asynchronous_clients,
+                             keyset_job_pagination=self.parameters.keyset_job_pagination)
         self.writers = ComponentWriters
 
         self.parameters.client_to_use = self.determine_token()
@@ -161,10 +320,47 @@ class Component(CommonInterface):
             self.last_processed_transformations = {}
 
         self.latest_date = state.get('date', dateparser.parse("7 months ago").strftime("%Y-%m-%d"))
+
+        self.table_events_watermarks = decode_watermarks(state.get('table_events'))
+
+        self.dataset_fingerprints = state.get('dataset_fingerprints', {})
+        if not isinstance(self.dataset_fingerprints, dict):
+            self.dataset_fingerprints = {}
+
+        self.conditional_cache = None
+        if self.parameters.conditional_requests_cache_mb > 0:
+            if self.parameters.conditional_requests_cache_mb > CONDITIONAL_CACHE_MAX_MB:
+                logging.warning(f"Parameter {KEY_CONDITIONAL_REQUESTS_CACHE_MB} is limited to "
+                                f"{CONDITIONAL_CACHE_MAX_MB} MB, the cache is kept in the state file.")
+                self.parameters.conditional_requests_cache_mb = CONDITIONAL_CACHE_MAX_MB
+
+            _max_bytes = int(self.parameters.conditional_requests_cache_mb * 1024 * 1024)
+            self.conditional_cache = ConditionalCache.from_state(state.get('conditional_cache'), _max_bytes,
+                                                                 CONDITIONAL_CACHE_ENDPOINTS)
+            KeboolaHttpClient.conditional_cache = self.conditional_cache
         self.table_definitions = {}
 
+        # Guards shared run state when projects are extracted concurrently
+        self._state_lock = threading.Lock()
+        self._table_definitions_lock = threading.Lock()
+
         logging.debug(f"Using {self.parameters.client_to_use} token.")
 
+    def init_response_cache(self) -> ResponseCache:
+
+        ttl = self.parameters.response_cache_ttl
+
+        if not isinstance(ttl, dict) or not all(isinstance(v, (int, float)) for v in ttl.values()):
+            logging.error(f"Parameter {KEY_RESPONSE_CACHE_TTL} must be a mapping of endpoints to TTLs in seconds.")
+            sys.exit(1)
+
+        response_cache = ResponseCache(self.parameters.response_cache_path, ttl,
+                                       int(self.parameters.response_cache_max_mb * 1024 * 1024))
+        KeboolaHttpClient.response_cache = response_cache
+
+        logging.info(f"Using response cache {self.parameters.response_cache_path}.")
+        return response_cache
+
     def check_token_permissions(self):
 
         if self.parameters.client_to_use == 'management':
@@ -219,14 +415,6 @@ class Component(CommonInterface):
             logging.exception("Neither master, nor storage token specified.")
             sys.exit(1)
 
-    @staticmethod
-    def _get_object_from_list(object_list: list, search_key: str, search_key_value) -> dict:
-
-        _eval_list = [obj[search_key] == search_key_value for obj in object_list]
-        _idx = _eval_list.index(True)
-
-        return object_list[_idx]
-
     @staticmethod
     def convert_iso_format_to_epoch_timestamp(iso_dt_string: str) -> int:
 
@@ -253,13 +441,13 @@ class Component(CommonInterface):
     def is_token_valid(self, token: str, token_expiration: int, region: str, project: str) -> bool:
 
         is_token_expired = self.is_token_in_treshold(token_expiration)
-        is_token_valid = StorageClient(region=region, project=project, token=token).verify_storage_token()
 
-        if all([is_token_valid, is_token_expired]):
-            return True
-        else:
+        # Tokens about to expire are replaced anyway, so they are not verified
+        if not is_token_expired:
             return False
 
+        return StorageClient(region=region, project=project, token=token).verify_storage_token()
+
     def determine_stack(self, region: str):
 
         if region == 'us-east-1':
@@ -271,8 +459,172 @@ class Component(CommonInterface):
         else:
             return region
 
+    @staticmethod
+    def validate_stack_concurrency(concurrency, parameter: str):
+        """
+        Returns concurrency specified either as a positive integer, or as a mapping of stacks to positive integers
+        (see `get_stack_concurrency`), with all values converted to integers.
+        """
+
+        def _to_positive_int(value):
+            if isinstance(value, bool):
+                raise ValueError(value)
+
+            if int(value) != float(value) or int(value) < 1:
+                raise ValueError(value)
+
+            return int(value)
+
+        try:
+            if isinstance(concurrency, dict):
+                return {stack: _to_positive_int(value) for stack, value in concurrency.items()}
+
+            return _to_positive_int(concurrency)
+
+        except (TypeError, ValueError):
+            logging.error(f"Parameter {parameter} must be a positive integer, or a mapping of stacks to positive "
+                          f"integers, received {concurrency}.")
+            sys.exit(1)
+
+    @staticmethod
+    def get_stack_concurrency(concurrency, region: str) -> int:
+        """
+        Resolves concurrency for a stack. Concurrency can either be specified as a single number for all stacks,
+        or as a mapping of stack to number with an optional `default` key, e.g. `{"keboola.com": 8, "default": 4}`.
+        """
+
+        if isinstance(concurrency, dict):
+            concurrency = concurrency.get(region, concurrency.get('default', 1))
+
+        return max(int(concurrency), 1)
+
+    def validate_parquet_datasets(self):
+
+        unknown_tables = [t for t in self.parameters.parquet_datasets
+                          if t != STORAGE_BUCKETS_TABLE and f'FIELDS_{t.upper().replace("-", "_")}' not in globals()]
+
+        if unknown_tables:
+            logging.error(f"Unknown tables in parameter {KEY_PARQUET_DATASETS}: {unknown_tables}.")
+            sys.exit(1)
+
+        if self.parameters.parquet_datasets:
+            try:
+                import pyarrow  # noqa: F401
+
+            except ImportError:
+                logging.error(f"Package pyarrow is required for parameter {KEY_PARQUET_DATASETS}.")
+                sys.exit(1)
+
+    def validate_deduplicate_tables(self):
+
+        # Storage buckets are written without `Writer`, so they can not be deduplicated
+        unknown_tables = [t for t in self.parameters.deduplicate_tables
+                          if f'PK_{t.upper().replace("-", "_")}' not in globals()]
+
+        if unknown_tables:
+            logging.error(f"Unknown tables in parameter {KEY_DEDUPLICATE_TABLES}: {unknown_tables}.")
+            sys.exit(1)
+
+    def get_pk_index(self, table_name: str, columns: list, primary_key: list):
+        """
+        Returns the index of primary keys written to the table, or `None`, if the table is not deduplicated.
+        """
+
+        if table_name not in self.parameters.deduplicate_tables:
+            return None
+
+        with self._state_lock:
+            if table_name not in self.pk_indexes:
+                self.pk_indexes[table_name] = PrimaryKeyIndex([columns.index(c) for c in primary_key])
+
+            return self.pk_indexes[table_name]
+
+    def close_pk_indexes(self):
+
+        for table_name, pk_index in self.pk_indexes.items():
+            if pk_index.duplicates:
+                logging.info(f"Dropped {pk_index.duplicates} rows with duplicate primary keys from table "
+                             f"{table_name}.")
+
+            pk_index.close()
+
+    def get_parquet_sink(self, table_name: str, columns: list):
+        """
+        Returns the Parquet sink of the table, or `None`, if the table is written to CSV. Sinks are written to
+        output files, since Storage can not import Parquet files as tables.
+        """
+
+        if table_name not in self.parameters.parquet_datasets:
+            return None
+
+        with self._state_lock:
+            if table_name not in self.parquet_sinks:
+                _fdf = self.create_out_file_definition(f'{table_name}.parquet', tags=PARQUET_FILE_TAGS + [table_name])
+                _fdf.parquet_sink = ParquetSink(_fdf.full_path, columns)
+                self.parquet_sinks[table_name] = _fdf
+
+            return self.parquet_sinks[table_name].parquet_sink
+
+    def write_parquet_manifests(self):
+
+        for file_definition in self.parquet_sinks.values():
+            file_definition.parquet_sink.close()
+            self.write_manifest(file_definition)
+
+    def write_run_metrics(self):
+        """
+        Writes run metrics collected in `METRICS` to an output file, as a table, or both, based on parameters.
+        """
+
+        metrics = METRICS.to_dict()
+        _requests = [r for projects in metrics['requests'].values() for r in projects.values()]
+        logging.info(f"Run metrics: {sum(r['count'] for r in _requests)} requests, "
+                     f"{sum(r['retries'] for r in _requests)} retries, {sum(r['errors'] for r in _requests)} errors, "
+                     f"{sum(sum(t.values()) for t in metrics['tables'].values())} rows in "
+                     f"{metrics['wall_seconds']} seconds.")
+
+        if self.parameters.metrics_file:
+            _fdf = self.create_out_file_definition(METRICS_FILE_NAME, tags=METRICS_FILE_TAGS)
+
+            with open(_fdf.full_path, 'w') as metrics_file:
+                json.dump(metrics, metrics_file, indent=2)
+
+            self.write_manifest(_fdf)
+
+        if self.parameters.metrics_table:
+            _metrics_tdf = self.build_table_definition(METRICS_TABLE)
+
+            with Writer(_metrics_tdf) as wrt:
+                wrt.write_rows(METRICS.to_rows(), {'run_started': metrics['started']})
+
+    def write_profiles(self):
+        """
+        Writes `cProfile` stats of each profiled dataset and sampled stacks of all datasets to output files.
+        """
+
+        if self.profiler is None:
+            return
+
+        self.profiler.stop()
+
+        for dataset in self.profiler.datasets:
+            _fdf = self.create_out_file_definition(f'profile_{dataset}.pstats', tags=PROFILE_FILE_TAGS + [dataset])
+            self.profiler.dump_stats(dataset, _fdf.full_path)
+            self.write_manifest(_fdf)
+
+        _fdf = self.create_out_file_definition(PROFILE_STACKS_FILE_NAME, tags=PROFILE_FILE_TAGS)
+        self.profiler.write_collapsed_stacks(_fdf.full_path)
+        self.write_manifest(_fdf)
+
+        logging.info(f"Profiles of {len(self.profiler.datasets)} datasets were written to output files.")
+
     def build_table_definition(self, table_name: str):
 
+        with self._table_definitions_lock:
+            return self._build_table_definition(table_name)
+
+    def _build_table_definition(self, table_name: str):
+
         if table_name in self.table_definitions:
             return self.table_definitions[table_name]
 
@@ -286,6 +638,10 @@ class Component(CommonInterface):
                                                    incremental=self.parameters.incremental)
             tdf.writer_columns = raw_cols
             tdf.json_columns = json_cols
+            tdf.parquet_sink = self.get_parquet_sink(table_name, kbc_cols)
+            tdf.sliced = self.parameters.sliced_output
+            tdf.json_encoder = self.json_encoder
+            tdf.pk_index = self.get_pk_index(table_name, kbc_cols, pk)
 
             self.table_definitions[table_name] = tdf
 
@@ -302,7 +658,7 @@ class Component(CommonInterface):
             }
             _org_users_tdf = self.build_table_definition('organization-users')
 
-            with Writer(_org_users_tdf) as wrt:
+            with self.track_dataset(KEY_GET_ORGANIZATION_USERS), Writer(_org_users_tdf) as wrt:
                 org_users = self.client.management.get_organization_users()
                 wrt.write_rows(org_users, parent_dict=_org_pdict)
 
@@ -313,7 +669,7 @@ class Component(CommonInterface):
 
             _prj_users_tdf = self.build_table_definition('project-users')
 
-            with Writer(_prj_users_tdf) as wrt:
+            with self.track_dataset(KEY_GET_PROJECT_USERS), Writer(_prj_users_tdf) as wrt:
                 for prj_id in project_ids:
                     _pdict = {'project_id': prj_id, 'region': self.parameters.region}
                     users = self.client.management.get_project_users(prj_id)
@@ -330,6 +686,90 @@ class Component(CommonInterface):
         with Writer(_waiting_jobs_tdf) as wrt:
             wrt.write_rows(jobs, parent_dict)
 
+    def get_all_configurations_payload(self) -> list:
+        """
+        Returns configurations of all components in the project, downloaded once per project.
+        """
+
+        return self.client.memo.get('components', self.client.storage.get_all_configurations)
+
+    def get_component_configurations(self, component_id: str, memo: SingleFlightMemo = None,
+                                     storage: StorageClient = None) -> list:
+        """
+        Returns a copy of configurations of the component. If all configurations of the project are extracted as
+        well, the configurations are taken from their payload instead of being requested again.
+
+        Project clients are kept per thread, so `memo` and `storage` of the project must be passed when called
+        from a worker thread.
+        """
+
+        memo = memo or self.client.memo
+        storage = storage or self.client.storage
+
+        configurations = None
+
+        if self.parameters.datasets.get(KEY_GET_ALL_CONFIGURATIONS):
+            components = memo.get('components_index',
+                                  lambda: KeyedIndex(memo.get('components', storage.get_all_configurations), 'id'))
+            configurations = components.get(component_id, {}).get('configurations', [])
+
+            if not self.has_configuration_fields(configurations):
+                logging.debug(f"Configurations of component {component_id} in the listing of all configurations "
+                              f"are incomplete, requesting them separately.")
+                configurations = None
+
+        if configurations is None:
+            configurations = memo.get(('configs', component_id),
+                                      lambda: storage.get_component_configurations(component_id))
+
+        return copy.deepcopy(configurations)
+
+    @staticmethod
+    def has_configuration_fields(configurations: list) -> bool:
+        """
+        Returns `True`, if all configurations have all fields of `CONFIGURATION_FIELDS`. The API returns all fields
+        of a configuration, even if they are empty, so a missing field means the listing does not include it.
+        """
+
+        return all(field in configuration for configuration in configurations for field in CONFIGURATION_FIELDS)
+
+    def get_transformation_v2_component_ids(self) -> list:
+        """
+        Returns ids of transformation components used in the project. Known components keep the order of
+        `TR_V2_CMP_ID`, any other discovered components follow in the order of the listing.
+        """
+
+        if self.parameters.datasets.get(KEY_GET_ALL_CONFIGURATIONS):
+            components = [c for c in self.get_all_configurations_payload() if c.get('type') == 'transformation']
+        else:
+            components = self.client.memo.get(('components', 'transformation'),
+                                              lambda: self.client.storage.get_components('transformation'))
+
+        discovered_ids = [c['id'] for c in components if c['id'] != TR_V1_CMP_ID and c.get('configurations', True)]
+
+        return [c for c in TR_V2_CMP_ID if c in discovered_ids] + [c for c in discovered_ids if c not in TR_V2_CMP_ID]
+
+    @staticmethod
+    def get_table_change(table: dict) -> str:
+        """
+        Returns the marker of the last change of a table, which changes with every import into the table. The marker
+        is kept in state for every table, it is therefore a short hash of the last import and change dates.
+        """
+
+        _marker = f"{table.get('lastImportDate') or ''}|{table.get('lastChangeDate') or ''}"
+
+        return md5(_marker.encode()).hexdigest()[:12]
+
+    def get_table_changes(self) -> dict:
+        """
+        Returns ids of all tables in the project mapped to markers of their last change, see `get_table_change`.
+        Tables are collected while extracting tables, so they are only listed again, if they are not extracted.
+        """
+
+        storage = self.client.storage
+        return self.client.memo.get('table_changes', lambda: {t['id']: self.get_table_change(t)
+                                                              for t in storage.get_all_tables(include=False)})
+
     def get_tokens_and_events(self, parent_dict: dict):
 
         _tokens_tdf = self.build_table_definition('tokens')
@@ -352,7 +792,7 @@ class Component(CommonInterface):
     def get_all_configurations(self, parent_dict: dict):
 
         _all_configs_tdf = self.build_table_definition('configurations')
-        configs = self.client.storage.get_all_configurations()
+        configs = self.get_all_configurations_payload()
 
         with Writer(_all_configs_tdf) as wrt:
             for component in configs:
@@ -367,7 +807,7 @@ class Component(CommonInterface):
 
     def get_tables(self, parent_dict: dict):
 
-        tables = self.client.storage.get_all_tables()
+        tables = self.client.storage.iter_all_tables(projection=TABLES_LISTING_PROJECTION)
 
         _tables_tdf = self.build_table_definition('tables')
         _tables_md_tdf = self.build_table_definition('tables-metadata')
@@ -385,45 +825,73 @@ class Component(CommonInterface):
             wrt_columns = nullcontext()
             wrt_columns_md = nullcontext()
 
+        table_changes = {}
+
         with wrt_tables, wrt_tables_md, wrt_columns, wrt_columns_md:
 
             for t in tables:
+                table_changes[t['id']] = self.get_table_change(t)
                 t['primaryKey'] = ','.join(t['primaryKey'])
                 cfg = {}
                 cfg['table_id'] = t['id']
                 cfg = {**cfg, **parent_dict}
 
-                wrt_tables_md.write_rows(t['metadata'], parent_dict=cfg)
+                wrt_tables_md.write_rows(t.pop('metadata'), parent_dict=cfg)
+
+                columns = t.pop('columns')
+                column_metadata = t.pop('columnMetadata')
 
                 if write_column_data:
 
-                    _cols = [{'column': col} for col in t['columns']]
+                    _cols = [{'column': col} for col in columns]
                     wrt_columns.write_rows(_cols, parent_dict=cfg)
 
-                    for col in t['columnMetadata']:
+                    for col in column_metadata:
                         col_cfg = {**cfg, **{'column': col}}
-                        wrt_columns_md.write_rows(t['columnMetadata'][col], col_cfg)
+                        wrt_columns_md.write_rows(column_metadata[col], col_cfg)
+
+                wrt_tables.write_row(t, parent_dict)
 
-            wrt_tables.write_rows(tables, parent_dict)
+        self.client.memo.set('table_changes', table_changes)
 
     def get_buckets(self, parent_dict: dict):
 
         buckets = self.client.storage.get_storage_buckets()
+        parser = FlattenJsonParser(child_separator='__', keys_to_ignore=['tables', 'project'], flatten_lists=False)
+        METRICS.record_rows(STORAGE_BUCKETS_TABLE, len(buckets))
+
+        parquet_sink = self.get_parquet_sink(STORAGE_BUCKETS_TABLE, STORAGE_BUCKET_COLUMNS)
+        if parquet_sink is not None:
+            rows = [parser.parse_row({**t, **parent_dict}) for t in buckets]
+            parquet_sink.write_batch([['' if r.get(c) is None else str(r[c]) for r in rows]
+                                      for c in STORAGE_BUCKET_COLUMNS])
+            return
+
         res_table = self.create_out_table_definition('storage_buckets.csv', primary_key=['id', 'project_id', 'region'],
                                                      columns=STORAGE_BUCKET_COLUMNS)
-        self.table_definitions[res_table.name] = res_table
-        parser = FlattenJsonParser(child_separator='__', keys_to_ignore=['tables', 'project'], flatten_lists=False)
+        with self._table_definitions_lock:
+            self.table_definitions[res_table.name] = res_table
+
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=STORAGE_BUCKET_COLUMNS, extrasaction='ignore')
+        for t in buckets:
+            res = {**t, **parent_dict}
+            writer.writerow(parser.parse_row(res))
+
+        if self.parameters.sliced_output:
+            os.makedirs(res_table.full_path, exist_ok=True)
+            with Writer.open_slice(res_table.full_path) as out_file:
+                out_file.write(out.getvalue())
+            return
 
-        if Path(res_table.full_path).exists():
-            mode = 'a'
-        else:
-            mode = 'w+'
+        with Writer.get_path_lock(res_table.full_path):
+            if Path(res_table.full_path).exists():
+                mode = 'a'
+            else:
+                mode = 'w+'
 
-        with open(res_table.full_path, mode) as out:
-            writer = csv.DictWriter(out, fieldnames=STORAGE_BUCKET_COLUMNS, extrasaction='ignore')
-            for t in buckets:
-                res = {**t, **parent_dict}
-                writer.writerow(parser.parse_row(res))
+            with open(res_table.full_path, mode) as out_file:
+                out_file.write(out.getvalue())
 
     def get_schedules(self, parent_dict: dict):
         _table_events_tdf = self.build_table_definition('schedules')
@@ -432,7 +900,7 @@ class Component(CommonInterface):
         parser = FlattenJsonParser(child_separator='__', flatten_lists=False)
 
         with wrt:
-            schedules = self.client.schedule.get_schedules()
+            schedules = self.client.schedule.iter_schedules()
             for schedule in schedules:
                 parsed_data = parser.parse_row(schedule)
                 res = {**parsed_data, **parent_dict}
@@ -443,7 +911,7 @@ class Component(CommonInterface):
         _orchestrations_tdf = self.build_table_definition('orchestrations_v2')
         _orchestrations_phases_tdf = self.build_table_definition('orchestrations_v2_phases')
         _orchestrations_tasks_tdf = self.build_table_definition('orchestrations_v2_tasks')
-        orchestrations = self.client.storage.get_component_configurations("keboola.orchestrator")
+        orchestrations = self.get_component_configurations("keboola.orchestrator")
 
         with Writer(_orchestrations_tdf) as orch_wrt, \
                 Writer(_orchestrations_phases_tdf) as phase_wrt, \
@@ -493,7 +961,7 @@ class Component(CommonInterface):
             logging.exception("Orchestrations are not available in the project you are extracting metadata from, "
                               "extract the Orchestrations V2 instead.")
             sys.exit(1)
-        orchestrations_sapi = self.client.storage.get_orchestrations()
+        orchestrations_sapi = KeyedIndex(self.get_component_configurations('orchestrator'), 'id')
 
         with Writer(_orch_tdf) as wrt:
             wrt.write_rows(orchestrations, parent_dict)
@@ -508,7 +976,13 @@ class Component(CommonInterface):
 
                 wrt_notif.write_rows(orch['notifications'], _orch_pdict)
 
-                sapi_config = self._get_object_from_list(orchestrations_sapi, 'id', str(orch_id))
+                sapi_config = orchestrations_sapi.get(orch_id)
+                if sapi_config is None:
+                    logging.warning(f"Configuration of orchestration {orch_id} was not found in Storage API "
+                                    f"for project {parent_dict.get('project_id')} in stack "
+                                    f"{parent_dict.get('region')}. Tasks will not be extracted.")
+                    continue
+
                 orch_tasks = sapi_config['configuration']['tasks']
 
                 for idx, task in enumerate(orch_tasks):
@@ -530,30 +1004,73 @@ class Component(CommonInterface):
                 _trigg_pdict = {**{'trigger_id': trigger['id']}, **parent_dict}
                 wrt_triggers_tables.write_rows(trigger.get('tables', []), _trigg_pdict)
 
+    @staticmethod
+    def _group_events_by_run_id(events: list, run_ids: list) -> dict:
+        """
+        Assigns events to run ids. Events of child runs (e.g. `123.456`) are assigned to their parent run `123`.
+        """
+
+        grouped_events = {run_id: [] for run_id in run_ids}
+
+        for event in events:
+            run_id = event.get('runId') or ''
+
+            while run_id != '' and run_id not in grouped_events:
+                run_id = run_id.rpartition('.')[0]
+
+            if run_id == '':
+                logging.debug(f"Event {event.get('id')} could not be matched to any of the requested runs.")
+                continue
+
+            grouped_events[run_id] += [event]
+
+        return grouped_events
+
     def get_workspace_load_events(self, parent_dict: dict, project_key: str):
 
         _ws_load_events_tdf = self.build_table_definition('workspace-table-loads')
         last_processed_job_id = self.last_processed_transformations.get(project_key)
         try:
-            transformation_jobs = self.client.syrup.get_transformation_jobs(last_processed_job_id)
+            transformation_jobs = self.client.syrup.get_transformation_jobs(last_processed_job_id, oldest_first=True)
         except requests.exceptions.ConnectionError:
-            transformation_jobs = self.client.queue.get_transformation_jobs(last_processed_job_id)
-        transformation_jobs.reverse()
+            transformation_jobs = self.client.queue.get_transformation_jobs(last_processed_job_id, oldest_first=True)
         encountered_processing = False
 
+        for job in transformation_jobs:
+            if job['status'] in ('processing', 'waiting', 'terminating'):
+                encountered_processing = True
+
+            if encountered_processing is False:
+                last_processed_job_id = job['id']
+
+        run_ids = [job['runId'] for job in transformation_jobs]
+
         with Writer(_ws_load_events_tdf) as wrt:
-            for job in transformation_jobs:
-                if job['status'] in ('processing', 'waiting', 'terminating'):
-                    encountered_processing = True
+            if self.parameters.batch_workspace_load_events:
+                # Events of a run repeated in several jobs are identical, each run is therefore written once
+                for run_ids_chunk in self.client.storage.split_run_ids(list(dict.fromkeys(run_ids))):
+                    storage_events = self.client.storage.get_workspace_load_events_for_runs(run_ids_chunk)
+                    events_by_run_id = self._group_events_by_run_id(storage_events, run_ids_chunk)
 
-                if encountered_processing is False:
-                    last_processed_job_id = job['id']
+                    for run_id in run_ids_chunk:
+                        wrt.write_rows(events_by_run_id[run_id], parent_dict)
+
+            else:
+                for run_id in run_ids:
+                    storage_events = self.client.storage.iter_workspace_load_events(runId=run_id)
+                    wrt.write_rows(storage_events, parent_dict)
 
-                run_id = job['runId']
-                storage_events = self.client.storage.get_workspace_load_events(runId=run_id)
-                wrt.write_rows(storage_events, parent_dict)
+        with self._state_lock:
+            self.last_processed_transformations[project_key] = last_processed_job_id
 
-        self.last_processed_transformations[project_key] = last_processed_job_id
+    def get_flatten_stage(self, writer: Writer) -> OrderedStage:
+        """
+        Returns a stage appending rows encoded by `transformation_rows` functions to `writer`. If flattening processes
+        are enabled, rows are encoded by the process pool, otherwise right away in the current thread.
+        """
+
+        return OrderedStage(self.flatten_pool, lambda encoded: writer.write_encoded(*encoded),
+                            self.parameters.flatten_processes * FLATTEN_PENDING_PER_PROCESS)
 
     def get_transformations_v1(self, parent_dict: dict):
 
@@ -564,7 +1081,7 @@ class Component(CommonInterface):
         _tr_outputs_tdf = self.build_table_definition('transformations-outputs')
         _tr_queries_tdf = self.build_table_definition('transformations-queries')
 
-        buckets = self.client.storage.get_transformations_v1()
+        buckets = self.get_component_configurations('transformation')
 
         with Writer(_tr_buckets_tdf) as wrt_buckets:
             wrt_buckets.write_rows(buckets, parent_dict)
@@ -575,7 +1092,8 @@ class Component(CommonInterface):
         wrt_outputs = Writer(_tr_outputs_tdf)
         wrt_queries = Writer(_tr_queries_tdf)
 
-        with wrt_tr, wrt_inputs, wrt_inputs_md, wrt_outputs, wrt_queries:
+        with wrt_tr, wrt_inputs, wrt_inputs_md, wrt_outputs, wrt_queries, \
+                self.get_flatten_stage(wrt_queries) as queries_stage:
 
             for bucket in buckets:
                 _bucket = {}
@@ -621,9 +1139,8 @@ class Component(CommonInterface):
 
                         wrt_outputs.write_row(table_output, _tr_parent)
 
-                    _queries = [{'query_index': idx, 'query': q} for idx, q in
-                                enumerate(transformation['configuration'].get('queries', []))]
-                    wrt_queries.write_rows(_queries, _tr_parent)
+                    queries_stage.submit(encode_queries, wrt_queries.projector,
+                                         transformation['configuration'].get('queries', []), _tr_parent)
 
     def get_transformations_v2(self, parent_dict: dict):
 
@@ -638,10 +1155,22 @@ class Component(CommonInterface):
         wrt_tr_outputs = Writer(_tr_outputs_tdf)
         wrt_tr_codes = Writer(_tr_codes_tdf)
 
-        with wrt_tr, wrt_tr_inputs, wrt_tr_inputs_md, wrt_tr_outputs, wrt_tr_codes:
+        with wrt_tr, wrt_tr_inputs, wrt_tr_inputs_md, wrt_tr_outputs, wrt_tr_codes, \
+                self.get_flatten_stage(wrt_tr_codes) as codes_stage:
+
+            if self.parameters.discover_transformations_v2:
+                tr_cmp_ids = self.get_transformation_v2_component_ids()
+                max_workers = TR_V2_FETCH_WORKERS
+                logging.debug(f"Discovered transformation components: {tr_cmp_ids}.")
+            else:
+                tr_cmp_ids = TR_V2_CMP_ID
+                max_workers = 1
+
+            memo, storage = self.client.memo, self.client.storage
+            tr_cmp_configs = bounded_ordered_map(lambda c: (c, self.get_component_configurations(c, memo, storage)),
+                                                 tr_cmp_ids, max_workers, thread_name_prefix='tr-v2')
 
-            for tr_cmp_id in TR_V2_CMP_ID:
-                tr_configs = self.client.storage.get_component_configurations(tr_cmp_id)
+            for tr_cmp_id, tr_configs in tr_cmp_configs:
 
                 _cmp_pdict = {**{'component_id': tr_cmp_id}, **parent_dict}
 
@@ -670,27 +1199,63 @@ class Component(CommonInterface):
                         wrt_tr_outputs.write_row(to, _tr_pdict)
 
                     code_blocks = tr['configuration'].get('parameters', {}).get('blocks', [])
+                    codes_stage.submit(encode_code_blocks, wrt_tr_codes.projector, code_blocks, _tr_pdict)
 
-                    for cb_idx, cb in enumerate(code_blocks):
-                        _cb_parent = {**{'block_name': cb['name'], 'block_index': cb_idx}, **_tr_pdict}
+    def get_table_load_events(self, parent_dict: dict, project_key: str):
+        """
+        With incremental load, the id of the newest event of each table is kept in state as its watermark and only
+        newer events are downloaded in the next run. With `skip_unchanged_tables`, tables which did not change since
+        the previous run are not requested at all. Watermarks of tables which no longer exist are dropped.
+        """
 
-                        for c_idx, c in enumerate(cb.get('codes', [])):
-                            _c_parent = {**_cb_parent, **{'code_name': c['name'], 'code_index': c_idx}}
+        _table_events_tdf = self.build_table_definition('tables-load-events')
+        wrt = Writer(_table_events_tdf)
 
-                            for sc_idx, sc in enumerate(c.get('script', [])):
-                                wrt_tr_codes.write_row({'script': sc, 'script_index': sc_idx}, _c_parent)
+        storage = self.client.storage
+        table_changes = self.get_table_changes()
+        max_workers = self.get_stack_concurrency(self.parameters.table_events_concurrency, parent_dict['region'])
 
-    def get_table_load_events(self, parent_dict: dict):
+        with self._state_lock:
+            watermarks = self.table_events_watermarks.get(project_key, {}) if self.parameters.incremental else {}
 
-        _table_events_tdf = self.build_table_definition('tables-load-events')
-        wrt = Writer(_table_events_tdf)
+        new_watermarks = {}
+        table_ids = []
+
+        for table_id, table_change in table_changes.items():
+            since_id, previous_change = watermarks.get(table_id, [None, None])
+
+            if self.parameters.skip_unchanged_tables and since_id is not None and table_change == previous_change:
+                new_watermarks[table_id] = [since_id, table_change]
+            else:
+                table_ids += [table_id]
+
+        if len(table_ids) < len(table_changes):
+            logging.info(f"Skipping load events of {len(table_changes) - len(table_ids)} unchanged tables of "
+                         f"project {parent_dict['project_id']} in stack {parent_dict['region']}.")
+
+        # Events are streamed page by page when fetched serially, worker threads download whole tables
+        if max_workers == 1:
+            get_events = storage.iter_table_load_events
+        else:
+            get_events = storage.get_table_load_events
 
-        table_ids = [t['id'] for t in self.client.storage.get_all_tables(include=False)]
+        def _get_events(table_id: str) -> tuple:
+            return table_id, get_events(table_id, self.latest_date, watermarks.get(table_id, [None])[0])
 
         with wrt:
-            for table in table_ids:
-                load_events = self.client.storage.get_table_load_events(table, self.latest_date)
-                wrt.write_rows(load_events, parent_dict)
+            for table_id, load_events in bounded_ordered_map(_get_events, table_ids, max_workers,
+                                                             thread_name_prefix='table-events'):
+                max_id = watermarks.get(table_id, [None])[0]
+
+                for event in load_events:
+                    max_id = int(event['id']) if max_id is None else max(max_id, int(event['id']))
+                    wrt.write_row(event, parent_dict)
+
+                new_watermarks[table_id] = [max_id, table_changes[table_id]]
+
+        if self.parameters.incremental:
+            with self._state_lock:
+                self.table_events_watermarks[project_key] = new_watermarks
 
     def get_notifications(self, parent_dict: dict):
         _notifications_tdf = self.build_table_definition('notifications')
@@ -699,102 +1264,234 @@ class Component(CommonInterface):
         parser = FlattenJsonParser(child_separator='__', flatten_lists=False)
 
         with wrt:
-            notifications = self.client.notification.get_notifications()
+            notifications = self.client.notification.iter_notifications()
             for notification in notifications:
                 parsed_data = parser.parse_row(notification)
-                component_id_dict = self._get_component_id_from_notification(parsed_data)
-                config_id_dict = self._get_configuration_id_from_notification(parsed_data)
-                phase_id_dict = self._get_configuration_id_from_notification(parsed_data)
-                res = {**parsed_data, **parent_dict, **component_id_dict, **config_id_dict, **phase_id_dict}
+                res = {**parsed_data, **parent_dict, **self._get_ids_from_notification(parsed_data)}
                 wrt.write_row(parser.parse_row(res))
 
     @staticmethod
-    def _get_component_id_from_notification(notification_data: dict) -> dict:
-        component_id = None
-        for notification_filter in notification_data.get("filters"):
-            if notification_filter.get("field") == "job.component.id":
-                component_id = notification_filter.get("value")
-        return {"component_id": component_id}
+    def _get_ids_from_notification(notification_data: dict) -> dict:
 
-    @staticmethod
-    def _get_configuration_id_from_notification(notification_data: dict) -> dict:
-        configuration_id = None
-        for notification_filter in notification_data.get("filters"):
-            if notification_filter.get("field") == "job.configuration.id":
-                configuration_id = notification_filter.get("value")
-        return {"configuration_id": configuration_id}
+        filters = KeyedIndex(notification_data.get("filters"), 'field')
 
-    @staticmethod
-    def _get_phase_id_id_from_notification(notification_data: dict) -> dict:
-        phase_id = None
-        for notification_filter in notification_data.get("filters"):
-            if notification_filter.get("field") == "phase.id":
-                phase_id = notification_filter.get("value")
-        return {"phase_id": phase_id}
+        return {
+            "component_id": filters.get("job.component.id", {}).get("value"),
+            "configuration_id": filters.get("job.configuration.id", {}).get("value"),
+            "phase_id": filters.get("phase.id", {}).get("value")
+        }
 
-    def get_project_data(self, project_id: str, project_token: str, project_key: str):
+    def get_project_data(self, project_id: str, project_token: str, project_key: str, region: str = None):
 
-        self.client.init_storage_and_syrup_clients(self.parameters.region, project_token, project_id)
-        _p_dict = {'region': self.parameters.region, 'project_id': project_id}
+        if region is None:
+            region = self.parameters.region
 
-        if self.parameters.datasets.get(KEY_GET_ORCHESTRATIONS):
-            logging.info("Fetching metadata of Orchestrations")
-            self.get_orchestrations(_p_dict)
+        try:
+            with METRICS.project(project_key):
+                # Clients attribute their requests to the project, see `KeboolaHttpClient`
+                self.client.init_storage_and_syrup_clients(region, project_token, project_id)
+                self.get_project_datasets(project_key, {'region': region, 'project_id': project_id})
+
+        finally:
+            self.client.close_project()
+
+    def get_project_datasets(self, project_key: str, parent_dict: dict):
+
+        project_datasets = [
+            (KEY_GET_ORCHESTRATIONS, "Orchestrations", self.get_orchestrations),
+            (KEY_GET_WAITING_JOBS, "waiting jobs", self.get_waiting_jobs),
+            (KEY_GET_TOKENS, "Tokens", self.get_tokens_and_events),
+            (KEY_GET_ALL_CONFIGURATIONS, "All Configurations", self.get_all_configurations),
+            (KEY_GET_TABLES, "Tables", self.get_tables),
+            (KEY_GET_ORCHESTRATIONS_V2, "Orchestrations V2", self.get_orchestrations_v2),
+            (KEY_GET_TRIGGERS, "Triggers", self.get_triggers),
+            (KEY_GET_WORKSPACE_LOAD_EVENTS, "Workspace Load Events",
+             lambda _parent_dict: self.get_workspace_load_events(_parent_dict, project_key)),
+            (KEY_GET_TRANSFORMATIONS, "Transformations", self.get_transformations_v1),
+            (KEY_GET_TRANSFORMATIONS_V2, "Transformations V2", self.get_transformations_v2),
+            (KEY_GET_TABLES_LOAD_EVENTS, "Table Load Events",
+             lambda _parent_dict: self.get_table_load_events(_parent_dict, project_key)),
+            (KEY_GET_NOTIFICATIONS, "Notifications", self.get_notifications),
+            ('get_storage_buckets', "Storage Buckets", self.get_buckets)
+        ]
+
+        for dataset, dataset_name, get_dataset in project_datasets:
+            if self.parameters.datasets.get(dataset):
+                logging.info(f"Fetching metadata of {dataset_name} for project {parent_dict['project_id']} in "
+                             f"stack {parent_dict['region']}.")
+
+                with self.track_dataset(dataset), self.fingerprint_dataset(dataset, project_key):
+                    get_dataset(parent_dict)
 
-        if self.parameters.datasets.get(KEY_GET_WAITING_JOBS):
-            logging.info("Fetching metadata of waiting jobs")
-            self.get_waiting_jobs(_p_dict)
+        if self.parameters.datasets.get(KEY_GET_SCHEDULES):
+            logging.info(f"Fetching schedules of configurations for project {parent_dict['project_id']} in "
+                         f"stack {parent_dict['region']}.")
 
-        if self.parameters.datasets.get(KEY_GET_TOKENS):
-            logging.info("Fetching metadata of Tokens")
-            self.get_tokens_and_events(_p_dict)
+            with self.track_dataset(KEY_GET_SCHEDULES), self.fingerprint_dataset(KEY_GET_SCHEDULES, project_key):
+                self.get_schedules(parent_dict)
 
-        if self.parameters.datasets.get(KEY_GET_ALL_CONFIGURATIONS):
-            logging.info("Fetching metadata of All Configurations")
-            self.get_all_configurations(_p_dict)
+    @contextmanager
+    def fingerprint_dataset(self, dataset: str, project_key: str):
+        """
+        With incremental load and `skip_unchanged_datasets`, rows of the dataset are staged and fingerprinted while
+        the dataset is extracted. If the fingerprint matches the fingerprint of the previous run, which is kept in
+        state, rows of the project are left out of the output, since they're already loaded in Storage.
 
-        if self.parameters.datasets.get(KEY_GET_TABLES):
-            logging.info("Fetching metadata of Tables")
-            self.get_tables(_p_dict)
+        Storage buckets are written without `Writer`, so they're not fingerprinted.
+        """
 
-        if self.parameters.datasets.get(KEY_GET_ORCHESTRATIONS_V2):
-            logging.info("Fetching metadata of Orchestrations V2")
-            self.get_orchestrations_v2(_p_dict)
+        if not (self.parameters.incremental and self.parameters.skip_unchanged_datasets) \
+                or dataset == 'get_storage_buckets':
+            yield
+            return
 
-        if self.parameters.datasets.get(KEY_GET_TRIGGERS):
-            logging.info("Fetching metadata of Triggers")
-            self.get_triggers(_p_dict)
+        fingerprint = DatasetFingerprint(dataset)
 
-        if self.parameters.datasets.get(KEY_GET_WORKSPACE_LOAD_EVENTS):
-            logging.info("Fetching metadata of Workspace Load Events")
-            self.get_workspace_load_events(_p_dict, project_key)
+        with fingerprint.staging():
+            yield
 
-        if self.parameters.datasets.get(KEY_GET_TRANSFORMATIONS):
-            logging.info("Fetching metadata of Transformations")
-            self.get_transformations_v1(_p_dict)
+        digest = fingerprint.hexdigest()
 
-        if self.parameters.datasets.get(KEY_GET_TRANSFORMATIONS_V2):
-            logging.info("Fetching metadata of Transformations V2")
-            self.get_transformations_v2(_p_dict)
+        with self._state_lock:
+            project_fingerprints = self.dataset_fingerprints.setdefault(project_key, {})
+            unchanged = project_fingerprints.get(dataset) == digest
+            project_fingerprints[dataset] = digest
 
-        if self.parameters.datasets.get(KEY_GET_TABLES_LOAD_EVENTS):
-            logging.info("Fetching metadata of Table Load Events")
-            self.get_table_load_events(_p_dict)
+        if unchanged:
+            logging.info(f"Dataset {dataset} of project {project_key} did not change since the previous run, "
+                         f"its rows are left out.")
+            fingerprint.discard()
+        else:
+            fingerprint.commit()
 
-        if self.parameters.datasets.get(KEY_GET_NOTIFICATIONS):
-            logging.info("Fetching metadata of Notifications")
-            self.get_notifications(_p_dict)
+    @contextmanager
+    def track_dataset(self, dataset: str):
+        """
+        Measures the extraction of a dataset in run metrics and profiles it, if profiling is enabled.
+        """
 
-        if self.parameters.datasets.get('get_storage_buckets'):
-            logging.info("Fetching metadata of Storage Buckets")
-            self.get_buckets(_p_dict)
+        with METRICS.dataset(dataset), self.profiler.profile(dataset) if self.profiler else nullcontext():
+            yield
 
-        if self.parameters.datasets.get(KEY_GET_SCHEDULES):
-            logging.info("Fetching schedules of configurations")
-            self.get_schedules(_p_dict)
+    def get_management_project_token(self, prj_id: str, prj_name: str, prj_region: str, prj_token_key: str) -> dict:
+
+        prj_token_description = prj_name + TOKEN_SUFFIX
+        prj_token_old = self.previous_tokens.get(prj_token_key)
+
+        if prj_token_old:
+
+            valid = self.is_token_valid(prj_token_old['#token'], prj_token_old['expires'], prj_region, prj_id)
+
+            if valid:
+                logging.debug(f"Using token {prj_token_old['id']} from state for project {prj_id} in "
+                              f"stack {prj_region}.")
+                return prj_token_old
+
+        logging.debug(f"Creating new storage token for project {prj_id} in stack {prj_region}.")
+        prj_token_new = self.client.management.create_storage_token(prj_id, prj_token_description)
+
+        return {
+            'id': prj_token_new['id'],
+            '#token': prj_token_new['token'],
+            'expires': self.convert_iso_format_to_epoch_timestamp(prj_token_new['expires'])
+        }
+
+    def prepare_management_project(self, prj: dict) -> tuple:
+        """
+        Validates the token of the project from state, or creates a new one. Returns the project together with its
+        token key and token, as expected by `get_management_project_data`.
+        """
+
+        prj_id = str(prj['id'])
+        prj_token_key = '|'.join([self.parameters.region.replace('-', '_'), prj_id])
+        prj_token = self.get_management_project_token(prj_id, prj['name'], self.parameters.region, prj_token_key)
+
+        return prj, prj_token_key, prj_token
+
+    def iter_management_projects(self, projects: list) -> Iterator[tuple]:
+        """
+        Prepares tokens of all projects using up to `token_preflight_concurrency` threads and yields the projects
+        as soon as their tokens are ready, so the extraction of the first projects starts while tokens of the
+        other projects are still being validated or created.
+        """
+
+        max_workers = self.parameters.token_preflight_concurrency
+
+        if max_workers > 1:
+            logging.info(f"Preparing tokens for {len(projects)} projects with up to {max_workers} projects "
+                         f"in parallel.")
+
+        return bounded_unordered_map(self.prepare_management_project, projects, max_workers,
+                                     thread_name_prefix='token')
+
+    def get_management_project_data(self, prepared_prj: tuple):
+
+        prj, prj_token_key, prj_token = prepared_prj
+
+        prj_id = str(prj['id'])
+        prj_name = prj['name']
+        prj_region = self.parameters.region
+
+        logging.info(f"Downloading data for project {prj_name} ({prj_id}) in stack {prj_region}.")
+        self.get_project_data(prj_id, prj_token['#token'], prj_token_key, prj_region)
+
+        with self._state_lock:
+            self.new_tokens[prj_token_key] = prj_token
+
+    def get_storage_project_data(self, prj: dict):
+
+        prj_token, prj_region, prj_id, prj_token_key = prj
+
+        logging.info(f"Downloading data for project {prj_id} in stack {prj_region}.")
+        self.get_project_data(prj_id, prj_token, prj_token_key, prj_region)
+
+    def process_projects(self, project_function, projects: Iterable):
+
+        max_workers = self.parameters.max_parallel_projects
+
+        if max_workers == 1:
+            for prj in projects:
+                project_function(prj)
+            return
+
+        logging.info(f"Downloading data with up to {max_workers} projects in parallel.")
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='project') as executor:
+            futures = []
+
+            try:
+                # Projects may be yielded lazily, e.g. once their tokens are ready
+                for prj in projects:
+                    futures += [executor.submit(project_function, prj)]
+
+                for future in as_completed(futures):
+                    future.result()
+
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
 
     def run(self):
 
+        if self.parameters.flatten_processes > 1:
+            logging.info(f"Flattening transformations in {self.parameters.flatten_processes} processes.")
+            # Workers are started lazily, once threads of the run exist, forking then could copy locks held by them
+            self.flatten_pool = ProcessPoolExecutor(max_workers=self.parameters.flatten_processes,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+
+        try:
+            self.run_extraction()
+
+        finally:
+            self.client.close()
+
+            if self.flatten_pool is not None:
+                self.flatten_pool.shutdown()
+                self.flatten_pool = None
+
+    def run_extraction(self):
+
         if self.parameters.client_to_use == 'management':
 
             _man_token = self.parameters.master_token[0]
@@ -813,51 +1510,11 @@ class Component(CommonInterface):
 
             storage_data_bool = [self.parameters.datasets.get(key, False) for key in STORAGE_ENDPOINTS]
             if any(storage_data_bool):
-
-                for prj in all_projects:
-
-                    prj_id = str(prj['id'])
-                    prj_name = prj['name']
-                    prj_region = self.parameters.region
-                    prj_token_description = prj_name + TOKEN_SUFFIX
-                    prj_token_key = '|'.join([prj_region.replace('-', '_'), prj_id])
-
-                    prj_token_old = self.previous_tokens.get(prj_token_key)
-
-                    if not prj_token_old:
-                        logging.debug(f"Creating new storage token for project {prj_id} in stack {prj_region}.")
-                        prj_token_new = self.client.management.create_storage_token(prj_id, prj_token_description)
-                        prj_token = {
-                            'id': prj_token_new['id'],
-                            '#token': prj_token_new['token'],
-                            'expires': self.convert_iso_format_to_epoch_timestamp(prj_token_new['expires'])
-                        }
-
-                    else:
-
-                        valid = self.is_token_valid(prj_token_old['#token'], prj_token_old['expires'],
-                                                    prj_region, prj_id)
-
-                        if valid:
-                            logging.debug(f"Using token {prj_token_old['id']} from state for project {prj_id} in "
-                                          f"stack {prj_region}.")
-                            prj_token = prj_token_old
-
-                        else:
-                            logging.debug(f"Creating new storage token for project {prj_id} in stack {prj_region}.")
-                            prj_token_new = self.client.management.create_storage_token(prj_id, prj_token_description)
-
-                            prj_token = {
-                                'id': prj_token_new['id'],
-                                '#token': prj_token_new['token'],
-                                'expires': self.convert_iso_format_to_epoch_timestamp(prj_token_new['expires'])
-                            }
-
-                    logging.info(f"Downloading data for project {prj_name} in stack {prj_region}.")
-                    self.get_project_data(prj_id, prj_token['#token'], prj_token_key)
-                    self.new_tokens[prj_token_key] = prj_token
+                self.process_projects(self.get_management_project_data, self.iter_management_projects(all_projects))
 
         else:
+            storage_projects = []
+
             for idx, prj in enumerate(self.parameters.tokens):
 
                 prj_token = prj[KEY_SAP_TOKEN]
@@ -869,8 +1526,9 @@ class Component(CommonInterface):
                     logging.error(f"Token as position {idx} is empty. Skipping.")
                     continue
 
-                logging.info(f"Downloading data for project {prj_id} in stack {self.parameters.region}.")
-                self.get_project_data(prj_id, prj_token, prj_token_key)
+                storage_projects += [(prj_token, self.parameters.region, prj_id, prj_token_key)]
+
+            self.process_projects(self.get_storage_project_data, storage_projects)
 
         new_state = {
             'tokens': self.new_tokens,
@@ -878,8 +1536,31 @@ class Component(CommonInterface):
             'date': dateparser.parse('today').strftime('%Y-%m-%d')
         }
 
+        if self.table_events_watermarks:
+            new_state['table_events'] = encode_watermarks(self.table_events_watermarks)
+
+        if self.parameters.incremental and self.parameters.skip_unchanged_datasets:
+            new_state['dataset_fingerprints'] = self.dataset_fingerprints
+
+        if self.conditional_cache is not None:
+            self.conditional_cache.log_summary()
+            new_state['conditional_cache'] = self.conditional_cache.to_state()
+
+        if self.response_cache is not None:
+            self.response_cache.log_summary()
+            self.response_cache.close()
+
+        for host, (throttled, limit) in KeboolaHttpClient.rate_limiters.get_throttled().items():
+            logging.warning(f"{throttled} requests to {host} were throttled, concurrency was limited to {limit} "
+                            f"requests.")
+
+        self.write_run_metrics()
+        self.close_pk_indexes()
+        self.write_profiles()
         self.write_state_file(new_state)
-        self.write_manifests(self.table_definitions.values())
+        self.write_manifests([tdf for tdf in self.table_definitions.values()
+                              if getattr(tdf, 'parquet_sink', None) is None])
+        self.write_parquet_manifests()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,157 @@
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from typing import Callable, Hashable, Iterable, Iterator, Optional
+
+
+def bounded_ordered_map(function: Callable, items: Iterable, max_workers: int,
+                        thread_name_prefix: str = 'worker') -> Iterator:
+    """
+    Lazily applies `function` to all `items` using up to `max_workers` threads and yields the results in the order
+    of `items`. At most `max_workers` calls are in flight at once, results are yielded as soon as all results
+    before them are available.
+    """
+
+    if max_workers <= 1:
+        for item in items:
+            yield function(item)
+        return
+
+    items = iter(items)
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix) as executor:
+        try:
+            for item in items:
+                pending.append(executor.submit(function, item))
+
+                if len(pending) >= max_workers:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def bounded_unordered_map(function: Callable, items: Iterable, max_workers: int,
+                          thread_name_prefix: str = 'worker') -> Iterator:
+    """
+    Lazily applies `function` to all `items` using up to `max_workers` threads and yields each result as soon as it
+    is available, regardless of the order of `items`. At most `max_workers` calls are in flight at once.
+    """
+
+    if max_workers <= 1:
+        for item in items:
+            yield function(item)
+        return
+
+    items = iter(items)
+    pending = set()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix) as executor:
+        try:
+            for item in items:
+                pending.add(executor.submit(function, item))
+
+                if len(pending) >= max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class SingleFlightMemo:
+    """
+    Memo of loaded values by key. Each key is loaded at most once: concurrent callers asking for a key, which is
+    being loaded, wait for the first caller's result instead of loading it again. Failed loads are not memoized.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable):
+
+        with self._guard:
+            if key in self._values:
+                return self._values[key]
+
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            with self._guard:
+                if key in self._values:
+                    return self._values[key]
+
+            value = loader()
+
+            with self._guard:
+                self._values[key] = value
+                self._locks.pop(key, None)
+
+            return value
+
+    def set(self, key: Hashable, value):
+
+        with self._guard:
+            self._values[key] = value
+
+    def clear(self):
+
+        with self._guard:
+            self._values.clear()
+            self._locks.clear()
+
+
+class OrderedStage:
+    """
+    Pipeline stage running calls in `executor` and passing their results to `consume` in the order, in which the
+    calls were submitted. At most `max_pending` calls are in flight, further submissions wait for the oldest one.
+    Without an executor, calls are run and consumed right away.
+    """
+
+    def __init__(self, executor: Optional[Executor], consume: Callable, max_pending: int):
+        self.executor = executor
+        self.consume = consume
+        self.max_pending = max_pending
+        self._pending = deque()
+
+    def submit(self, function: Callable, *args):
+
+        if self.executor is None:
+            self.consume(function(*args))
+            return
+
+        self._pending.append(self.executor.submit(function, *args))
+
+        while len(self._pending) > self.max_pending:
+            self.consume(self._pending.popleft().result())
+
+    def drain(self):
+
+        while self._pending:
+            self.consume(self._pending.popleft().result())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+
+        if exc_type is None:
+            self.drain()
+            return
+
+        for future in self._pending:
+            future.cancel()
@@ -0,0 +1,105 @@
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from keboola.component.dao import TableDefinition
+
+STAGING_SPOOL_SIZE = 16 * 1024 * 1024  # Staged data of a table above this size is spilled to a temporary file
+
+
+class DatasetFingerprint:
+    """
+    Content fingerprint of a dataset of a single project. While the dataset is extracted, writers created in the
+    extracting thread stage their encoded rows here instead of writing them to output, see `Writer.flush`. Rows of
+    each table are hashed while they are staged, the fingerprint combines hashes of all tables of the dataset.
+
+    Once the dataset is extracted, the staged rows are either written to output by `commit`, or left out by `discard`,
+    if the fingerprint matches the fingerprint of the previous run.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, dataset: str, spool_size: int = STAGING_SPOOL_SIZE):
+
+        self.dataset = dataset
+        self.spool_size = spool_size
+        self._tables = {}
+
+    @classmethod
+    def current(cls) -> Optional['DatasetFingerprint']:
+        return getattr(cls._local, 'fingerprint', None)
+
+    @contextmanager
+    def staging(self):
+        """
+        Stages rows of writers created in the current thread, staged rows are discarded on an error.
+        """
+
+        self._local.fingerprint = self
+
+        try:
+            yield
+
+        except BaseException:
+            self.discard()
+            raise
+
+        finally:
+            self._local.fingerprint = None
+
+    def _get_table(self, table_definition: TableDefinition) -> dict:
+
+        table = self._tables.get(table_definition.name)
+
+        if table is None:
+            table = self._tables[table_definition.name] = {
+                'tdf': table_definition,
+                'hash': hashlib.blake2b(digest_size=16),
+                'file': tempfile.SpooledTemporaryFile(max_size=self.spool_size, mode='w+', newline=''),
+                'rows': 0
+            }
+
+        return table
+
+    def stage(self, table_definition: TableDefinition, data: str):
+
+        table = self._get_table(table_definition)
+        table['hash'].update(data.encode())
+        table['file'].write(data)
+
+    def add_rows(self, table_definition: TableDefinition, rows: int):
+
+        self._get_table(table_definition)['rows'] += rows
+
+    def hexdigest(self) -> str:
+
+        fingerprint = hashlib.blake2b(digest_size=16)
+
+        for name, table in sorted(self._tables.items()):
+            fingerprint.update(f"{name}:{table['rows']}:{table['hash'].hexdigest()};".encode())
+
+        return fingerprint.hexdigest()
+
+    def commit(self):
+        """
+        Writes staged rows of all tables to output.
+        """
+
+        from result import Writer
+
+        for table in self._tables.values():
+            table['file'].seek(0)
+
+            with Writer(table['tdf']) as wrt:
+                wrt.write_staged(table['file'], table['rows'])
+
+        self.discard()
+
+    def discard(self):
+
+        for table in self._tables.values():
+            table['file'].close()
+
+        self._tables = {}
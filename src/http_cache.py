@@ -0,0 +1,318 @@
+import base64
+import io
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from fnmatch import fnmatch
+from hashlib import sha256
+from typing import Optional, Tuple
+
+import requests
+
+
+def build_cache_key(stack: str, scope: str, endpoint: str, params: dict) -> str:
+    """
+    Builds the cache key of a GET request from the stack (host of the API), the project or organization it belongs
+    to, the endpoint path and parameters. The key does not depend on the token, tokens are verified before cached
+    responses are served, see `ResponseCache.is_verified`.
+    """
+
+    _key = json.dumps([stack, scope, endpoint, sorted((str(k), str(v)) for k, v in params.items())])
+
+    return sha256(_key.encode()).hexdigest()
+
+
+def build_response(body: bytes, encoding: str, url: str, request: requests.PreparedRequest = None,
+                   stream: bool = False) -> requests.Response:
+    """
+    Builds a `200 OK` response from a cached body. For streamed requests the body is also available as `raw`.
+    """
+
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.encoding = encoding
+    response.url = url
+    response.request = request
+
+    if stream:
+        response.raw = io.BytesIO(body)
+
+    return response
+
+
+class ConditionalCache:
+    """
+    Cache of response validators (`ETag`, `Last-Modified`) and bodies of GET requests. Cached validators are sent
+    with repeated requests as `If-None-Match` / `If-Modified-Since` and on `304 Not Modified` the cached body is used.
+
+    Only responses of `endpoints` are cached, endpoint paths relative to the API base URL are matched against them as
+    `fnmatch` patterns, the same way as TTLs of `ResponseCache`. Total size of cached bodies is limited by
+    `max_bytes`, least recently used entries are evicted first. The cache is persisted in the state file in a
+    compressed form, see `to_state` and `from_state`.
+    """
+
+    def __init__(self, max_bytes: int, endpoints: list, entries: OrderedDict = None):
+
+        self.max_bytes = max_bytes
+        self.endpoints = endpoints
+        self._entries = OrderedDict() if entries is None else entries
+        self._size = sum(len(entry['body']) for entry in self._entries.values())
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_saved = 0
+
+        self._evict()
+
+    def is_cached(self, endpoint: str) -> bool:
+
+        return any(fnmatch(endpoint, pattern) for pattern in self.endpoints)
+
+    def get_validators(self, key: str) -> dict:
+
+        with self._lock:
+            self.requests += 1
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return {}
+
+            self._entries.move_to_end(key)
+
+        headers = {}
+
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        return headers
+
+    def build_response(self, key: str, response: requests.Response) -> Optional[requests.Response]:
+        """
+        Returns the cached response for the `304 Not Modified` `response` or `None`, if the entry was evicted in the
+        meantime.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            self.not_modified += 1
+            self.bytes_saved += len(entry['body'])
+
+        cached_response = build_response(entry['body'], entry['encoding'], response.url, response.request)
+        cached_response.headers.update(response.headers)
+        cached_response.elapsed = response.elapsed
+
+        return cached_response
+
+    def store(self, key: str, response: requests.Response):
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        if not etag and not last_modified:
+            return
+
+        body = response.content
+
+        if len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous_entry = self._entries.pop(key, None)
+
+            if previous_entry is not None:
+                self._size -= len(previous_entry['body'])
+
+            self._entries[key] = {'etag': etag, 'last_modified': last_modified, 'encoding': response.encoding,
+                                  'body': body}
+            self._size += len(body)
+
+            self._evict()
+
+    def _evict(self):
+
+        while self._size > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= len(entry['body'])
+
+    def log_summary(self):
+
+        logging.info(f"Conditional requests: {self.not_modified} of {self.requests} responses were not modified, "
+                     f"{self.bytes_saved} bytes were not downloaded. {len(self._entries)} responses of total size "
+                     f"{self._size} bytes are cached.")
+
+    def to_state(self) -> str:
+
+        with self._lock:
+            entries = [[key, entry['etag'], entry['last_modified'], entry['encoding'],
+                        base64.b64encode(entry['body']).decode()] for key, entry in self._entries.items()]
+
+        return base64.b64encode(zlib.compress(json.dumps(entries).encode())).decode()
+
+    @classmethod
+    def from_state(cls, state_value: str, max_bytes: int, endpoints: list) -> 'ConditionalCache':
+
+        entries = OrderedDict()
+
+        if state_value:
+            try:
+                _entries = json.loads(zlib.decompress(base64.b64decode(state_value)))
+
+            except (ValueError, zlib.error):
+                logging.warning("Could not read the conditional requests cache from state, starting with an empty "
+                                "cache.")
+                _entries = []
+
+            for key, etag, last_modified, encoding, body in _entries:
+                entries[key] = {'etag': etag, 'last_modified': last_modified, 'encoding': encoding,
+                                'body': base64.b64decode(body)}
+
+        return cls(max_bytes, endpoints, entries)
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of GET responses shared by consecutive and overlapping runs, which use the same database
+    file. A cached response is used without any request, while it is younger than the TTL of its endpoint.
+
+    TTLs are specified per endpoint path relative to the API base URL, e.g. `tokens` or `components/*`, as
+    `fnmatch` patterns; the first matching pattern is used, `default` applies to all other endpoints. Endpoints
+    with TTL 0 are not cached. Total size of cached bodies is limited by `max_bytes`, least recently used responses
+    are evicted first.
+
+    Responses are shared by all tokens of a project, so a cached response is served to a token only once the token
+    was verified to have access to the project. Results of the verification are kept for the run.
+    """
+
+    def __init__(self, path: str, ttl: dict, max_bytes: int):
+
+        self.path = path
+        self.ttl = {pattern: seconds for pattern, seconds in ttl.items() if pattern != 'default'}
+        self.default_ttl = ttl.get('default', 0)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, endpoint TEXT, "
+                                 "stored_at REAL, last_used REAL, encoding TEXT, size INTEGER, body BLOB)")
+        self._evict()
+
+        self.hits = {}
+        self.misses = {}
+        self._verified = {}
+
+    def get_rule(self, endpoint: str) -> Tuple[str, float]:
+        """
+        Returns the pattern and the TTL applying to `endpoint`.
+        """
+
+        for pattern, seconds in self.ttl.items():
+            if fnmatch(endpoint, pattern):
+                return pattern, seconds
+
+        return 'default', self.default_ttl
+
+    def get(self, key: str, endpoint: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Returns the body and encoding of a fresh cached response for `key`, or `None`.
+        """
+
+        pattern, ttl = self.get_rule(endpoint)
+
+        if ttl <= 0:
+            return None
+
+        now = time.time()
+
+        with self._lock:
+            row = self._connection.execute("SELECT body, encoding FROM responses WHERE key = ? AND stored_at >= ?",
+                                           (key, now - ttl)).fetchone()
+
+            if row is None:
+                self.misses[pattern] = self.misses.get(pattern, 0) + 1
+                return None
+
+            self.hits[pattern] = self.hits.get(pattern, 0) + 1
+            self._connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+
+        return row[0], row[1]
+
+    def is_verified(self, credentials: str) -> Optional[bool]:
+        """
+        Returns whether the token identified by `credentials` was verified to have access to its project, or `None`,
+        if the token was not verified yet.
+        """
+
+        with self._lock:
+            return self._verified.get(credentials)
+
+    def set_verified(self, credentials: str, verified: bool):
+
+        with self._lock:
+            self._verified[credentials] = verified
+
+    def store(self, key: str, endpoint: str, response: requests.Response) -> bool:
+        """
+        Stores the response, if its endpoint is cached. Returns `True`, if the response body was read.
+        """
+
+        _, ttl = self.get_rule(endpoint)
+
+        if ttl <= 0:
+            return False
+
+        body = response.content
+
+        if len(body) > self.max_bytes:
+            return True
+
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     (key, endpoint, now, now, response.encoding, len(body), body))
+            self._evict()
+
+        return True
+
+    def _evict(self):
+
+        size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        if size <= self.max_bytes:
+            return
+
+        evicted_keys = []
+        for key, entry_size in self._connection.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if size <= self.max_bytes:
+                break
+
+            evicted_keys += [(key,)]
+            size -= entry_size
+
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
+
+    def log_summary(self):
+
+        for pattern in sorted(set(self.hits) | set(self.misses)):
+            logging.info(f"Response cache {pattern}: {self.hits.get(pattern, 0)} hits, "
+                         f"{self.misses.get(pattern, 0)} misses.")
+
+        logging.info(f"Response cache: {sum(self.hits.values())} hits, {sum(self.misses.values())} misses.")
+
+    def close(self):
+
+        with self._lock:
+            self._connection.close()
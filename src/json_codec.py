@@ -0,0 +1,76 @@
+import json
+
+import requests
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_ENCODERS = ['json', 'orjson']
+_UTF8_ENCODINGS = ('utf-8', 'utf8')
+
+
+def _decodes_exactly() -> bool:
+    """
+    Returns `True`, if `orjson` refuses integers above 64 bits. Older versions decode them as floats silently;
+    responses are not decoded by such versions, so ids are never rounded.
+    """
+
+    try:
+        orjson.loads(b'18446744073709551616')
+
+    except orjson.JSONDecodeError:
+        return True
+
+    return False
+
+
+_ORJSON_DECODES = orjson is not None and _decodes_exactly()
+
+
+def loads_response(response: requests.Response):
+    """
+    Decodes the JSON body of a response. Bodies, which `orjson` can not decode (e.g. integers above 64 bits,
+    `NaN`, or bodies in other encodings than UTF-8), are decoded by `response.json()`.
+    """
+
+    if _ORJSON_DECODES and orjson is not None and (response.encoding or 'utf-8').lower() in _UTF8_ENCODINGS:
+        try:
+            return orjson.loads(response.content)
+
+        except orjson.JSONDecodeError:
+            pass
+
+    return response.json()
+
+
+def dumps_orjson(value) -> str:
+    """
+    Encodes a value by `orjson` as compact UTF-8 JSON. Values `orjson` can not encode are encoded by `json.dumps`.
+    """
+
+    try:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    except TypeError:
+        return json.dumps(value)
+
+
+def get_encoder(name: str = 'json'):
+    """
+    Returns the function encoding values of JSON columns. `json` is the standard library encoder, its output is
+    the same as in previous versions; `orjson` is several times faster, but its output is compact and not ASCII
+    escaped, e.g. `{"a":"ü"}` instead of `{"a": "\\u00fc"}`.
+    """
+
+    if name == 'orjson':
+        if orjson is None:
+            raise ImportError("Package orjson is required for the orjson JSON encoder.")
+
+        return dumps_orjson
+
+    if name == 'json':
+        return json.dumps
+
+    raise ValueError(f"Unknown JSON encoder {name}, supported encoders are {JSON_ENCODERS}.")
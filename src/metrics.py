@@ -0,0 +1,187 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]  # Upper bounds of latency histogram buckets
+
+# Path segments with ids are replaced, so that requests are grouped per endpoint
+_ID_SEGMENTS = re.compile(r'^(tables|tokens|projects|organizations|buckets|jobs)/(?!verify$)[^/]+|(?<=/)\d+(?=/|$)')
+
+
+def endpoint_name(client_name: str, endpoint_path: str) -> str:
+    """
+    Returns the name of an endpoint used in metrics, e.g. `StorageClient tables/{id}/events`.
+    """
+
+    def _replace(match):
+        return f'{match.group(1)}/{{id}}' if match.group(1) else '{id}'
+
+    return f"{client_name} {_ID_SEGMENTS.sub(_replace, endpoint_path or '')}"
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of run metrics: requests per endpoint and project (count, retries, errors, payload bytes,
+    latency histogram), rows written per table and wall time per dataset and project. Rows and datasets are
+    attributed to the project, which is being extracted in the current thread, see `project`; requests are
+    attributed to the project of the client sending them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+
+        with self._lock:
+            self.started = time.time()
+            self.requests = {}
+            self.tables = {}
+            self.datasets = {}
+            self.projects = {}
+
+    @property
+    def current_project(self) -> str:
+        return getattr(self._local, 'project', None)
+
+    @contextmanager
+    def project(self, project_id: str):
+        """
+        Attributes metrics recorded in the current thread to the project and measures its wall time.
+        """
+
+        self._local.project = project_id
+
+        try:
+            with self.measure(self.projects, project_id):
+                yield
+
+        finally:
+            self._local.project = None
+
+    @contextmanager
+    def dataset(self, dataset: str):
+
+        with self._lock:
+            timings = self.datasets.setdefault(dataset, {})
+
+        with self.measure(timings, self.current_project or ''):
+            yield
+
+    @contextmanager
+    def measure(self, timings: dict, key: str):
+
+        start = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            seconds = time.perf_counter() - start
+
+            with self._lock:
+                timing = timings.setdefault(key, {'count': 0, 'seconds': 0.0})
+                timing['count'] += 1
+                timing['seconds'] += seconds
+
+    def record_request(self, endpoint: str, seconds: float, status_code: int, payload_bytes: int, retries: int,
+                       project: str = None):
+
+        with self._lock:
+            request = self._get_request(endpoint, project)
+            request['count'] += 1
+            request['retries'] += retries
+            request['errors'] += int(status_code >= 400)
+            request['bytes'] += payload_bytes
+            request['seconds'] += seconds
+            request['max_seconds'] = max(request['max_seconds'], seconds)
+            request['latency_histogram'][self._get_bucket(seconds)] += 1
+
+    def record_retry(self, endpoint: str, project: str = None):
+        """
+        Records a retry of a throttled request, which is sent again after the throttled response was recorded.
+        """
+
+        with self._lock:
+            self._get_request(endpoint, project)['retries'] += 1
+
+    def _get_request(self, endpoint: str, project: str = None) -> dict:
+
+        if project is None:
+            project = self.current_project
+
+        requests = self.requests.setdefault(endpoint, {})
+        request = requests.get(project or '')
+
+        if request is None:
+            request = requests[project or ''] = {'count': 0, 'retries': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0,
+                                                 'max_seconds': 0.0,
+                                                 'latency_histogram': [0] * (len(LATENCY_BUCKETS) + 1)}
+
+        return request
+
+    @staticmethod
+    def _get_bucket(seconds: float) -> int:
+
+        for idx, upper_bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= upper_bound:
+                return idx
+
+        return len(LATENCY_BUCKETS)
+
+    def record_rows(self, table: str, rows: int):
+
+        project = self.current_project or ''
+
+        with self._lock:
+            table_rows = self.tables.setdefault(table, {})
+            table_rows[project] = table_rows.get(project, 0) + rows
+
+    def to_dict(self) -> dict:
+
+        with self._lock:
+            return {
+                'started': datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+                'wall_seconds': round(time.time() - self.started, 3),
+                'latency_buckets': LATENCY_BUCKETS,
+                'requests': json.loads(json.dumps(self.requests)),
+                'datasets': json.loads(json.dumps(self.datasets)),
+                'projects': json.loads(json.dumps(self.projects)),
+                'tables': json.loads(json.dumps(self.tables))
+            }
+
+    def to_rows(self) -> list:
+        """
+        Returns metrics flattened to rows of the `run-metrics` table.
+        """
+
+        metrics = self.to_dict()
+        rows = []
+
+        for endpoint, projects in metrics['requests'].items():
+            for project, request in projects.items():
+                rows += [{'scope': 'request', 'name': endpoint, 'project': project, 'count': request['count'],
+                          'retries': request['retries'], 'errors': request['errors'], 'bytes': request['bytes'],
+                          'seconds': round(request['seconds'], 3)}]
+
+        for dataset, projects in metrics['datasets'].items():
+            for project, timing in projects.items():
+                rows += [{'scope': 'dataset', 'name': dataset, 'project': project, 'count': timing['count'],
+                          'seconds': round(timing['seconds'], 3)}]
+
+        for project, timing in metrics['projects'].items():
+            rows += [{'scope': 'project', 'name': project, 'project': project, 'count': timing['count'],
+                      'seconds': round(timing['seconds'], 3)}]
+
+        for table, projects in metrics['tables'].items():
+            for project, table_rows in projects.items():
+                rows += [{'scope': 'table', 'name': table, 'project': project, 'rows': table_rows}]
+
+        return rows
+
+
+METRICS = MetricsRegistry()
@@ -0,0 +1,282 @@
+import logging
+from urllib.parse import quote
+
+EVENTS_LIMIT = 1000  # Number of events requested per page
+EVENTS_QUERY_MAX_LENGTH = 1500  # Maximum length of URL encoded events query, keeps request URLs well below limits
+KEYSET_JOBS_SORT = {'sortBy': 'id', 'sortOrder': 'desc'}  # Stable order of jobs required by keyset pagination
+
+QUEUE_KEYSET_JOBS_SORT = {'sortBy': 'createdTime', 'sortOrder': 'desc'}  # Queue API can not filter jobs by id
+
+WAITING_JOBS_QUERY = 'status:waiting OR status:processing'
+QUEUE_WAITING_JOBS_PARAMS = {'status[]': ['waiting', 'processing']}  # Filters of keyset paged Queue listings
+TABLE_LOAD_EVENTS = ['storage.tableExported', 'storage.tableImportError', 'storage.tableImportStarted',
+                     'storage.tableImportDone', 'storage.workspaceLoaded', 'storage.workspaceTableCloned']
+
+
+def get_tables_params(include: bool = True) -> dict:
+
+    return {'include': 'metadata,buckets,columns,columnMetadata'} if include else {}
+
+
+def get_transformation_jobs_query(last_job_id: str = None) -> str:
+
+    q = '(component:transformation OR params.component:transformation)'
+    # ' AND -(status:processing OR status:waiting OR status:terminating)'
+
+    if last_job_id is not None:
+        q += f' AND id:>{last_job_id}'
+        logging.debug(f"Downloading transformations jobs since last job id {last_job_id}.")
+    else:
+        q += ' AND createdTime:>now-7d'
+        logging.debug("Downloading transformations jobs created in the last 7 days.")
+
+    return q
+
+
+def get_queue_transformation_jobs_params(last_job_id: str = None) -> dict:
+    """
+    Returns Queue API filters of keyset paged transformation jobs, which replace the Syrup query syntax. The Queue API
+    can not filter jobs by id, jobs up to `last_job_id` are therefore left out by `QueueJobsPager`.
+    """
+
+    params = {'componentId[]': ['transformation']}
+
+    if last_job_id is not None:
+        logging.debug(f"Downloading transformations jobs since last job id {last_job_id}.")
+    else:
+        params['createdTimeFrom'] = '-7 days'
+        logging.debug("Downloading transformations jobs created in the last 7 days.")
+
+    return params
+
+
+def get_workspace_load_events_params(run_ids: list = None, **kwargs) -> dict:
+    """
+    Returns parameters of workspace load events, either of all runs, or of `run_ids` only.
+    """
+
+    kwargs['component'] = 'storage'
+
+    if run_ids is None:
+        kwargs['q'] = 'event:storage.workspaceLoaded'
+    else:
+        kwargs['q'] = f"event:storage.workspaceLoaded AND runId:({' OR '.join(run_ids)})"
+
+    return kwargs
+
+
+def get_table_load_events_params(date: str, since_id: int = None, **kwargs) -> dict:
+    """
+    Returns parameters of load events of a table created since `date`, only events newer than `since_id`, if it is set.
+    """
+
+    kwargs['component'] = 'storage'
+    kwargs['q'] = f"({' OR '.join([f'event:{e}' for e in TABLE_LOAD_EVENTS])}) AND created:>={date}"
+
+    if since_id is not None:
+        kwargs['sinceId'] = since_id
+
+    return kwargs
+
+
+def split_run_ids(run_ids: list, max_length: int = EVENTS_QUERY_MAX_LENGTH) -> list:
+    """
+    Splits run ids into chunks, so the URL encoded `runId:(a OR b OR ...)` query of each chunk stays within
+    `max_length` characters. Order of run ids is preserved.
+    """
+
+    chunks = []
+    chunk = []
+    chunk_length = 0
+    separator_length = len(quote(' OR '))
+
+    for run_id in run_ids:
+        run_id_length = len(quote(run_id)) + separator_length
+
+        if chunk and chunk_length + run_id_length > max_length:
+            chunks += [chunk]
+            chunk = []
+            chunk_length = 0
+
+        chunk += [run_id]
+        chunk_length += run_id_length
+
+    if chunk:
+        chunks += [chunk]
+
+    return chunks
+
+
+def build_keyset_query(query: str, max_id: int = None) -> str:
+    """
+    Returns the jobs query limited to jobs with lower ids than `max_id`, the lowest id on the previous page.
+    """
+
+    if max_id is None:
+        return query
+
+    return f'({query}) AND id:<{max_id}' if query else f'id:<{max_id}'
+
+
+class Pager:
+    """
+    Paging of a listing, which does not depend on the client sending the requests, so both synchronous and
+    asynchronous clients page listings the same way. Iterating a pager yields parameters of each page to request,
+    until the listing is complete; every downloaded page must be passed to `add_page`, which returns the items
+    of the page to yield.
+    """
+
+    def __init__(self, params: dict, limit: int):
+
+        self.params = dict(params)
+        self.params['limit'] = limit
+        self.limit = limit
+        self.is_complete = False
+
+    def __iter__(self):
+
+        while not self.is_complete:
+            yield self.get_params()
+
+    def get_params(self) -> dict:
+        raise NotImplementedError
+
+    def add_page(self, page: list) -> list:
+        raise NotImplementedError
+
+
+class OffsetPager(Pager):
+    """
+    Pages a listing by offset, the listing is complete once a page is not full.
+    """
+
+    def __init__(self, params: dict, limit: int):
+
+        super().__init__(params, limit)
+        self.offset = 0
+
+    def get_params(self) -> dict:
+
+        return {**self.params, 'offset': self.offset}
+
+    def add_page(self, page: list) -> list:
+
+        self.offset += self.limit
+        self.is_complete = len(page) < self.limit
+
+        return page
+
+
+class EventsPager(Pager):
+    """
+    Pages events, newest first, by `maxId`: each page starts at the oldest event of the previous page.
+    """
+
+    def __init__(self, params: dict, limit: int = EVENTS_LIMIT):
+
+        super().__init__(params, limit)
+        self.max_id = None
+
+    def get_params(self) -> dict:
+
+        if self.max_id is None:
+            return {**self.params, 'offset': 0}
+
+        return {**self.params, 'maxId': self.max_id}
+
+    def add_page(self, page: list) -> list:
+
+        # Depending on the API version, the event with id equal to maxId may be returned again
+        new_events = [e for e in page if self.max_id is None or e['id'] != self.max_id]
+
+        self.is_complete = len(page) < self.limit or not new_events
+
+        if new_events:
+            self.max_id = new_events[-1]['id']
+
+        return new_events
+
+
+class JobsPager(Pager):
+    """
+    Pages jobs by offset, or by job id with `keyset`: each page is then limited to jobs with lower ids than the
+    previous page, so new jobs created during the listing neither shift nor duplicate jobs on the following pages
+    and deep pages are as fast as the first one.
+    """
+
+    def __init__(self, params: dict, limit: int, keyset: bool = False):
+
+        super().__init__(params, limit)
+        self.keyset = keyset
+        self.query = self.params.get('q', '')
+        self.offset = 0
+        self.max_id = None
+
+        if keyset:
+            self.params.update(KEYSET_JOBS_SORT)
+
+    def get_params(self) -> dict:
+
+        if self.keyset:
+            return {**self.params, 'q': build_keyset_query(self.query, self.max_id)}
+
+        return {**self.params, 'offset': self.offset}
+
+    def add_page(self, page: list) -> list:
+
+        self.offset += self.limit
+
+        if not self.keyset:
+            self.is_complete = len(page) < self.limit
+            return page
+
+        # Jobs not lower than the previous page, returned when the id filter is not applied, would be requested again
+        # and again, the listing therefore ends with the first page without lower ids
+        new_jobs = [job for job in page if self.max_id is None or int(job['id']) < self.max_id]
+
+        self.is_complete = len(page) < self.limit or not new_jobs
+
+        if new_jobs:
+            self.max_id = min(int(job['id']) for job in new_jobs)
+
+        return new_jobs
+
+
+class QueueJobsPager(Pager):
+    """
+    Pages jobs of the Queue API by creation time, the keyset pagination of `JobsPager` for an API, which can not
+    filter jobs by id: each page is limited to jobs created up to the oldest job of the previous page. Jobs created
+    at that very time are listed again, jobs seen on previous pages are left out and the listing ends with the first
+    page without unseen jobs. With `since_id`, the listing ends at the first job not newer than `since_id`.
+    """
+
+    def __init__(self, params: dict, limit: int, since_id: str = None):
+
+        super().__init__(params, limit)
+        self.params.update(QUEUE_KEYSET_JOBS_SORT)
+        self.since_id = int(since_id) if since_id is not None else None
+        self.created_to = None
+        self.seen_ids = set()
+
+    def get_params(self) -> dict:
+
+        if self.created_to is None:
+            return dict(self.params)
+
+        return {**self.params, 'createdTimeTo': self.created_to}
+
+    def add_page(self, page: list) -> list:
+
+        new_jobs = [job for job in page if job['id'] not in self.seen_ids]
+        self.seen_ids.update(job['id'] for job in new_jobs)
+
+        self.is_complete = len(page) < self.limit or not new_jobs
+
+        if new_jobs:
+            self.created_to = new_jobs[-1]['createdTime']
+
+        if self.since_id is not None and any(int(job['id']) <= self.since_id for job in new_jobs):
+            self.is_complete = True
+            new_jobs = [job for job in new_jobs if int(job['id']) > self.since_id]
+
+        return new_jobs
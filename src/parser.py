@@ -1,3 +1,8 @@
+from typing import Callable, Iterable
+
+_MISSING = object()
+
+
 class FlattenJsonParser:
     def __init__(self, child_separator: str = '_', exclude_fields=None, flatten_lists=False, keys_to_ignore=None):
         self.child_separator = child_separator
@@ -48,3 +53,79 @@ class FlattenJsonParser:
 
         _flatten(nested_dict, None)
         return flattened_dict
+
+
+def build_projection(fields: list, separator: str = '_') -> dict:
+    """
+    Builds a nested projection from flattened field names, e.g. `['id', 'bucket_id', 'bucket_name']` results in
+    `{'id': True, 'bucket_id': True, 'bucket': {'id': True, 'name': True}}`. Value `True` keeps the whole subtree.
+    """
+
+    projection = {}
+
+    for field in fields:
+        projection[field] = True
+        path = field.split(separator)
+
+        if len(path) == 1:
+            continue
+
+        level = projection
+        for key in path[:-1]:
+            if level.get(key) is True:
+                break
+            level = level.setdefault(key, {})
+        else:
+            level[path[-1]] = True
+
+    return projection
+
+
+def project_object(obj, projection: dict):
+    """
+    Returns a copy of `obj` only with keys present in `projection`.
+    """
+
+    if projection is True or not isinstance(obj, dict):
+        return obj
+
+    return {key: project_object(value, projection[key]) for key, value in obj.items() if key in projection}
+
+
+class KeyedIndex:
+    """
+    Index of API objects by one of their keys, built in a single pass over the payload. Lookups are O(1); objects
+    without the key are left out of the index. If more objects share the same key, the last one is kept.
+    """
+
+    def __init__(self, objects: Iterable, key: str, key_function: Callable = str):
+        self.key = key
+        self.key_function = key_function
+
+        self._index = {}
+        for obj in objects:
+            if key not in obj:
+                continue
+            self._index[key_function(obj[key])] = obj
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key_value):
+        return self.key_function(key_value) in self._index
+
+    def get(self, key_value, default=None):
+        """
+        Returns the object with `key_value` or `default`, if there is no such object.
+        """
+
+        return self._index.get(self.key_function(key_value), default)
+
+    def __getitem__(self, key_value):
+
+        obj = self.get(key_value, _MISSING)
+
+        if obj is _MISSING:
+            raise KeyError(f"No object with {self.key} {self.key_function(key_value)} found.")
+
+        return obj
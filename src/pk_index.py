@@ -0,0 +1,92 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+
+MAX_MEMORY_KEYS = 500000  # Keys held in memory by an index before they're spilled to SQLite, about 50 MB
+_KEY_SEPARATOR = '\x1f'
+
+
+class PrimaryKeyIndex:
+    """
+    Index of primary keys of rows written to a table during a run, shared by all writers of the table. A row is
+    written only if its primary key was not seen before, so the first row with a key wins.
+
+    Keys are hashed to 16 byte BLAKE2b digests and kept in a set. Once the set holds more than `max_memory_keys`
+    keys, they're moved to a temporary SQLite database, which is looked up for every key not found in the set.
+    """
+
+    def __init__(self, key_positions: list, max_memory_keys: int = MAX_MEMORY_KEYS, spill_dir: str = None):
+
+        self.key_positions = list(key_positions)
+        self.max_memory_keys = max_memory_keys
+        self.spill_dir = spill_dir
+        self.duplicates = 0
+        self.spilled = 0
+
+        self._keys = set()
+        self._path = None
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def get_key(self, values: list) -> bytes:
+        """
+        Returns the hashed primary key of projected row values. Values are compared as they're written to CSV, so
+        keys of rows projected by `RowProjector` and of rows decoded from CSV are equal.
+        """
+
+        key = _KEY_SEPARATOR.join(['' if values[i] is None else str(values[i]) for i in self.key_positions])
+
+        return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+    def add(self, values: list) -> bool:
+        """
+        Adds the primary key of projected row values to the index. Returns `False`, if the key was already added.
+        """
+
+        key = self.get_key(values)
+
+        with self._lock:
+            if key in self._keys or (self._connection is not None and self._contains(key)):
+                self.duplicates += 1
+                return False
+
+            self._keys.add(key)
+
+            if len(self._keys) > self.max_memory_keys:
+                self._spill()
+
+        return True
+
+    def _contains(self, key: bytes) -> bool:
+
+        return self._connection.execute("SELECT 1 FROM keys WHERE key = ?", (key,)).fetchone() is not None
+
+    def _spill(self):
+
+        if self._connection is None:
+            _fd, self._path = tempfile.mkstemp(prefix='pk-index-', suffix='.sqlite', dir=self.spill_dir)
+            os.close(_fd)
+
+            self._connection = sqlite3.connect(self._path, isolation_level=None, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode = OFF")
+            self._connection.execute("PRAGMA synchronous = OFF")
+            self._connection.execute("CREATE TABLE keys (key BLOB PRIMARY KEY) WITHOUT ROWID")
+
+        self._connection.execute("BEGIN")
+        self._connection.executemany("INSERT INTO keys VALUES (?)", ((key,) for key in self._keys))
+        self._connection.execute("COMMIT")
+
+        self.spilled += len(self._keys)
+        self._keys = set()
+
+    def close(self):
+
+        with self._lock:
+            self._keys = set()
+
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+                os.remove(self._path)
@@ -0,0 +1,114 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+SAMPLE_INTERVAL = 0.005  # Seconds between two samples of stacks of threads extracting datasets
+
+
+class DatasetProfiler:
+    """
+    CPU profiler of dataset extraction. Each dataset is profiled by `cProfile` in the thread extracting it and stats
+    of all projects are merged per dataset.
+
+    In addition, stacks of all threads extracting a dataset are sampled every `sample_interval` seconds by a
+    background thread and counted as collapsed stacks (`dataset;frame;frame count`), which can be rendered as a
+    flame graph e.g. by `flamegraph.pl` or speedscope. Threads started by a dataset itself are not profiled.
+    """
+
+    def __init__(self, sample_interval: float = SAMPLE_INTERVAL):
+
+        self.sample_interval = sample_interval
+
+        self._stats = {}
+        self._threads = {}
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    @property
+    def datasets(self) -> list:
+        return list(self._stats)
+
+    @contextmanager
+    def profile(self, dataset: str):
+
+        ident = threading.get_ident()
+        profile = cProfile.Profile()
+
+        with self._lock:
+            self._threads[ident] = dataset
+
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name='dataset-profiler', daemon=True)
+                self._sampler.start()
+
+        try:
+            profile.enable()
+
+        except ValueError:
+            # Newer Python versions allow only one active profiler at a time, the dataset is only sampled then
+            profile = None
+
+        try:
+            yield
+
+        finally:
+            if profile is not None:
+                profile.disable()
+
+            with self._lock:
+                del self._threads[ident]
+
+                if profile is not None and dataset in self._stats:
+                    self._stats[dataset].add(profile)
+                elif profile is not None:
+                    self._stats[dataset] = pstats.Stats(profile)
+
+    def _sample(self):
+
+        while not self._stopped.wait(self.sample_interval):
+            frames = sys._current_frames()
+
+            with self._lock:
+                threads = list(self._threads.items())
+
+            for ident, dataset in threads:
+                frame = frames.get(ident)
+                stack = []
+
+                while frame is not None:
+                    code = frame.f_code
+                    stack += [f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})']
+                    frame = frame.f_back
+
+                stack += [dataset]
+
+                with self._lock:
+                    self._stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+
+        self._stopped.set()
+
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def dump_stats(self, dataset: str, path: str):
+
+        with self._lock:
+            self._stats[dataset].dump_stats(path)
+
+    def write_collapsed_stacks(self, path: str):
+
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+
+        with open(path, 'w') as stacks_file:
+            for stack, count in stacks:
+                stacks_file.write(f'{stack} {count}\n')
@@ -0,0 +1,200 @@
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+
+import requests
+
+MAX_RETRY_AFTER = 300  # Longest wait in seconds requested by a server, which is honored
+
+
+def get_retry_after(response: requests.Response, default: float) -> Optional[float]:
+    """
+    Returns seconds to wait before the request is retried, if the response is throttled, otherwise `None`. A response
+    is throttled on `429 Too Many Requests`, or on `503 Service Unavailable` with a `Retry-After` header. `default`
+    is used, if the header is missing or invalid.
+    """
+
+    retry_after = response.headers.get('Retry-After')
+
+    if response.status_code != 429 and (response.status_code != 503 or retry_after is None):
+        return None
+
+    if retry_after is None:
+        return default
+
+    try:
+        seconds = float(retry_after)
+
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(retry_after).timestamp() - time.time()
+
+        except (TypeError, ValueError):
+            return default
+
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class HostRateLimiter:
+    """
+    Limits requests to a single host by a token bucket of `rate` requests per second and by the number of
+    concurrent requests, which is tuned by AIMD: on a throttled response the limit is halved and all requests to
+    the host wait for the requested time, while responses are healthy the limit grows by one after each `limit`
+    healthy responses up to `max_concurrency`.
+
+    Without `rate` and `max_concurrency`, requests are not limited until the host throttles them for the first time.
+    """
+
+    def __init__(self, rate: float = 0, max_concurrency: int = 0):
+
+        self.rate = rate
+        self.max_concurrency = max_concurrency or None
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.throttled = 0
+
+        self._burst = max(rate, 1.0)
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._healthy = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+
+        self.acquire()
+
+        try:
+            yield
+
+        finally:
+            self.release()
+
+    def acquire(self):
+
+        with self._condition:
+            while True:
+                acquired, wait = self._try_acquire()
+
+                if acquired:
+                    return
+
+                self._condition.wait(wait)
+
+    def try_acquire(self) -> Tuple[bool, Optional[float]]:
+        """
+        Acquires a slot without waiting, used by the asynchronous clients. Returns whether the slot was acquired and
+        otherwise seconds to wait before the next attempt, or `None` until a request is released.
+        """
+
+        with self._condition:
+            return self._try_acquire()
+
+    def _try_acquire(self) -> Tuple[bool, Optional[float]]:
+
+        now = time.monotonic()
+        wait = self._paused_until - now
+
+        if wait <= 0 and self.limit is not None and self.in_flight >= self.limit:
+            # Woken up once a request is released or the limit grows
+            return False, None
+
+        elif wait <= 0:
+            wait = self._take_token(now)
+
+            if wait <= 0:
+                self.in_flight += 1
+                return True, None
+
+        return False, wait
+
+    def _take_token(self, now: float) -> float:
+        """
+        Takes a token from the bucket, or returns seconds until a token is available.
+        """
+
+        if not self.rate:
+            return 0
+
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+
+        return (1 - self._tokens) / self.rate
+
+    def release(self):
+
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_response(self, retry_after: Optional[float]):
+        """
+        Adjusts the limit after a response of a request holding a slot; `retry_after` is `None` for healthy
+        responses, see `get_retry_after`.
+        """
+
+        with self._condition:
+            if retry_after is None:
+                self._on_healthy_response()
+                return
+
+            now = time.monotonic()
+            self.throttled += 1
+            self._healthy = 0
+
+            # Concurrent requests throttled at once decrease the limit only once
+            if now >= self._paused_until:
+                self.limit = max(1, (self.limit or self.in_flight) // 2)
+
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+    def _on_healthy_response(self):
+
+        if self.limit is None or self.limit == self.max_concurrency:
+            return
+
+        self._healthy += 1
+
+        if self._healthy >= self.limit:
+            self.limit += 1
+            self._healthy = 0
+            self._condition.notify_all()
+
+
+class RateLimiters:
+    """
+    Rate limiters of all hosts, i.e. of each API of each stack, created on first use with the same settings.
+    """
+
+    def __init__(self, rate: float = 0, max_concurrency: int = 0):
+
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> HostRateLimiter:
+
+        with self._lock:
+            limiter = self._limiters.get(host)
+
+            if limiter is None:
+                limiter = self._limiters[host] = HostRateLimiter(self.rate, self.max_concurrency)
+
+            return limiter
+
+    def get_throttled(self) -> dict:
+        """
+        Returns throttled responses and the current concurrency limit of each throttled host.
+        """
+
+        with self._lock:
+            return {host: (limiter.throttled, limiter.limit) for host, limiter in self._limiters.items()
+                    if limiter.throttled}
@@ -1,14 +1,230 @@
 import csv
+import gzip
+import io
+import itertools
 import json
+import os
+import threading
+from typing import Callable
 
 from keboola.component.dao import TableDefinition
 
+from fingerprint import DatasetFingerprint
+from metrics import METRICS
+
+WRITER_BUFFER_SIZE = 1024 * 1024
+SLICE_COMPRESS_LEVEL = 6
+PARQUET_ROW_GROUP_SIZE = 64 * 1024  # Maximum number of rows buffered by a writer before they're written as a row group
+
+_MISSING = object()
+
+
+class RowProjector:
+    """
+    Projection plan compiled once for a table from its writer and JSON columns. Projecting a row yields the same
+    values as flattening the whole row with `_` separator and picking the writer columns, but only the paths
+    leading to the writer columns are visited and the row is not modified.
+
+    A flattened column name may correspond to several paths in a row (e.g. `a_b_c` to `a -> b_c` and `a_b -> c`).
+    In the rare case more than one of them is present in a row, the value is taken from the fully flattened row,
+    so the result is always identical to flattening. Values of JSON columns are encoded by `json_encoder`, see
+    `json_codec.get_encoder`.
+    """
+
+    def __init__(self, writer_columns: list, json_columns: list, separator: str = '_',
+                 json_encoder: Callable = json.dumps):
+
+        self.columns = list(writer_columns)
+        self.json_columns = list(json_columns)
+        self.separator = separator
+        self.json_encoder = json_encoder
+
+        self._plan = [(column, column in self.json_columns, self._compile_keys(column)) for column in self.columns]
+
+    def _compile_keys(self, column: str) -> tuple:
+        """
+        Returns keys, which may appear on a path flattening to `column`: item `i` lists keys joining parts `i` to
+        `end - 1` of the column together with `end`. Paths themselves are not enumerated, a column of `n` parts has
+        `2^(n-1)` of them; only keys present in a row are followed, see `_resolve`. Paths going through JSON
+        columns are left out, since JSON columns are never flattened.
+        """
+
+        parts = column.split(self.separator)
+        keys = tuple(tuple((self.separator.join(parts[start:end]), end) for end in range(start + 1, len(parts) + 1))
+                     for start in range(len(parts)))
+
+        return (tuple(key for key in keys[0] if key[0] not in self.json_columns),) + keys[1:]
+
+    @staticmethod
+    def _resolve(value: dict, keys: tuple, start: int = 0):
+        """
+        Returns the number of paths flattening to the column of `keys`, which lead to a scalar value in `value`,
+        and the last such value.
+        """
+
+        resolved, result = 0, _MISSING
+
+        for key, end in keys[start]:
+            if key not in value:
+                continue
+
+            _value = value[key]
+
+            if end == len(keys):
+                if type(_value) is not dict:
+                    resolved, result = resolved + 1, _value
+            elif type(_value) is dict:
+                _resolved, _result = RowProjector._resolve(_value, keys, end)
+                if _resolved:
+                    resolved, result = resolved + _resolved, _result
+
+        return resolved, result
+
+    def _flatten(self, x, out=None, name=''):
+        if out is None:
+            out = dict()
+
+        if type(x) is dict:
+            for a in x:
+                if name == '' and a in self.json_columns:
+                    continue
+                self._flatten(x[a], out, name + a + self.separator)
+        else:
+            out[name[:-1]] = x
+
+        return out
+
+    def project(self, row: dict, parent_dict: dict = None) -> list:
+
+        if parent_dict is None:
+            parent_dict = {}
+
+        values = []
+        flattened_row = None
+
+        for column, is_json, keys in self._plan:
+
+            if column in parent_dict:
+                values += [parent_dict[column]]
+                continue
+
+            if is_json and column in row:
+                values += [self.json_encoder(row[column])]
+                continue
+
+            resolved, value = self._resolve(row, keys)
+
+            if resolved == 0:
+                value = ''
+            elif resolved > 1:
+                if flattened_row is None:
+                    flattened_row = self._flatten(row)
+                value = flattened_row[column]
+
+            values += [value]
+
+        return values
+
+    def encode(self, rows: list, parent_dict: dict = None) -> str:
+        """
+        Returns projected rows encoded as CSV lines in the format of `Writer`. Projectors can be pickled, so rows
+        can also be encoded in other processes, see `Writer.write_encoded`.
+        """
+
+        _buffer = io.StringIO()
+        _writer = csv.writer(_buffer, quotechar='\"', quoting=csv.QUOTE_ALL)
+
+        for row in rows:
+            _writer.writerow(self.project(row, parent_dict))
+
+        return _buffer.getvalue()
+
+    @classmethod
+    def for_table(cls, table_definition: TableDefinition) -> 'RowProjector':
+
+        projector = getattr(table_definition, 'row_projector', None)
+
+        if projector is None:
+            projector = cls(table_definition.writer_columns, table_definition.json_columns,
+                            json_encoder=getattr(table_definition, 'json_encoder', json.dumps))
+            table_definition.row_projector = projector
+
+        return projector
+
+
+class ParquetSink:
+    """
+    Parquet file of a table shared by all writers of the table, see `ParquetWriter`. All columns are strings with the
+    same values, which would be written to CSV; each batch of rows is written as a compressed row group.
+
+    Requires `pyarrow`, which is only imported, when the Parquet output is used.
+    """
+
+    def __init__(self, path: str, columns: list, compression: str = 'zstd'):
+        import pyarrow
+
+        self.path = path
+        self.columns = list(columns)
+        self.compression = compression
+        self.schema = pyarrow.schema([(column, pyarrow.string()) for column in self.columns])
+
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def write_batch(self, column_batches: list):
+
+        import pyarrow
+        import pyarrow.parquet
+
+        batch = pyarrow.RecordBatch.from_arrays([pyarrow.array(values, pyarrow.string()) for values in column_batches],
+                                                schema=self.schema)
+
+        with self._lock:
+            if self._writer is None:
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, self.schema, compression=self.compression)
+
+            self._writer.write_batch(batch)
+
+    def close(self):
+
+        with self._lock:
+            if self._writer is None:
+                # No rows were written, the file still contains the schema
+                import pyarrow.parquet
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, self.schema, compression=self.compression)
+
+            self._writer.close()
+
 
 class Writer:
+    _path_locks = {}
+    _path_locks_guard = threading.Lock()
+    _slice_ids = itertools.count(1)
+
+    def __new__(cls, table_definition: TableDefinition):
+
+        # Tables selected for the Parquet output get a sink assigned, their rows are written by ParquetWriter instead
+        if cls is Writer and getattr(table_definition, 'parquet_sink', None) is not None:
+            cls = ParquetWriter
+
+        return super().__new__(cls)
 
     def __init__(self, table_definition: TableDefinition):
 
         self.tdf = table_definition
+        self.projector = RowProjector.for_table(table_definition)
+        self.rows = 0
+        self.fingerprint = DatasetFingerprint.current()
+        self.pk_index = getattr(table_definition, 'pk_index', None)
+
+    @classmethod
+    def get_path_lock(cls, path: str) -> threading.Lock:
+
+        with cls._path_locks_guard:
+            if path not in cls._path_locks:
+                cls._path_locks[path] = threading.Lock()
+
+            return cls._path_locks[path]
 
     def create_manifest(self):
 
@@ -24,57 +240,194 @@ class Writer:
             json.dump(template, manifest)
 
     def __enter__(self):
-        self.io = open(self.tdf.full_path, 'a')
+        self.sliced = getattr(self.tdf, 'sliced', False)
+        self.buffer = io.StringIO()
+
+        if self.sliced:
+            # The table directory exists even if no slice is written, so that an empty table is loaded
+            os.makedirs(self.tdf.full_path, exist_ok=True)
+            self.io = None
+        else:
+            self.io = open(self.tdf.full_path, 'a')
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.io.close()
+        self.flush()
+
+        if self.io is not None:
+            self.io.close()
+
+        self.record_rows()
+
+    def record_rows(self):
+        """
+        Records written rows in run metrics. Rows staged by a dataset fingerprint are recorded, once they're written.
+        """
+
+        if self.fingerprint is not None:
+            self.fingerprint.add_rows(self.tdf, self.rows)
+        else:
+            METRICS.record_rows(self.tdf.name, self.rows)
+
+    @classmethod
+    def open_slice(cls, table_path: str):
+        """
+        Opens a new gzip compressed slice in the directory of a sliced table. Each writer writes its own slice,
+        which is only created once the writer has some rows.
+        """
+
+        path = os.path.join(table_path, f'part-{next(cls._slice_ids):05d}.csv.gz')
+
+        return gzip.open(path, 'wt', compresslevel=SLICE_COMPRESS_LEVEL, newline='')
+
+    def flush(self):
+        """
+        Appends buffered rows to the output file. Rows are only ever written as whole lines under a per-file lock,
+        so writers of the same table running in different threads never interleave inside a CSV line. Slices of
+        sliced tables are not shared, so they are written without a lock. Rows of writers of a fingerprinted dataset
+        are staged in its `DatasetFingerprint` instead.
+        """
+
+        _data = self.buffer.getvalue()
+
+        if _data == '':
+            return
+
+        if self.fingerprint is not None:
+            self.fingerprint.stage(self.tdf, _data)
+
+        elif self.sliced:
+            if self.io is None:
+                self.io = self.open_slice(self.tdf.full_path)
+            self.io.write(_data)
+
+        else:
+            with self.get_path_lock(self.tdf.full_path):
+                self.io.write(_data)
+                self.io.flush()
+
+        self.buffer.seek(0)
+        self.buffer.truncate()
 
     def create_writer(self):
-        self.writer = csv.DictWriter(self.io, fieldnames=self.tdf.writer_columns,
-                                     restval='', extrasaction='ignore', quotechar='\"', quoting=csv.QUOTE_ALL)
+        self.writer = csv.writer(self.buffer, quotechar='\"', quoting=csv.QUOTE_ALL)
+
+    def is_duplicate(self, values: list) -> bool:
+        """
+        Returns `True`, if the table deduplicates primary keys and a row with the same key was already written.
+        """
+
+        return self.pk_index is not None and not self.pk_index.add(values)
 
     def write_row(self, row, parent_dict=None):
 
         if hasattr(self, 'writer') is False:
             self.create_writer()
 
-        save_aside = {}
-        for field in self.tdf.json_columns:
-            if field not in row:
-                continue
-            save_aside[field] = json.dumps(row[field])
-            del row[field]
+        values = self.projector.project(row, parent_dict)
 
-        row_f = {**self.flatten_json(x=row), **save_aside}
-        _dict_to_write = {}
+        if self.is_duplicate(values):
+            return
 
-        for key, value in row_f.items():
+        self.writer.writerow(values)
+        self.rows += 1
 
-            if key in self.tdf.writer_columns:
-                _dict_to_write[key] = value
+        if self.buffer.tell() >= WRITER_BUFFER_SIZE:
+            self.flush()
 
-            else:
-                continue
+    def write_encoded(self, data: str, rows: int):
+        """
+        Appends `rows` rows already encoded by `RowProjector.encode` of this table.
+        """
+
+        if self.pk_index is not None:
+            if hasattr(self, 'writer') is False:
+                self.create_writer()
 
-        if parent_dict is not None:
-            _dict_to_write = {**_dict_to_write, **parent_dict}
+            for values in csv.reader(io.StringIO(data)):
+                if not self.is_duplicate(values):
+                    self.writer.writerow(values)
+                    self.rows += 1
 
-        self.writer.writerow(_dict_to_write)
+        else:
+            self.buffer.write(data)
+            self.rows += rows
+
+        if self.buffer.tell() >= WRITER_BUFFER_SIZE:
+            self.flush()
+
+    def write_staged(self, staged_file, rows: int):
+        """
+        Appends `rows` rows staged by `DatasetFingerprint` from a file positioned at its start. Staged rows were
+        already deduplicated, when they were written.
+        """
+
+        for data in iter(lambda: staged_file.read(WRITER_BUFFER_SIZE), ''):
+            self.buffer.write(data)
+            self.flush()
+
+        self.rows += rows
 
     def write_rows(self, list_to_write, parent_dict=None):
 
         for row in list_to_write:
             self.write_row(row, parent_dict)
 
-    def flatten_json(self, x, out=None, name=''):
-        if out is None:
-            out = dict()
 
-        if type(x) is dict:
-            for a in x:
-                self.flatten_json(x[a], out, name + a + '_')
+class ParquetWriter(Writer):
+    """
+    Writer of tables with the Parquet output. Projected rows are buffered in column batches, which are written to the
+    `ParquetSink` of the table as row groups.
+    """
+
+    def __enter__(self):
+        self.sink = self.tdf.parquet_sink
+        self.column_batches = [[] for _ in self.sink.columns]
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+        self.record_rows()
+
+    def flush(self):
+
+        if not self.column_batches[0]:
+            return
+
+        if self.fingerprint is not None:
+            # Staged rows are encoded as CSV, they're decoded again by `write_staged`
+            _buffer = io.StringIO()
+            csv.writer(_buffer, quotechar='\"', quoting=csv.QUOTE_ALL).writerows(zip(*self.column_batches))
+            self.fingerprint.stage(self.tdf, _buffer.getvalue())
         else:
-            out[name[:-1]] = x
+            self.sink.write_batch(self.column_batches)
 
-        return out
+        self.column_batches = [[] for _ in self.sink.columns]
+
+    def _append(self, values: list):
+
+        for column_batch, value in zip(self.column_batches, values):
+            column_batch.append('' if value is None else str(value))
+
+        self.rows += 1
+
+        if len(self.column_batches[0]) >= PARQUET_ROW_GROUP_SIZE:
+            self.flush()
+
+    def write_row(self, row, parent_dict=None):
+
+        values = self.projector.project(row, parent_dict)
+
+        if not self.is_duplicate(values):
+            self._append(values)
+
+    def write_encoded(self, data: str, rows: int):
+
+        for values in csv.reader(io.StringIO(data)):
+            if not self.is_duplicate(values):
+                self._append(values)
+
+    def write_staged(self, staged_file, rows: int):
+
+        for values in csv.reader(staged_file):
+            self._append(values)
@@ -268,3 +268,9 @@ FIELDS_R_NOTIFICATIONS = ["id", "component_id", "configuration_id", 'region', 'p
                           'recipient__address', 'filters']
 JSON_NOTIFICATIONS = []
 PK_NOTIFICATIONS = ["id", 'region', 'project_id']
+
+FIELDS_RUN_METRICS = ['run_started', 'scope', 'name', 'project', 'count', 'retries', 'errors', 'bytes', 'seconds',
+                      'rows']
+FIELDS_R_RUN_METRICS = FIELDS_RUN_METRICS
+JSON_RUN_METRICS = []
+PK_RUN_METRICS = ['run_started', 'scope', 'name', 'project']
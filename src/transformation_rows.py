@@ -0,0 +1,35 @@
+from typing import Tuple
+
+from result import RowProjector
+
+
+def encode_queries(projector: RowProjector, queries: list, parent_dict: dict) -> Tuple[str, int]:
+    """
+    Encodes queries of a legacy transformation as rows of `transformations-queries`. Returns the encoded rows and
+    their count.
+    """
+
+    return projector.encode([{'query_index': idx, 'query': q} for idx, q in enumerate(queries)], parent_dict), \
+        len(queries)
+
+
+def encode_code_blocks(projector: RowProjector, code_blocks: list, parent_dict: dict) -> Tuple[str, int]:
+    """
+    Encodes scripts of all codes in code blocks of a transformation as rows of `transformations-v2-codes`. Returns
+    the encoded rows and their count.
+    """
+
+    encoded_rows = []
+    rows = 0
+
+    for cb_idx, cb in enumerate(code_blocks):
+        _cb_parent = {**{'block_name': cb['name'], 'block_index': cb_idx}, **parent_dict}
+
+        for c_idx, c in enumerate(cb.get('codes', [])):
+            _c_parent = {**_cb_parent, **{'code_name': c['name'], 'code_index': c_idx}}
+
+            _scripts = [{'script': sc, 'script_index': sc_idx} for sc_idx, sc in enumerate(c.get('script', []))]
+            encoded_rows += [projector.encode(_scripts, _c_parent)]
+            rows += len(_scripts)
+
+    return ''.join(encoded_rows), rows
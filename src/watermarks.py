@@ -0,0 +1,32 @@
+import base64
+import json
+import logging
+import zlib
+
+
+def encode_watermarks(watermarks: dict) -> str:
+    """
+    Returns watermarks of table load events, `{project_key: {table_id: [event_id, change]}}`, compressed for the state
+    file the same way as the conditional requests cache, see `ConditionalCache.to_state`.
+    """
+
+    return base64.b64encode(zlib.compress(json.dumps(watermarks, separators=(',', ':')).encode())).decode()
+
+
+def decode_watermarks(state_value: str) -> dict:
+    """
+    Reads watermarks of table load events from state, see `encode_watermarks`.
+    """
+
+    if not state_value:
+        return {}
+
+    try:
+        watermarks = json.loads(zlib.decompress(base64.b64decode(state_value)))
+
+    except (ValueError, TypeError, zlib.error):
+        logging.warning("Could not read table load events watermarks from state, load events of all tables are "
+                        "downloaded since the date of the last run.")
+        return {}
+
+    return watermarks if isinstance(watermarks, dict) else {}
@@ -0,0 +1,366 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import unittest
+from unittest import mock
+from urllib.parse import quote
+
+import requests
+
+import client
+from async_client import AsyncClientError, AsyncClientPool, AsyncConnectionError, AsyncNotificationClient, \
+    AsyncQueueClient, AsyncSchedulerClient, AsyncStorageClient, AsyncSyrupClient, build_async_response
+from client import NotificationClient, QueueClient, SchedulerClient, StorageClient, SyrupClient
+from metrics import METRICS
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'benchmarks'))
+
+from mock_api import MockOrganization, get_api_urls, serve  # noqa: E402
+
+PROJECT_ID = '101'
+TOKEN = f'{PROJECT_ID}-token'
+TABLE_ID = 'in.c-b1.t1'
+
+
+class TestSplitRunIds(unittest.TestCase):
+
+    def test_chunks_keep_order_and_fit_max_length(self):
+
+        run_ids = [f'{1000 + i}.{i}' for i in range(50)]
+        chunks = StorageClient.split_run_ids(run_ids, max_length=60)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual([run_id for chunk in chunks for run_id in chunk], run_ids)
+
+        for chunk in chunks:
+            self.assertLessEqual(len(quote(' OR '.join(chunk))), 60)
+
+    def test_run_id_longer_than_max_length_gets_own_chunk(self):
+
+        self.assertEqual(StorageClient.split_run_ids(['1', 'x' * 100, '2'], max_length=20), [['1'], ['x' * 100], ['2']])
+
+    def test_no_run_ids(self):
+
+        self.assertEqual(StorageClient.split_run_ids([]), [])
+
+
+class MockApiTestCase(unittest.TestCase):
+    """
+    Runs clients of both flavours against a local mock of the Keboola APIs, see `benchmarks/mock_api.py`.
+    """
+
+    org_parameters = {}
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.org = MockOrganization(**{'projects': 1, 'tables': 3, 'events': 30, 'jobs': 25, **cls.org_parameters})
+        cls.server = serve(cls.org)
+        cls.urls = mock.patch.dict(client.KEBOOLA_API_URLS, get_api_urls(cls.server))
+        cls.urls.start()
+        cls.pool = AsyncClientPool()
+
+    @classmethod
+    def tearDownClass(cls):
+
+        cls.pool.close()
+        cls.urls.stop()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+class TestClientParity(MockApiTestCase):
+
+    def setUp(self):
+
+        # Small pages, so that all listings span several pages
+        for client_class in (StorageClient, AsyncStorageClient):
+            patcher = mock.patch.object(client_class, 'EVENTS_LIMIT', 7)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for client_class in (SyrupClient, AsyncSyrupClient, QueueClient, AsyncQueueClient):
+            patcher = mock.patch.object(client_class, 'LIMIT', 4)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_table_load_events(self):
+
+        storage = StorageClient('x', TOKEN, PROJECT_ID)
+        async_storage = AsyncStorageClient('x', TOKEN, PROJECT_ID, self.pool)
+
+        events = list(storage.iter_table_load_events(TABLE_ID, '2023-01-01'))
+
+        self.assertEqual(len(events), 30)
+        self.assertEqual(len({e['id'] for e in events}), 30)
+        self.assertEqual(self.pool.run(async_storage.get_table_load_events(TABLE_ID, '2023-01-01')), events)
+        self.assertEqual(list(self.pool.iterate(async_storage.iter_table_load_events(TABLE_ID, '2023-01-01'))),
+                         events)
+
+        since_id = events[10]['id']
+        self.assertEqual(storage.get_table_load_events(TABLE_ID, '2023-01-01', since_id), events[:10])
+        self.assertEqual(self.pool.run(async_storage.get_table_load_events(TABLE_ID, '2023-01-01', since_id)),
+                         events[:10])
+
+    def test_workspace_load_events_for_split_runs(self):
+
+        storage = StorageClient('x', TOKEN, PROJECT_ID)
+        async_storage = AsyncStorageClient('x', TOKEN, PROJECT_ID, self.pool)
+
+        run_ids = [job['runId'] for job in self.org.projects[PROJECT_ID]['jobs']]
+        chunks = storage.split_run_ids(run_ids, max_length=100)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(AsyncStorageClient.split_run_ids(run_ids, max_length=100), chunks)
+        self.assertEqual([run_id for chunk in chunks for run_id in chunk], run_ids)
+
+        events = [e for chunk in chunks for e in storage.get_workspace_load_events_for_runs(chunk)]
+        async_events = [e for chunk in chunks
+                        for e in self.pool.run(async_storage.get_workspace_load_events_for_runs(chunk))]
+
+        self.assertEqual(len(events), 2 * len(run_ids))
+        self.assertEqual(async_events, events)
+
+    def test_jobs(self):
+
+        for keyset in (False, True):
+            for sync_class, async_class in ((SyrupClient, AsyncSyrupClient), (QueueClient, AsyncQueueClient)):
+                with self.subTest(keyset=keyset, client=sync_class.__name__):
+                    jobs_client = sync_class('x', TOKEN, PROJECT_ID, keyset)
+                    async_jobs_client = async_class('x', TOKEN, PROJECT_ID, self.pool, keyset)
+
+                    jobs = jobs_client.get_transformation_jobs(oldest_first=True)
+
+                    self.assertEqual([int(job['id']) for job in jobs], list(range(10001, 10026)))
+                    self.assertEqual(self.pool.run(async_jobs_client.get_transformation_jobs(oldest_first=True)),
+                                     jobs)
+
+                    waiting_jobs = list(jobs_client.iter_waiting_and_processing_jobs())
+
+                    self.assertEqual([job['id'] for job in waiting_jobs], ['10025'])
+                    self.assertEqual(list(self.pool.iterate(async_jobs_client.iter_waiting_and_processing_jobs())),
+                                     waiting_jobs)
+
+    def test_tables(self):
+
+        storage = StorageClient('x', TOKEN, PROJECT_ID)
+        async_storage = AsyncStorageClient('x', TOKEN, PROJECT_ID, self.pool)
+        projection = {'id': True, 'bucket': {'id': True}}
+
+        tables = list(storage.iter_all_tables(projection=projection))
+
+        self.assertEqual(tables, [{'id': f'in.c-b1.t{t}', 'bucket': {'id': 'in.c-b1'}} for t in range(3)])
+        self.assertEqual(list(self.pool.iterate(async_storage.iter_all_tables(projection=projection))), tables)
+        self.assertEqual(self.pool.run(async_storage.get_all_tables()), storage.get_all_tables())
+
+    def test_schedules_and_notifications(self):
+
+        schedules = SchedulerClient('x', TOKEN, PROJECT_ID)
+        async_schedules = AsyncSchedulerClient('x', TOKEN, PROJECT_ID, self.pool)
+        notifications = NotificationClient('x', TOKEN, PROJECT_ID)
+        async_notifications = AsyncNotificationClient('x', TOKEN, PROJECT_ID, self.pool)
+
+        self.assertEqual(list(self.pool.iterate(async_schedules.iter_schedules())), schedules.get_schedules())
+        self.assertEqual(list(self.pool.iterate(async_notifications.iter_notifications())),
+                         notifications.get_notifications())
+
+    def test_iterate_closes_abandoned_iterator(self):
+
+        async_storage = AsyncStorageClient('x', TOKEN, PROJECT_ID, self.pool)
+        iterator = async_storage.iter_table_load_events(TABLE_ID, '2023-01-01')
+
+        for _ in self.pool.iterate(iterator):
+            break
+
+        self.assertIsNone(iterator.ag_frame)
+
+
+class TestThrottling(MockApiTestCase):
+
+    org_parameters = {'rate_limit': 2}
+
+    def test_throttled_requests_are_retried(self):
+
+        METRICS.reset()
+
+        with METRICS.project('mock|101'):
+            storage = StorageClient('x', TOKEN, PROJECT_ID)
+            async_storage = AsyncStorageClient('x', TOKEN, PROJECT_ID, self.pool)
+
+        for _ in range(3):
+            self.assertTrue(storage.verify_storage_token())
+            self.assertTrue(self.pool.run(async_storage.verify_storage_token()))
+
+        self.assertGreater(self.org.throttled, 0)
+
+        # Throttled responses are recorded as errors, each of them is retried
+        request = METRICS.to_dict()['requests']['StorageClient tokens/verify']['mock|101']
+        self.assertEqual(request['errors'], self.org.throttled)
+        self.assertEqual(request['retries'], self.org.throttled)
+        self.assertEqual(request['count'], 6 + self.org.throttled)
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """
+    Jobs are listed page by page, each page limited to jobs with lower ids than the previous one. The API returning
+    the same page of jobs again, e.g. when it ignores the keyset filter, ends the listing.
+    """
+
+    PAGE = [{'id': str(job_id), 'status': 'success', 'createdTime': f'2023-03-01T00:00:0{job_id % 10}+00:00'}
+            for job_id in (10004, 10003, 10002, 10001)]
+
+    JOBS = [{'id': str(job_id), 'status': 'success'} for job_id in range(10010, 10000, -1)]
+
+    def setUp(self):
+
+        self.pool = AsyncClientPool()
+        self.addCleanup(self.pool.close)
+
+    @classmethod
+    def get_response(cls) -> requests.Response:
+        return build_async_response('GET', 'http://mock/jobs', 200, {}, json.dumps(cls.PAGE).encode())
+
+    def list_jobs(self, endpoint: str, params: dict) -> requests.Response:
+
+        self.requested += [dict(params)]
+        jobs = self.JOBS
+
+        for max_id in re.findall(r'id:<(\d+)', params.get('q', '')):
+            jobs = [job for job in jobs if int(job['id']) < int(max_id)]
+
+        offset = params.get('offset', 0)
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(jobs[offset:offset + params['limit']]).encode()
+
+        return response
+
+    def test_pages_are_limited_to_lower_ids(self):
+
+        for client_class, keyset in ((SyrupClient, False), (SyrupClient, True), (QueueClient, False)):
+            with self.subTest(client=client_class.__name__, keyset=keyset):
+                self.requested = []
+                jobs_client = client_class('x', TOKEN, PROJECT_ID, keyset)
+                jobs_client.LIMIT = 4
+
+                with mock.patch.object(jobs_client, 'get_raw',
+                                       side_effect=lambda endpoint, params: self.list_jobs(endpoint, params)):
+                    jobs = list(jobs_client.iter_waiting_and_processing_jobs())
+
+                self.assertEqual(jobs, self.JOBS)
+                self.assertEqual(len(self.requested), 3)
+
+                if keyset:
+                    self.assertEqual([params['q'] for params in self.requested],
+                                     ['status:waiting OR status:processing',
+                                      '(status:waiting OR status:processing) AND id:<10007',
+                                      '(status:waiting OR status:processing) AND id:<10003'])
+                    self.assertEqual(self.requested[0]['sortBy'], 'id')
+                else:
+                    self.assertEqual([params['offset'] for params in self.requested], [0, 4, 8])
+
+    def test_repeated_page_ends_listing(self):
+
+        for sync_class, async_class in ((SyrupClient, AsyncSyrupClient), (QueueClient, AsyncQueueClient)):
+            with self.subTest(client=sync_class.__name__):
+                jobs_client = sync_class('x', TOKEN, PROJECT_ID, True)
+                jobs_client.LIMIT = len(self.PAGE)
+
+                with mock.patch.object(jobs_client, 'get_raw', side_effect=lambda *a, **kw: self.get_response()) \
+                        as get_raw:
+                    self.assertEqual(jobs_client.get_transformation_jobs(), self.PAGE)
+
+                self.assertEqual(get_raw.call_count, 2)
+
+                async_jobs_client = async_class('x', TOKEN, PROJECT_ID, self.pool, True)
+                async_jobs_client.LIMIT = len(self.PAGE)
+
+                with mock.patch.object(async_jobs_client, 'get_raw', new_callable=mock.AsyncMock,
+                                       side_effect=lambda *a, **kw: self.get_response()) as get_raw:
+                    self.assertEqual(self.pool.run(async_jobs_client.get_transformation_jobs()), self.PAGE)
+
+                self.assertEqual(get_raw.call_count, 2)
+
+    def test_queue_listing_without_keyset_sends_query(self):
+
+        queue = QueueClient('x', TOKEN, PROJECT_ID)
+
+        with mock.patch.object(queue, 'get_raw', side_effect=lambda *a, **kw: self.get_response()) as get_raw:
+            self.assertEqual(queue.get_transformation_jobs('10002'), self.PAGE)
+            self.assertEqual(queue.get_waiting_and_processing_jobs(), self.PAGE)
+
+        self.assertEqual([c.kwargs['params'] for c in get_raw.call_args_list],
+                         [{'q': '(component:transformation OR params.component:transformation) AND id:>10002',
+                           'limit': QueueClient.LIMIT, 'offset': 0},
+                          {'q': 'status:waiting OR status:processing', 'limit': QueueClient.LIMIT, 'offset': 0}])
+
+    def test_queue_listing_ends_at_since_id(self):
+
+        queue = QueueClient('x', TOKEN, PROJECT_ID, True)
+
+        with mock.patch.object(queue, 'get_raw', side_effect=lambda *a, **kw: self.get_response()) as get_raw:
+            jobs = queue.get_transformation_jobs('10002', oldest_first=True)
+
+        self.assertEqual([job['id'] for job in jobs], ['10003', '10004'])
+        self.assertEqual(get_raw.call_count, 1)
+        self.assertNotIn('q', get_raw.call_args.kwargs['params'])
+
+
+class TestAsyncConnectionError(unittest.TestCase):
+
+    def test_connection_error_is_requests_connection_error(self):
+
+        pool = AsyncClientPool()
+        self.addCleanup(pool.close)
+
+        with mock.patch.dict(client.KEBOOLA_API_URLS, {'syrup': 'http://127.0.0.1:9/syrup'}):
+            syrup = AsyncSyrupClient('x', TOKEN, PROJECT_ID, pool)
+
+        syrup.max_retries = 0
+
+        with self.assertRaises(requests.exceptions.ConnectionError) as context:
+            pool.run(syrup.get_waiting_and_processing_jobs())
+
+        self.assertIsInstance(context.exception, AsyncConnectionError)
+
+
+class TestAsyncErrors(unittest.TestCase):
+    """
+    Errors of coroutines are raised to the caller and the event loop keeps running.
+    """
+
+    def setUp(self):
+
+        self.pool = AsyncClientPool()
+        self.addCleanup(self.pool.close)
+
+    def test_error_response_is_raised(self):
+
+        storage = AsyncStorageClient('x', TOKEN, PROJECT_ID, self.pool)
+        response = build_async_response('GET', 'http://mock/tokens', 403, {}, b'{"error": "Forbidden"}')
+
+        for call in (storage.get_tokens, storage.get_storage_buckets, storage.get_workspace_load_events):
+            with self.subTest(call=call.__name__), \
+                    mock.patch.object(storage, 'get_raw', new_callable=mock.AsyncMock, return_value=response):
+                with self.assertRaisesRegex(AsyncClientError, 'Received: 403'):
+                    self.pool.submit(call()).result(timeout=10)
+
+        self.assertTrue(self.pool._thread.is_alive())
+
+    def test_system_exit_is_set_on_future(self):
+
+        async def exit_run():
+            sys.exit(1)
+
+        with self.assertRaises(SystemExit):
+            self.pool.submit(exit_run()).result(timeout=10)
+
+        self.assertTrue(self.pool._thread.is_alive())
+        self.assertEqual(self.pool.run(asyncio.sleep(0, 'done')), 'done')
+
+
+if __name__ == '__main__':
+    unittest.main()
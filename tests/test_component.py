@@ -0,0 +1,364 @@
+import copy
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from async_client import AsyncClientError, AsyncStorageClient
+from client import StorageClient
+from component import KEY_GET_ALL_CONFIGURATIONS, Component
+from executor import SingleFlightMemo
+from metrics import METRICS
+from tests.test_clients import PROJECT_ID, TOKEN, MockApiTestCase
+from watermarks import decode_watermarks, encode_watermarks
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+
+
+class TestGroupEventsByRunId(unittest.TestCase):
+
+    def test_events_of_child_runs_are_assigned_to_parent_runs(self):
+
+        events = [{'id': 1, 'runId': '100'}, {'id': 2, 'runId': '100.1'}, {'id': 3, 'runId': '200.1.2'},
+                  {'id': 4, 'runId': '100.2'}]
+
+        self.assertEqual(Component._group_events_by_run_id(events, ['100', '200', '300']),
+                         {'100': [events[0], events[1], events[3]], '200': [events[2]], '300': []})
+
+    def test_nested_run_is_preferred_to_its_parent(self):
+
+        events = [{'id': 1, 'runId': '100.1.5'}, {'id': 2, 'runId': '100.2'}]
+
+        self.assertEqual(Component._group_events_by_run_id(events, ['100', '100.1']),
+                         {'100': [events[1]], '100.1': [events[0]]})
+
+    def test_unmatched_events_are_left_out(self):
+
+        events = [{'id': 1, 'runId': '999.1'}, {'id': 2, 'runId': None}, {'id': 3}, {'id': 4, 'runId': '1000'}]
+
+        self.assertEqual(Component._group_events_by_run_id(events, ['100']), {'100': []})
+
+
+class TestNotificationIds(unittest.TestCase):
+
+    def test_ids_are_taken_from_filters(self):
+
+        notification = {'id': '1', 'filters': [{'field': 'job.component.id', 'value': 'keboola.orchestrator'},
+                                               {'field': 'job.configuration.id', 'value': '123'},
+                                               {'field': 'phase.id', 'value': '7'}]}
+
+        self.assertEqual(Component._get_ids_from_notification(notification),
+                         {'component_id': 'keboola.orchestrator', 'configuration_id': '123', 'phase_id': '7'})
+
+    def test_missing_filters_are_empty(self):
+
+        self.assertEqual(Component._get_ids_from_notification({'id': '1', 'filters': []}),
+                         {'component_id': None, 'configuration_id': None, 'phase_id': None})
+
+
+class TestStackConcurrency(unittest.TestCase):
+
+    def test_valid_concurrency_is_converted_to_integers(self):
+        self.assertEqual(Component.validate_stack_concurrency(4, 'p'), 4)
+        self.assertEqual(Component.validate_stack_concurrency('4', 'p'), 4)
+        self.assertEqual(Component.validate_stack_concurrency({'keboola.com': '8', 'default': 2}, 'p'),
+                         {'keboola.com': 8, 'default': 2})
+
+    def test_invalid_concurrency_exits(self):
+        for concurrency in [0, -1, 1.5, 'x', None, True, [2], {'keboola.com': 0}]:
+            with self.subTest(concurrency=concurrency), self.assertLogs(level='ERROR'), \
+                    self.assertRaises(SystemExit):
+                Component.validate_stack_concurrency(concurrency, 'table_events_concurrency')
+
+    def test_stack_concurrency_falls_back_to_default(self):
+        concurrency = {'keboola.com': 8, 'default': 2}
+
+        self.assertEqual(Component.get_stack_concurrency(concurrency, 'keboola.com'), 8)
+        self.assertEqual(Component.get_stack_concurrency(concurrency, 'eu-central-1.keboola.com'), 2)
+        self.assertEqual(Component.get_stack_concurrency({}, 'keboola.com'), 1)
+
+
+class TestComponentConfigurations(unittest.TestCase):
+    """
+    Configurations of a component are taken from the listing of all configurations, if it has all needed fields.
+    The listing is shaped after the documented response of `components?include=configuration,rows`.
+    """
+
+    def setUp(self):
+
+        with open(os.path.join(DATA_DIR, 'components_include_configuration_rows.json')) as listing_file:
+            self.listing = json.load(listing_file)
+
+        self.component = Component.__new__(Component)
+        self.component.parameters = SimpleNamespace(datasets={KEY_GET_ALL_CONFIGURATIONS: True})
+
+        self.storage = mock.Mock(spec=StorageClient)
+        self.storage.get_all_configurations.return_value = self.listing
+        self.storage.get_component_configurations.return_value = [{'id': 'separately requested'}]
+
+    def get_configurations(self, component_id: str) -> list:
+        return self.component.get_component_configurations(component_id, SingleFlightMemo(), self.storage)
+
+    def test_configurations_are_taken_from_listing(self):
+
+        for component in self.listing:
+            with self.subTest(component=component['id']):
+                self.assertEqual(self.get_configurations(component['id']), component['configurations'])
+
+        self.storage.get_all_configurations.assert_called()
+        self.storage.get_component_configurations.assert_not_called()
+
+    def test_incomplete_listing_falls_back_to_component_configurations(self):
+
+        listing = copy.deepcopy(self.listing)
+        del listing[1]['configurations'][0]['currentVersion']
+        self.storage.get_all_configurations.return_value = listing
+
+        self.assertEqual(self.get_configurations('keboola.snowflake-transformation'),
+                         [{'id': 'separately requested'}])
+        self.storage.get_component_configurations.assert_called_once_with('keboola.snowflake-transformation')
+
+    def test_component_without_configurations(self):
+
+        self.assertEqual(self.get_configurations('keboola.python-transformation-v2'), [])
+        self.storage.get_component_configurations.assert_not_called()
+
+
+class TestTableLoadEventWatermarks(unittest.TestCase):
+    """
+    Watermarks `[event_id, change]` of table load events: unchanged tables are skipped, changed tables are requested
+    since their watermark, which advances to the newest event, and watermarks of removed tables are dropped.
+    """
+
+    PROJECT_KEY = 'keboola_com|101'
+
+    def setUp(self):
+
+        self.component = Component.__new__(Component)
+        self.component.parameters = SimpleNamespace(incremental=True, skip_unchanged_tables=True,
+                                                    table_events_concurrency=1)
+        self.component.latest_date = '2023-01-01'
+        self.component._state_lock = threading.Lock()
+        self.component.build_table_definition = mock.Mock()
+
+        self.storage = mock.Mock(spec=StorageClient)
+        self.storage.iter_table_load_events.side_effect = lambda table_id, date, since_id: [
+            {'id': str(event_id)} for event_id in range(12, 10, -1) if since_id is None or event_id > since_id]
+        self.component.client = SimpleNamespace(storage=self.storage)
+
+        self.changes = {'in.c-b.unchanged': Component.get_table_change({'lastImportDate': '2023-01-01'}),
+                        'in.c-b.changed': Component.get_table_change({'lastImportDate': '2023-02-01'}),
+                        'in.c-b.new': Component.get_table_change({'lastImportDate': '2023-02-01'})}
+        self.component.get_table_changes = lambda: self.changes
+
+        previous_change = Component.get_table_change({'lastImportDate': '2023-01-01'})
+        self.component.table_events_watermarks = {self.PROJECT_KEY: {'in.c-b.unchanged': [5, previous_change],
+                                                                     'in.c-b.changed': [11, previous_change],
+                                                                     'in.c-b.removed': [3, previous_change]}}
+
+        patcher = mock.patch('component.Writer')
+        self.writer = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_watermarks_are_skipped_advanced_and_dropped(self):
+
+        self.component.get_table_load_events({'region': 'keboola.com', 'project_id': '101'}, self.PROJECT_KEY)
+
+        self.assertEqual(self.storage.iter_table_load_events.call_args_list,
+                         [mock.call('in.c-b.changed', '2023-01-01', 11), mock.call('in.c-b.new', '2023-01-01', None)])
+        self.assertEqual(self.writer.write_row.call_count, 3)
+        self.assertEqual(self.component.table_events_watermarks,
+                         {self.PROJECT_KEY: {'in.c-b.unchanged': [5, self.changes['in.c-b.unchanged']],
+                                             'in.c-b.changed': [12, self.changes['in.c-b.changed']],
+                                             'in.c-b.new': [12, self.changes['in.c-b.new']]}})
+
+    def test_watermarks_are_compact_in_state(self):
+
+        watermarks = self.component.table_events_watermarks
+
+        self.assertEqual(len(self.changes['in.c-b.changed']), 12)
+        self.assertIsInstance(encode_watermarks(watermarks), str)
+        self.assertEqual(decode_watermarks(encode_watermarks(watermarks)), watermarks)
+        self.assertEqual(decode_watermarks(None), {})
+
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(decode_watermarks('not compressed'), {})
+
+
+class ComponentRunTestCase(MockApiTestCase):
+    """
+    Runs the whole component against the mock of the Keboola APIs in a temporary data directory.
+    """
+
+    DATASETS = ['get_tokens', 'get_tokens_last_events', 'get_orchestrations_v2', 'get_triggers', 'get_waiting_jobs',
+                'get_tables', 'get_columns', 'get_all_configurations', 'get_transformations_v2',
+                'get_workspace_load_events', 'get_tables_load_events', 'get_schedules', 'get_notifications',
+                'get_storage_buckets']
+
+    def run_component(self, state: dict = None, **parameters) -> str:
+
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+
+        for directory in ('in', 'out/tables', 'out/files'):
+            os.makedirs(os.path.join(data_dir.name, directory))
+
+        if state is not None:
+            with open(os.path.join(data_dir.name, 'in', 'state.json'), 'w') as state_file:
+                json.dump(state, state_file)
+
+        config = {'datasets': {dataset: True for dataset in self.DATASETS}, 'incremental_load': 1,
+                  'tokens': [{'#key': TOKEN, 'region': 'mock'}], 'master_token': [], **parameters}
+
+        with open(os.path.join(data_dir.name, 'config.json'), 'w') as config_file:
+            json.dump({'parameters': config}, config_file)
+
+        METRICS.reset()
+
+        with mock.patch.dict(os.environ, {'KBC_DATADIR': data_dir.name, 'KBC_STACKID': 'connection.mock'}):
+            Component().run()
+
+        return os.path.join(data_dir.name, 'out')
+
+    @staticmethod
+    def read_tables(out: str) -> dict:
+
+        tables = {}
+
+        for name in os.listdir(os.path.join(out, 'tables')):
+            with open(os.path.join(out, 'tables', name)) as table:
+                tables[name] = table.read()
+
+        return tables
+
+
+class TestAsynchronousClients(ComponentRunTestCase):
+
+    def test_output_equals_output_of_synchronous_clients(self):
+
+        tables = self.read_tables(self.run_component())
+
+        self.assertGreater(len(tables['tables-load-events']), 0)
+        self.assertEqual(self.read_tables(self.run_component(asynchronous_clients=True)), tables)
+
+    def test_error_response_ends_run(self):
+
+        with mock.patch.object(AsyncStorageClient, 'get_tokens',
+                               side_effect=AsyncClientError('Could not download tokens.')), \
+                self.assertRaises(SystemExit):
+            self.run_component(asynchronous_clients=True)
+
+
+class TestFlattenProcesses(ComponentRunTestCase):
+
+    def test_output_equals_output_without_worker_processes(self):
+
+        tables = self.read_tables(self.run_component())
+
+        self.assertGreater(len(tables['transformations-v2-codes']), 0)
+        self.assertEqual(self.read_tables(self.run_component(flatten_processes=2, max_parallel_projects=2)), tables)
+
+
+class TestDatasetProfiles(ComponentRunTestCase):
+
+    def test_profiles_are_written_to_output_files(self):
+
+        files = os.listdir(os.path.join(self.run_component(profile_datasets=True), 'files'))
+
+        self.assertIn('profile_get_tables.pstats', files)
+        self.assertIn('profile_get_tables.pstats.manifest', files)
+        self.assertIn('profile_stacks.collapsed', files)
+
+
+class TestTransformationDiscovery(ComponentRunTestCase):
+
+    CUSTOM_COMPONENT_ID = 'acme.custom-transformation'
+
+    def setUp(self):
+
+        components = self.org.projects[PROJECT_ID]['components']
+        snowflake = next(c for c in components if c['id'] == 'keboola.snowflake-transformation')
+        components += [{**copy.deepcopy(snowflake), 'id': self.CUSTOM_COMPONENT_ID, 'name': 'Custom'}]
+        self.addCleanup(components.pop)
+
+    def get_transformations(self, **parameters) -> list:
+
+        out = self.run_component(**parameters)
+
+        with open(os.path.join(out, 'tables', 'transformations-v2')) as table:
+            return list(csv.reader(table))
+
+    def get_component_ids(self, **parameters) -> list:
+
+        # Component id is the fourth column of the table
+        return sorted({row[3] for row in self.get_transformations(**parameters)})
+
+    def test_components_of_transformation_type_are_discovered(self):
+
+        self.assertEqual(self.get_component_ids(), ['keboola.python-transformation-v2',
+                                                    'keboola.snowflake-transformation'])
+        self.assertEqual(self.get_component_ids(discover_transformations_v2=True),
+                         [self.CUSTOM_COMPONENT_ID, 'keboola.python-transformation-v2',
+                          'keboola.snowflake-transformation'])
+
+    def test_discovery_without_all_configurations(self):
+
+        datasets = {dataset: True for dataset in self.DATASETS if dataset != KEY_GET_ALL_CONFIGURATIONS}
+
+        self.assertEqual(self.get_transformations(datasets=datasets, discover_transformations_v2=True),
+                         self.get_transformations(discover_transformations_v2=True))
+
+
+class TestParallelProjects(ComponentRunTestCase):
+
+    org_parameters = {'projects': 3}
+
+    MANAGEMENT_DATASETS = {'get_project_users': True, 'get_organization_users': True}
+
+    def run_management(self, state: dict = None, **parameters) -> tuple:
+
+        datasets = {**{dataset: True for dataset in self.DATASETS}, **self.MANAGEMENT_DATASETS}
+        out = self.run_component(state, datasets=datasets,
+                                 master_token=[{'#token': 'm', 'org_id': '1', 'region': 'mock'}], **parameters)
+
+        with open(os.path.join(out, 'state.json')) as state_file:
+            state = json.load(state_file)
+
+        # Rows of projects downloaded in parallel are interleaved, but every row must be whole
+        tables = {name: sorted(content.splitlines()) for name, content in self.read_tables(out).items()}
+
+        return tables, state
+
+    def test_output_and_state_equal_sequential_run(self):
+
+        tables, state = self.run_management()
+        parallel_tables, parallel_state = self.run_management(max_parallel_projects=3)
+
+        self.assertEqual(len(state['tokens']), 3)
+        self.assertEqual(len(state['tr_last_processed_id']), 3)
+        self.assertEqual(parallel_tables, tables)
+
+        for key in ('tokens', 'tr_last_processed_id'):
+            self.assertEqual(parallel_state[key], state[key])
+
+    def test_invalid_and_expired_tokens_from_state_are_replaced(self):
+
+        expires = int(time.time()) + 30 * 24 * 3600
+        tokens = {'mock|101': {'id': '1', '#token': '101-valid', 'expires': expires},
+                  'mock|102': {'id': '2', '#token': '102-expired', 'expires': int(time.time()) - 3600},
+                  'mock|103': {'id': '3', '#token': '999-invalid', 'expires': expires}}
+
+        _, state = self.run_management({'tokens': tokens}, token_preflight_concurrency=3)
+
+        self.assertEqual(state['tokens']['mock|101'], tokens['mock|101'])
+        self.assertEqual(state['tokens']['mock|102']['#token'], '102-generated')
+        self.assertEqual(state['tokens']['mock|103']['#token'], '103-generated')
+
+
+if __name__ == '__main__':
+    unittest.main()
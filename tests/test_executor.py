@@ -0,0 +1,82 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from executor import OrderedStage
+
+
+def delayed(value: int, delay: float) -> int:
+    time.sleep(delay)
+    return value
+
+
+class TestOrderedStage(unittest.TestCase):
+
+    def setUp(self):
+
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+        self.consumed = []
+
+    def test_results_are_consumed_in_submission_order(self):
+
+        with OrderedStage(self.executor, self.consumed.append, max_pending=3) as stage:
+            for value in range(10):
+                # Later calls finish first
+                stage.submit(delayed, value, 0.01 * (10 - value))
+
+        self.assertEqual(self.consumed, list(range(10)))
+
+    def test_pending_calls_are_bounded(self):
+
+        with OrderedStage(self.executor, self.consumed.append, max_pending=2) as stage:
+            for value in range(6):
+                stage.submit(delayed, value, 0)
+                # Results of all but the last `max_pending` calls are consumed while submitting
+                self.assertGreaterEqual(len(self.consumed), value - 1)
+
+        self.assertEqual(self.consumed, list(range(6)))
+
+    def test_without_executor_calls_are_consumed_right_away(self):
+
+        stage = OrderedStage(None, self.consumed.append, max_pending=2)
+        stage.submit(delayed, 1, 0)
+
+        self.assertEqual(self.consumed, [1])
+
+    def test_exception_of_call_is_raised_to_submitter(self):
+
+        def fail(value: int):
+            raise ValueError(value)
+
+        with self.assertRaises(ValueError) as context:
+            with OrderedStage(self.executor, self.consumed.append, max_pending=1) as stage:
+                stage.submit(delayed, 0, 0)
+                stage.submit(fail, 1)
+                stage.submit(delayed, 2, 0)
+
+        self.assertEqual(context.exception.args, (1,))
+        self.assertEqual(self.consumed, [0])
+
+    def test_pending_calls_are_cancelled_on_error(self):
+
+        # Cleanups run in reverse order, the blocked call is released before the executor is shut down
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        gate = threading.Event()
+        self.addCleanup(gate.set)
+
+        with self.assertRaises(RuntimeError):
+            with OrderedStage(executor, self.consumed.append, max_pending=5) as stage:
+                stage.submit(gate.wait)
+                stage.submit(delayed, 1, 0)
+                pending = list(stage._pending)
+                raise RuntimeError
+
+        self.assertTrue(pending[1].cancelled())
+        self.assertEqual(self.consumed, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
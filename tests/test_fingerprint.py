@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from fingerprint import DatasetFingerprint
+from metrics import METRICS
+from result import Writer
+
+ROWS = [{'id': i, 'name': f'row {i}', 'params': {'a': i}} for i in range(5)]
+
+
+class TestDatasetFingerprint(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+        METRICS.reset()
+
+    def get_table_definition(self, name: str = 'table') -> SimpleNamespace:
+
+        return SimpleNamespace(name=name, full_path=os.path.join(self.directory.name, name),
+                               writer_columns=['id', 'name', 'params', 'project_id'], json_columns=['params'],
+                               columns=['id', 'name', 'params', 'project_id'], primary_key=['id'], incremental=True)
+
+    @staticmethod
+    def stage_rows(fingerprint: DatasetFingerprint, table_definition, rows: list):
+
+        with fingerprint.staging():
+            with Writer(table_definition) as wrt:
+                wrt.write_rows(rows, {'project_id': '101'})
+
+    def read_output(self, table_definition) -> str:
+
+        with open(table_definition.full_path) as output:
+            return output.read()
+
+    def test_staged_rows_are_written_on_commit(self):
+
+        tdf = self.get_table_definition()
+        expected_tdf = self.get_table_definition('expected')
+
+        with Writer(expected_tdf) as wrt:
+            wrt.write_rows(ROWS, {'project_id': '101'})
+
+        fingerprint = DatasetFingerprint('dataset', spool_size=16)
+        self.stage_rows(fingerprint, tdf, ROWS)
+
+        self.assertIsNone(DatasetFingerprint.current())
+        self.assertEqual(self.read_output(tdf), '')
+
+        fingerprint.commit()
+
+        self.assertEqual(self.read_output(tdf), self.read_output(expected_tdf))
+        self.assertEqual(METRICS.to_dict()['tables']['table'], {'': len(ROWS)})
+
+    def test_discarded_rows_are_not_written(self):
+
+        tdf = self.get_table_definition()
+
+        fingerprint = DatasetFingerprint('dataset')
+        self.stage_rows(fingerprint, tdf, ROWS)
+        fingerprint.discard()
+
+        self.assertEqual(self.read_output(tdf), '')
+        self.assertNotIn('table', METRICS.to_dict()['tables'])
+
+    def test_error_while_staging_discards_rows(self):
+
+        tdf = self.get_table_definition()
+        fingerprint = DatasetFingerprint('dataset')
+
+        with self.assertRaises(ValueError):
+            with fingerprint.staging():
+                with Writer(tdf) as wrt:
+                    wrt.write_rows(ROWS)
+                raise ValueError
+
+        self.assertIsNone(DatasetFingerprint.current())
+        fingerprint.commit()
+        self.assertEqual(self.read_output(tdf), '')
+
+    def test_fingerprint_depends_on_content_of_all_tables(self):
+
+        def get_fingerprint(rows: list, other_rows: list = ROWS) -> str:
+            fingerprint = DatasetFingerprint('dataset')
+            self.stage_rows(fingerprint, self.get_table_definition(), rows)
+            self.stage_rows(fingerprint, self.get_table_definition('other'), other_rows)
+            digest = fingerprint.hexdigest()
+            fingerprint.discard()
+            return digest
+
+        self.assertEqual(get_fingerprint(ROWS), get_fingerprint(ROWS))
+        self.assertNotEqual(get_fingerprint(ROWS), get_fingerprint(ROWS[:-1]))
+        self.assertNotEqual(get_fingerprint(ROWS), get_fingerprint(list(reversed(ROWS))))
+        self.assertNotEqual(get_fingerprint(ROWS), get_fingerprint(ROWS, ROWS[1:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+from client import KeboolaHttpClient, StorageClient, SyrupClient
+from component import CONDITIONAL_CACHE_ENDPOINTS
+from http_cache import ConditionalCache, ResponseCache, build_cache_key
+from tests.test_clients import PROJECT_ID, TOKEN, MockApiTestCase
+
+
+class TestCacheKey(unittest.TestCase):
+
+    def test_key_does_not_depend_on_headers(self):
+
+        key = build_cache_key('connection.keboola.com', 'project:1', '/v2/storage/tokens', {'a': 1})
+
+        self.assertEqual(key, build_cache_key('connection.keboola.com', 'project:1', '/v2/storage/tokens', {'a': '1'}))
+        self.assertNotEqual(key, build_cache_key('connection.keboola.com', 'project:2', '/v2/storage/tokens',
+                                                 {'a': 1}))
+        self.assertNotEqual(key, build_cache_key('connection.eu-central-1.keboola.com', 'project:1',
+                                                 '/v2/storage/tokens', {'a': 1}))
+        self.assertNotEqual(key, build_cache_key('connection.keboola.com', 'project:1', '/v2/storage/buckets',
+                                                 {'a': 1}))
+
+
+class TestResponseCache(MockApiTestCase):
+
+    def setUp(self):
+
+        _fd, path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(_fd)
+        self.addCleanup(os.remove, path)
+
+        self.cache = ResponseCache(path, {'tokens': 3600, 'default': 0}, 1024 * 1024)
+        self.addCleanup(self.cache.close)
+
+        patcher = mock.patch.object(KeboolaHttpClient, 'response_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_responses_are_shared_by_verified_tokens_of_project(self):
+
+        tokens = StorageClient('x', TOKEN, PROJECT_ID).get_tokens()
+        requests_sent = self.org.requests
+
+        # Another token of the same project is verified once, then served from the cache
+        other_storage = StorageClient('x', f'{PROJECT_ID}-other', PROJECT_ID)
+
+        self.assertEqual(other_storage.get_tokens(), tokens)
+        self.assertEqual(other_storage.get_tokens(), tokens)
+        self.assertEqual(self.org.requests, requests_sent + 1)
+        self.assertEqual(self.cache.hits, {'tokens': 2})
+
+    def test_token_of_other_project_is_not_served_from_cache(self):
+
+        StorageClient('x', TOKEN, PROJECT_ID).get_tokens()
+        requests_sent = self.org.requests
+
+        with self.assertLogs(level='WARNING'), self.assertRaises(SystemExit):
+            StorageClient('x', 'unknown-token', PROJECT_ID).get_tokens()
+
+        # Verification and the request itself are sent, the request fails with the invalid token
+        self.assertEqual(self.org.requests, requests_sent + 2)
+
+    def test_tokens_of_other_clients_are_verified_by_storage(self):
+
+        syrup = SyrupClient('x', TOKEN, PROJECT_ID)
+
+        self.assertTrue(syrup._has_cache_access())
+        self.assertFalse(SyrupClient('x', TOKEN, '999')._has_cache_access())
+
+
+class TestConditionalCache(MockApiTestCase):
+    """
+    Listings are revalidated with their `ETag`, responses of other endpoints are not cached.
+    """
+
+    org_parameters = {'etag': True}
+
+    def setUp(self):
+
+        self.cache = ConditionalCache(1024 * 1024, CONDITIONAL_CACHE_ENDPOINTS)
+
+        patcher = mock.patch.object(KeboolaHttpClient, 'conditional_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.storage = StorageClient('x', TOKEN, PROJECT_ID)
+
+    @staticmethod
+    def build_response(body: bytes, etag: str) -> requests.Response:
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        response.headers['ETag'] = etag
+
+        return response
+
+    def test_not_modified_listing_is_reused(self):
+
+        tokens = self.storage.get_tokens()
+        not_modified = self.org.not_modified
+
+        self.assertEqual(self.storage.get_tokens(), tokens)
+        self.assertEqual(self.org.not_modified, not_modified + 1)
+        self.assertEqual(self.cache.not_modified, 1)
+
+        # The cache survives in the state
+        state_cache = ConditionalCache.from_state(self.cache.to_state(), 1024 * 1024, CONDITIONAL_CACHE_ENDPOINTS)
+
+        with mock.patch.object(KeboolaHttpClient, 'conditional_cache', state_cache):
+            self.assertEqual(self.storage.get_tokens(), tokens)
+
+        self.assertEqual(state_cache.not_modified, 1)
+
+    def test_changed_listing_refreshes_validators(self):
+
+        tokens = self.storage.get_tokens()
+        key = next(iter(self.cache._entries))
+        etag = self.cache.get_validators(key)['If-None-Match']
+
+        project_tokens = self.org.projects[PROJECT_ID]['tokens']
+        self.addCleanup(project_tokens.pop)
+        project_tokens.append({**project_tokens[0], 'id': 'new'})
+
+        self.assertEqual(self.storage.get_tokens(), tokens + [project_tokens[-1]])
+        self.assertNotEqual(self.cache.get_validators(key)['If-None-Match'], etag)
+        self.assertEqual(self.cache.not_modified, 0)
+
+    def test_events_and_jobs_are_not_cached(self):
+
+        for endpoint in ('events', 'tables/in.c-b1.t1/events', 'tokens/1/events', 'jobs', 'queue/jobs'):
+            self.assertFalse(self.cache.is_cached(endpoint), endpoint)
+
+        self.storage.get_workspace_load_events()
+        SyrupClient('x', TOKEN, PROJECT_ID).get_transformation_jobs()
+
+        self.assertEqual(len(self.cache._entries), 0)
+
+    def test_least_recently_used_entries_are_evicted(self):
+
+        cache = ConditionalCache(10, CONDITIONAL_CACHE_ENDPOINTS)
+
+        cache.store('a', self.build_response(b'aaaa', '"a"'))
+        cache.store('b', self.build_response(b'bbbb', '"b"'))
+        cache.get_validators('a')
+        cache.store('c', self.build_response(b'cccc', '"c"'))
+
+        self.assertEqual(list(cache._entries), ['a', 'c'])
+        self.assertEqual(cache.get_validators('b'), {})
+
+        cache.store('d', self.build_response(b'd' * 11, '"d"'))
+        self.assertNotIn('d', cache._entries)
+
+
+if __name__ == '__main__':
+    unittest.main()
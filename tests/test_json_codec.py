@@ -0,0 +1,94 @@
+import json
+import unittest
+from json import JSONDecodeError
+from unittest import mock
+
+import json_codec
+from async_client import build_async_response
+from json_codec import get_encoder, loads_response
+
+BODIES = [b'{"a": [1, 2.5, null, true], "b": {"c": "\\u00fc\\n"}}', '[{"name": "ü"}]'.encode(), b'[]',
+          b'{"id": 18446744073709551616}', b'{"value": NaN}', b'{"x": 1e400}']
+VALUES = [{'a': [1, 2.5, None, True], 'b': {'c': 'ü"\n'}}, [], 'text', {1: 'non-string key'},
+          {'big': 2 ** 70}]
+
+
+def build_response(content: bytes, content_type: str = 'application/json'):
+    return build_async_response('GET', 'https://connection.mock/v2/storage/tokens', 200,
+                                {'Content-Type': content_type}, content)
+
+
+class TestLoadsResponse(unittest.TestCase):
+
+    def test_bodies_are_decoded_as_by_requests(self):
+
+        for body in BODIES:
+            with self.subTest(body=body):
+                self.assertEqual(json.dumps(loads_response(build_response(body))),
+                                 json.dumps(build_response(body).json()))
+
+    def test_bodies_are_decoded_by_orjson_as_by_requests(self):
+
+        with mock.patch.object(json_codec, '_ORJSON_DECODES', True), \
+                mock.patch.object(json_codec.orjson, 'loads', wraps=json_codec.orjson.loads) as orjson_loads:
+            for body in BODIES[:3]:
+                with self.subTest(body=body):
+                    self.assertEqual(json.dumps(loads_response(build_response(body))),
+                                     json.dumps(build_response(body).json()))
+
+        self.assertEqual(orjson_loads.call_count, 3)
+
+    def test_other_encodings_are_decoded_by_requests(self):
+
+        body = '{"name": "ü"}'.encode('latin-1')
+        response = build_response(body, 'application/json; charset=latin-1')
+
+        self.assertEqual(loads_response(response), {'name': 'ü'})
+
+    def test_invalid_body_raises_decode_error(self):
+
+        with self.assertRaises(JSONDecodeError):
+            loads_response(build_response(b'<html></html>'))
+
+    def test_bodies_are_decoded_without_orjson(self):
+
+        with mock.patch.object(json_codec, 'orjson', None):
+            for body in BODIES:
+                with self.subTest(body=body):
+                    self.assertEqual(json.dumps(loads_response(build_response(body))),
+                                     json.dumps(build_response(body).json()))
+
+            with self.assertRaises(JSONDecodeError):
+                loads_response(build_response(b'<html></html>'))
+
+
+class TestGetEncoder(unittest.TestCase):
+
+    def test_json_encoder_is_standard_library(self):
+
+        self.assertIs(get_encoder(), json.dumps)
+        self.assertIs(get_encoder('json'), json.dumps)
+
+    def test_orjson_encodes_same_values_compactly(self):
+
+        encoder = get_encoder('orjson')
+
+        for value in VALUES:
+            with self.subTest(value=value):
+                self.assertEqual(json.loads(encoder(value)), json.loads(json.dumps(value)))
+
+        self.assertEqual(encoder({'a': 'ü'}), '{"a":"ü"}')
+
+    def test_orjson_encoder_requires_orjson(self):
+
+        with mock.patch.object(json_codec, 'orjson', None), self.assertRaises(ImportError):
+            get_encoder('orjson')
+
+    def test_unknown_encoder(self):
+
+        with self.assertRaises(ValueError):
+            get_encoder('ujson')
+
+
+if __name__ == '__main__':
+    unittest.main()
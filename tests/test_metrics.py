@@ -0,0 +1,38 @@
+import unittest
+
+from metrics import MetricsRegistry, endpoint_name
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_requests_are_recorded_per_project(self):
+
+        metrics = MetricsRegistry()
+
+        with metrics.project('stack|1'):
+            metrics.record_request('StorageClient tokens', 0.1, 200, 10, 0)
+
+        metrics.record_request('StorageClient tokens', 0.2, 429, 0, 0, 'stack|2')
+        metrics.record_retry('StorageClient tokens', 'stack|2')
+        metrics.record_request('StorageClient tokens', 0.3, 200, 20, 1, 'stack|2')
+
+        requests = metrics.to_dict()['requests']['StorageClient tokens']
+
+        self.assertEqual(requests['stack|1']['count'], 1)
+        self.assertEqual({k: requests['stack|2'][k] for k in ('count', 'retries', 'errors', 'bytes')},
+                         {'count': 2, 'retries': 2, 'errors': 1, 'bytes': 20})
+
+        rows = [row for row in metrics.to_rows() if row['scope'] == 'request']
+        self.assertEqual([(row['project'], row['count'], row['retries']) for row in rows],
+                         [('stack|1', 1, 0), ('stack|2', 2, 2)])
+
+    def test_endpoint_name_replaces_ids(self):
+
+        self.assertEqual(endpoint_name('StorageClient', 'tables/in.c-a.b/events'), 'StorageClient tables/{id}/events')
+        self.assertEqual(endpoint_name('StorageClient', 'tokens/verify'), 'StorageClient tokens/verify')
+        self.assertEqual(endpoint_name('SyrupClient', 'orchestrator/orchestrations/123/tasks'),
+                         'SyrupClient orchestrator/orchestrations/{id}/tasks')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from component import Component
+from result import Writer
+
+PARENT_DICT = {'region': 'keboola.com', 'project_id': '101'}
+ROWS = [{'id': f'in.c-b.t{i}', 'name': f't{i}', 'rowsCount': i, 'isAlias': i % 2 == 0, 'bucket': {'id': 'in.c-b'}}
+        for i in range(10)]
+
+
+class OutputTestCase(unittest.TestCase):
+    """
+    Builds the component in a temporary data directory and writes tables through its table definitions, as datasets
+    are written during a run.
+    """
+
+    def build_component(self, **parameters) -> Component:
+
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+
+        for directory in ('in', 'out/tables', 'out/files'):
+            os.makedirs(os.path.join(data_dir.name, directory))
+
+        config = {'datasets': {'get_tables': True}, 'tokens': [{'#key': '101-token', 'region': 'keboola.com'}],
+                  'master_token': [], **parameters}
+
+        with open(os.path.join(data_dir.name, 'config.json'), 'w') as config_file:
+            json.dump({'parameters': config}, config_file)
+
+        with mock.patch.dict(os.environ, {'KBC_DATADIR': data_dir.name}):
+            return Component()
+
+    @staticmethod
+    def write_rows(component: Component, table_name: str, *row_batches: list):
+
+        for rows in row_batches:
+            with Writer(component.build_table_definition(table_name)) as wrt:
+                wrt.write_rows(rows, PARENT_DICT)
+
+    @staticmethod
+    def read_manifest(path: str) -> dict:
+
+        with open(path + '.manifest') as manifest:
+            return json.load(manifest)
+
+    @staticmethod
+    def read_csv(path: str) -> list:
+
+        with open(path, newline='') as csv_file:
+            return list(csv.reader(csv_file))
+
+    def write_csv_table(self) -> str:
+
+        component = self.build_component()
+        self.write_rows(component, 'tables', ROWS[:6], ROWS[6:])
+        component.write_manifests(list(component.table_definitions.values()))
+
+        return component.table_definitions['tables'].full_path
+
+
+class TestParquetOutput(OutputTestCase):
+
+    def test_parquet_table_equals_csv_table(self):
+        import pyarrow.parquet
+
+        csv_path = self.write_csv_table()
+
+        component = self.build_component(parquet_datasets=['tables'])
+        self.write_rows(component, 'tables', ROWS[:6], ROWS[6:])
+        component.write_parquet_manifests()
+
+        tdf = component.table_definitions['tables']
+        parquet_path = os.path.join(component.files_out_path, 'tables.parquet')
+        parquet_table = pyarrow.parquet.read_table(parquet_path)
+
+        self.assertFalse(os.path.exists(tdf.full_path))
+        self.assertEqual(self.read_manifest(parquet_path)['tags'], ['kbc-project-metadata', 'parquet', 'tables'])
+        self.assertEqual(parquet_table.column_names, self.read_manifest(csv_path)['columns'])
+        self.assertEqual([list(row) for row in zip(*parquet_table.to_pydict().values())], self.read_csv(csv_path))
+
+    def test_parquet_table_without_rows_has_schema(self):
+        import pyarrow.parquet
+
+        component = self.build_component(parquet_datasets=['tables'])
+        self.write_rows(component, 'tables', [])
+        component.write_parquet_manifests()
+
+        parquet_table = pyarrow.parquet.read_table(os.path.join(component.files_out_path, 'tables.parquet'))
+
+        self.assertEqual(parquet_table.num_rows, 0)
+        self.assertEqual(parquet_table.column_names, component.table_definitions['tables'].columns)
+
+
+class TestSlicedOutput(OutputTestCase):
+
+    @staticmethod
+    def read_slices(path: str) -> list:
+
+        rows = []
+
+        for slice_name in sorted(os.listdir(path)):
+            with gzip.open(os.path.join(path, slice_name), 'rt', newline='') as slice_file:
+                rows += list(csv.reader(slice_file))
+
+        return rows
+
+    def test_sliced_table_equals_csv_table(self):
+
+        csv_path = self.write_csv_table()
+
+        component = self.build_component(sliced_output=True)
+        self.write_rows(component, 'tables', ROWS[:6], ROWS[6:])
+        component.write_manifests(list(component.table_definitions.values()))
+
+        sliced_path = component.table_definitions['tables'].full_path
+
+        self.assertTrue(os.path.isdir(sliced_path))
+        self.assertEqual(len(os.listdir(sliced_path)), 2)
+        self.assertTrue(all(name.endswith('.csv.gz') for name in os.listdir(sliced_path)))
+        self.assertEqual(self.read_manifest(sliced_path), self.read_manifest(csv_path))
+        self.assertEqual(self.read_slices(sliced_path), self.read_csv(csv_path))
+
+    def test_sliced_table_without_rows_is_empty_directory(self):
+
+        component = self.build_component(sliced_output=True)
+        self.write_rows(component, 'tables', [])
+        component.write_manifests(list(component.table_definitions.values()))
+
+        sliced_path = component.table_definitions['tables'].full_path
+
+        self.assertEqual(os.listdir(sliced_path), [])
+        self.assertIn('columns', self.read_manifest(sliced_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
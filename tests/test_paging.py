@@ -0,0 +1,104 @@
+import unittest
+
+from paging import EventsPager, JobsPager, QueueJobsPager
+
+
+def jobs(*job_ids, created: str = '2023-03-01T00:00:00+00:00') -> list:
+    return [{'id': str(job_id), 'createdTime': created} for job_id in job_ids]
+
+
+class TestJobsPager(unittest.TestCase):
+
+    def test_keyset_pages_are_limited_to_lower_ids(self):
+
+        pager = JobsPager({'q': 'status:waiting'}, 2, keyset=True)
+        pages = iter([jobs(9, 8), jobs(7, 6), jobs(5)])
+        listed = []
+
+        for params in pager:
+            listed += [(params['q'], [job['id'] for job in pager.add_page(next(pages))])]
+
+        self.assertEqual(listed, [('status:waiting', ['9', '8']), ('(status:waiting) AND id:<8', ['7', '6']),
+                                  ('(status:waiting) AND id:<6', ['5'])])
+
+    def test_keyset_listing_ends_without_lower_ids(self):
+
+        pager = JobsPager({}, 2, keyset=True)
+
+        self.assertEqual(pager.add_page(jobs(9, 8)), jobs(9, 8))
+        self.assertFalse(pager.is_complete)
+
+        # The same page again, e.g. when the id filter is ignored
+        self.assertEqual(pager.add_page(jobs(9, 8)), [])
+        self.assertTrue(pager.is_complete)
+
+    def test_keyset_page_overlapping_previous_page(self):
+
+        pager = JobsPager({}, 2, keyset=True)
+        pager.add_page(jobs(9, 8))
+
+        self.assertEqual(pager.add_page(jobs(8, 7)), jobs(7))
+        self.assertFalse(pager.is_complete)
+        self.assertEqual(pager.get_params()['q'], 'id:<7')
+
+    def test_offset_pages(self):
+
+        pager = JobsPager({}, 2)
+
+        self.assertEqual(pager.get_params(), {'limit': 2, 'offset': 0})
+        pager.add_page(jobs(9, 8))
+        self.assertEqual(pager.get_params(), {'limit': 2, 'offset': 2})
+        pager.add_page(jobs(7))
+        self.assertTrue(pager.is_complete)
+
+
+class TestQueueJobsPager(unittest.TestCase):
+
+    def test_keyset_pages_are_limited_by_creation_time(self):
+
+        pager = QueueJobsPager({'componentId[]': ['transformation']}, 2)
+
+        self.assertEqual(pager.get_params(), {'componentId[]': ['transformation'], 'limit': 2,
+                                              'sortBy': 'createdTime', 'sortOrder': 'desc'})
+
+        pager.add_page(jobs(9) + jobs(8, created='2023-02-01T00:00:00+00:00'))
+
+        self.assertEqual(pager.get_params()['createdTimeTo'], '2023-02-01T00:00:00+00:00')
+        self.assertNotIn('q', pager.get_params())
+
+    def test_jobs_created_at_boundary_are_listed_once(self):
+
+        pager = QueueJobsPager({}, 2)
+
+        self.assertEqual(pager.add_page(jobs(9, 8)), jobs(9, 8))
+        self.assertEqual(pager.add_page(jobs(8, 7)), jobs(7))
+        self.assertFalse(pager.is_complete)
+
+        self.assertEqual(pager.add_page(jobs(8, 7)), [])
+        self.assertTrue(pager.is_complete)
+
+    def test_listing_ends_at_since_id(self):
+
+        pager = QueueJobsPager({}, 2, since_id='7')
+
+        self.assertEqual(pager.add_page(jobs(9, 8)), jobs(9, 8))
+        self.assertFalse(pager.is_complete)
+        self.assertEqual(pager.add_page(jobs(7, 6)), [])
+        self.assertTrue(pager.is_complete)
+
+
+class TestEventsPager(unittest.TestCase):
+
+    def test_event_at_max_id_is_not_repeated(self):
+
+        pager = EventsPager({}, 2)
+
+        self.assertEqual(pager.add_page([{'id': 9}, {'id': 8}]), [{'id': 9}, {'id': 8}])
+        self.assertEqual(pager.get_params(), {'limit': 2, 'maxId': 8})
+        self.assertEqual(pager.add_page([{'id': 8}, {'id': 7}]), [{'id': 7}])
+        self.assertEqual(pager.add_page([{'id': 7}]), [])
+        self.assertTrue(pager.is_complete)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from parser import KeyedIndex
+
+OBJECTS = [{'id': 1, 'name': 'first'}, {'id': '2', 'name': 'second'}, {'name': 'without id'},
+           {'id': 1, 'name': 'duplicate'}]
+
+
+class TestKeyedIndex(unittest.TestCase):
+
+    def setUp(self):
+
+        self.index = KeyedIndex(OBJECTS, 'id')
+
+    def test_objects_are_looked_up_by_key(self):
+
+        self.assertEqual(self.index['2'], {'id': '2', 'name': 'second'})
+        # Keys are normalized by the key function on both sides
+        self.assertEqual(self.index.get(2), {'id': '2', 'name': 'second'})
+
+    def test_last_object_with_same_key_is_kept(self):
+
+        self.assertEqual(self.index['1']['name'], 'duplicate')
+
+    def test_objects_without_key_are_left_out(self):
+
+        self.assertEqual(len(self.index), 2)
+        self.assertNotIn('None', self.index)
+
+    def test_missing_key(self):
+
+        self.assertNotIn(3, self.index)
+        self.assertIsNone(self.index.get(3))
+        self.assertEqual(self.index.get(3, {}), {})
+
+        with self.assertRaises(KeyError):
+            self.index[3]
+
+    def test_key_function(self):
+
+        index = KeyedIndex([{'field': 'Job.Component.Id', 'value': 'ex-db'}], 'field', str.lower)
+
+        self.assertIn('job.component.id', index)
+        self.assertEqual(index['JOB.COMPONENT.ID']['value'], 'ex-db')
+
+    def test_empty_payload(self):
+
+        index = KeyedIndex([], 'id')
+
+        self.assertEqual(len(index), 0)
+        self.assertIsNone(index.get('1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
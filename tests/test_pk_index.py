@@ -0,0 +1,94 @@
+import csv
+import io
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from pk_index import PrimaryKeyIndex
+from result import RowProjector, Writer
+
+
+class TestPrimaryKeyIndex(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def get_index(self, max_memory_keys: int = 4) -> PrimaryKeyIndex:
+
+        index = PrimaryKeyIndex([0, 2], max_memory_keys=max_memory_keys, spill_dir=self.directory.name)
+        self.addCleanup(index.close)
+
+        return index
+
+    def test_duplicate_keys_are_rejected(self):
+
+        index = self.get_index()
+
+        self.assertTrue(index.add(['1', 'a', 'x']))
+        self.assertTrue(index.add(['1', 'a', 'y']))
+        self.assertFalse(index.add(['1', 'b', 'x']))
+        self.assertEqual(index.duplicates, 1)
+
+    def test_keys_are_compared_as_written_to_csv(self):
+
+        index = self.get_index()
+
+        self.assertTrue(index.add([1, 'a', None]))
+        self.assertFalse(index.add(['1', 'b', '']))
+
+    def test_key_parts_are_separated(self):
+
+        index = self.get_index()
+
+        self.assertTrue(index.add(['1', '', '23']))
+        self.assertTrue(index.add(['12', '', '3']))
+
+    def test_keys_are_spilled_to_sqlite(self):
+
+        index = self.get_index()
+
+        for i in range(10):
+            self.assertTrue(index.add([str(i), '', 'x']))
+
+        self.assertEqual(index.spilled, 10)
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+        # Spilled keys are found in the database, keys still in memory in the set
+        for i in range(11):
+            self.assertEqual(index.add([str(i), '', 'x']), i == 10)
+
+        self.assertEqual(index.duplicates, 10)
+
+        index.close()
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_writers_drop_duplicate_rows(self):
+
+        tdf = SimpleNamespace(name='table', full_path=os.path.join(self.directory.name, 'table'),
+                              writer_columns=['id', 'value'], json_columns=[], columns=['id', 'value'],
+                              primary_key=['id'], incremental=True,
+                              pk_index=PrimaryKeyIndex([0], max_memory_keys=2, spill_dir=self.directory.name))
+        self.addCleanup(tdf.pk_index.close)
+
+        rows = [{'id': i % 5, 'value': i} for i in range(12)]
+
+        with Writer(tdf) as wrt:
+            wrt.write_rows(rows[:6])
+
+        # Rows encoded by other processes are deduplicated, when they're written
+        with Writer(tdf) as wrt:
+            wrt.write_encoded(RowProjector(tdf.writer_columns, []).encode(rows[6:]), 6)
+
+        with open(tdf.full_path, newline='') as output:
+            written = list(csv.reader(output))
+
+        self.assertEqual(written, list(csv.reader(io.StringIO(RowProjector(tdf.writer_columns, []).encode(rows[:5])))))
+        self.assertEqual(tdf.pk_index.duplicates, 7)
+        self.assertGreater(tdf.pk_index.spilled, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import pstats
+import tempfile
+import time
+import unittest
+
+from profiler import DatasetProfiler
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestDatasetProfiler(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+        self.profiler = DatasetProfiler(sample_interval=0.001)
+        self.addCleanup(self.profiler.stop)
+
+    def test_stats_of_dataset_are_merged(self):
+
+        for _ in range(2):
+            with self.profiler.profile('get_tables'):
+                busy(0.01)
+
+        path = os.path.join(self.directory.name, 'get_tables.pstats')
+        self.profiler.dump_stats('get_tables', path)
+
+        calls = {function[2]: stats[1] for function, stats in pstats.Stats(path).stats.items()}
+
+        self.assertEqual(self.profiler.datasets, ['get_tables'])
+        self.assertEqual(calls['busy'], 2)
+
+    def test_stacks_are_sampled_per_dataset(self):
+
+        with self.profiler.profile('get_tables'):
+            busy(0.2)
+
+        self.profiler.stop()
+
+        path = os.path.join(self.directory.name, 'stacks.collapsed')
+        self.profiler.write_collapsed_stacks(path)
+
+        with open(path) as stacks_file:
+            lines = stacks_file.read().splitlines()
+
+        stacks = {}
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            stacks[stack] = int(count)
+
+        frame = f'busy ({os.path.basename(__file__)}:{busy.__code__.co_firstlineno})'
+
+        self.assertTrue(all(stack.startswith('get_tables;') for stack in stacks))
+        self.assertTrue(any(stack.endswith(frame) for stack in stacks))
+        self.assertGreater(sum(stacks.values()), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import copy
+import csv
+import io
+import json
+import random
+import unittest
+
+from result import RowProjector
+
+KEYS = ['a', 'b', 'a_b', 'b_c', 'c', 'a_b_c']
+COLUMNS = ['a', 'b', 'a_b', 'a_b_c', 'b_c', 'c', 'a_c', 'zz']
+VALUES = [1, 'x', None, [1, 2], True, 1.5, 'q"u', '', 'ü\nü']
+
+
+def write_row_with_dict_writer(writer_columns: list, json_columns: list, row: dict, parent_dict: dict = None) -> str:
+    """
+    Reference implementation of `Writer.write_row` before rows were projected: JSON columns are set aside, the rest
+    of the row is flattened and written by `csv.DictWriter`.
+    """
+
+    def flatten_json(x, out=None, name=''):
+        if out is None:
+            out = dict()
+
+        if type(x) is dict:
+            for a in x:
+                flatten_json(x[a], out, name + a + '_')
+        else:
+            out[name[:-1]] = x
+
+        return out
+
+    _buffer = io.StringIO()
+    writer = csv.DictWriter(_buffer, fieldnames=writer_columns, restval='', extrasaction='ignore', quotechar='\"',
+                            quoting=csv.QUOTE_ALL)
+
+    save_aside = {}
+    for field in json_columns:
+        if field not in row:
+            continue
+        save_aside[field] = json.dumps(row[field])
+        del row[field]
+
+    row_f = {**flatten_json(x=row), **save_aside}
+    _dict_to_write = {key: value for key, value in row_f.items() if key in writer_columns}
+
+    if parent_dict is not None:
+        _dict_to_write = {**_dict_to_write, **parent_dict}
+
+    writer.writerow(_dict_to_write)
+
+    return _buffer.getvalue()
+
+
+def encode(values: list) -> str:
+
+    _buffer = io.StringIO()
+    csv.writer(_buffer, quotechar='\"', quoting=csv.QUOTE_ALL).writerow(values)
+
+    return _buffer.getvalue()
+
+
+class TestRowProjector(unittest.TestCase):
+
+    def random_value(self, rnd: random.Random, depth: int = 0):
+
+        if depth > 2 or rnd.random() < 0.4:
+            return rnd.choice(VALUES)
+
+        return {rnd.choice(KEYS): self.random_value(rnd, depth + 1) for _ in range(rnd.randint(0, 3))}
+
+    def test_projection_equals_dict_writer_on_random_rows(self):
+
+        rnd = random.Random(7)
+
+        for _ in range(5000):
+            json_columns = rnd.sample(['a', 'b', 'a_b', 'c'], rnd.randint(0, 2))
+            row = self.random_value(rnd)
+            row = row if isinstance(row, dict) else {'a': row}
+            parent_dict = {'c': 'P'} if rnd.random() < 0.3 else None
+
+            with self.subTest(row=row, json_columns=json_columns, parent_dict=parent_dict):
+                projector = RowProjector(COLUMNS, json_columns)
+                expected = write_row_with_dict_writer(COLUMNS, json_columns, copy.deepcopy(row), parent_dict)
+
+                self.assertEqual(encode(projector.project(row, parent_dict)), expected)
+
+    def test_row_is_not_modified(self):
+
+        row = {'a': {'b': 1}, 'c': {'d': 2}}
+        RowProjector(COLUMNS, ['c']).project(row)
+
+        self.assertEqual(row, {'a': {'b': 1}, 'c': {'d': 2}})
+
+    def test_ambiguous_paths_resolve_as_flattening(self):
+
+        # `a_b_c` is reachable both as `a -> b_c` and `a_b -> c`, flattening keeps the value visited last
+        row = {'a': {'b_c': 1}, 'a_b': {'c': 2}}
+
+        self.assertEqual(RowProjector(['a_b_c'], []).project(row), [2])
+        self.assertEqual(RowProjector(['a_b_c'], []).project({'a_b': {'c': 2}, 'a': {'b_c': 1}}), [1])
+
+    def test_ambiguous_path_through_json_column_is_left_out(self):
+
+        # `a -> b_c` goes through the JSON column `a`, only `a_b -> c` flattens to `a_b_c`
+        row = {'a_b': {'c': 2}, 'a': {'b_c': 1}}
+
+        self.assertEqual(RowProjector(['a_b_c', 'a'], ['a']).project(row), [2, '{"b_c": 1}'])
+
+    def test_long_column_names_are_compiled_without_enumerating_paths(self):
+
+        column = '_'.join(['part'] * 64)
+        row = {'part': {'_'.join(['part'] * 62): {'part': 1}}}
+
+        self.assertEqual(RowProjector([column], []).project(row), [1])
+        self.assertEqual(RowProjector([column], []).project({'part': {'part': 1}}), [''])
+
+
+if __name__ == '__main__':
+    unittest.main()